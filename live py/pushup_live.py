@@ -1,42 +1,25 @@
 import cv2
 import mediapipe as mp
-import numpy as np
 import pandas as pd
-from collections import deque
 import os
+import sys
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "scripts"))
+from counters import LIVE_COUNTERS
+from live_io import CameraSource, FrameReader, VideoWriterThread, Display
 
-# -------------------- Utilities --------------------
-def angle(a, b, c):
-    ba = np.array([a[0]-b[0], a[1]-b[1]])
-    bc = np.array([c[0]-b[0], c[1]-b[1]])
-    cosang = np.clip(
-        np.dot(ba, bc) / ((np.linalg.norm(ba)*np.linalg.norm(bc)) + 1e-9),
-        -1.0, 1.0
-    )
-    return float(np.degrees(np.arccos(cosang)))
-
-def lm_xy(lm, w, h):
-    return (int(lm.x * w), int(lm.y * h))
-
-# -------------------- Thresholds --------------------
-DOWN_ANGLE = 75
-UP_ANGLE = 110
-PLANK_MIN_ANGLE = 165
-CHEST_DEPTH_MIN = 40
-MIN_DIP_DURATION = 0.2
-SMOOTH_N = 3
+# -------------------- Settings --------------------
 PROCESS_SCALE = 0.5
 
 # -------------------- Camera --------------------
-cap = cv2.VideoCapture(0)
-assert cap.isOpened(), "Camera not accessible"
+reader = FrameReader(CameraSource(0))
+cap = reader.source.cap
 
 width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
 height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
 fps = cap.get(cv2.CAP_PROP_FPS) or 30
 
 os.makedirs("output", exist_ok=True)
-out_vid = cv2.VideoWriter(
+out_vid = VideoWriterThread(
     "output/pushup_annotated.mp4",
     cv2.VideoWriter_fourcc(*"mp4v"),
     fps,
@@ -53,95 +36,37 @@ pose = mp_pose.Pose(
 mp_draw = mp.solutions.drawing_utils
 
 # -------------------- State --------------------
-angle_history = deque(maxlen=SMOOTH_N)
-state = "up"
-in_dip = False
-dip_start_time = None
-current_dip_min_angle = 180
-reps = []
+counter = LIVE_COUNTERS['pushup'](width, height)
 frame_idx = 0
 
 # -------------------- Main Loop --------------------
-while True:
-    ret, frame = cap.read()
-    if not ret:
-        break
-
+reader.start()
+display = Display("Pushup Counter")
+start_time = None
+while not display.quit.is_set():
+    frame, stamp = reader.read(timeout=1.0)
+    if frame is None:
+        if reader.ended:
+            break
+        continue
+    start_time = stamp if start_time is None else start_time
     frame_idx += 1
-    t = frame_idx / fps
+    t = stamp - start_time  # capture time, so skipped frames don't slow the clock
 
     small = cv2.resize(frame, (0, 0), fx=PROCESS_SCALE, fy=PROCESS_SCALE)
     rgb = cv2.cvtColor(small, cv2.COLOR_BGR2RGB)
     results = pose.process(rgb)
 
-    elbow_angle = None
-    plank_angle = None
-    chest_depth = None
-
+    lm = None
     if results.pose_landmarks:
         mp_draw.draw_landmarks(frame, results.pose_landmarks, mp_pose.POSE_CONNECTIONS)
         lm = results.pose_landmarks.landmark
 
-        try:
-            ls = lm_xy(lm[mp_pose.PoseLandmark.LEFT_SHOULDER], width, height)
-            le = lm_xy(lm[mp_pose.PoseLandmark.LEFT_ELBOW], width, height)
-            lw = lm_xy(lm[mp_pose.PoseLandmark.LEFT_WRIST], width, height)
-
-            rs = lm_xy(lm[mp_pose.PoseLandmark.RIGHT_SHOULDER], width, height)
-            re = lm_xy(lm[mp_pose.PoseLandmark.RIGHT_ELBOW], width, height)
-            rw = lm_xy(lm[mp_pose.PoseLandmark.RIGHT_WRIST], width, height)
-
-            lh = lm_xy(lm[mp_pose.PoseLandmark.LEFT_HIP], width, height)
-            la = lm_xy(lm[mp_pose.PoseLandmark.LEFT_ANKLE], width, height)
-
-            ang_l = angle(ls, le, lw)
-            ang_r = angle(rs, re, rw)
-            elbow_angle = (ang_l + ang_r) / 2
-
-            plank_angle = angle(ls, lh, la)
-            chest_depth = lw[1] - ls[1]
-
-        except:
-            pass
-
     # -------------------- Rep Logic --------------------
-    if elbow_angle is not None:
-        angle_history.append(elbow_angle)
-        elbow_sm = sum(angle_history) / len(angle_history)
-
-        if state == "up" and elbow_sm <= DOWN_ANGLE:
-            state = "down"
-            in_dip = True
-            dip_start_time = t
-            current_dip_min_angle = elbow_sm
-
-        elif state == "down" and elbow_sm >= UP_ANGLE:
-            state = "up"
-            if in_dip:
-                dip_duration = t - dip_start_time
-
-                is_correct = (
-                    current_dip_min_angle <= DOWN_ANGLE and
-                    dip_duration >= MIN_DIP_DURATION and
-                    plank_angle is not None and plank_angle >= PLANK_MIN_ANGLE and
-                    chest_depth is not None and chest_depth >= CHEST_DEPTH_MIN
-                )
-
-                reps.append({
-                    "rep": len(reps) + 1,
-                    "duration": round(dip_duration, 3),
-                    "min_elbow": round(current_dip_min_angle, 2),
-                    "plank_angle": round(plank_angle or 0, 2),
-                    "chest_depth": round(chest_depth or 0, 2),
-                    "correct": is_correct
-                })
-
-                in_dip = False
-                dip_start_time = None
-                current_dip_min_angle = 180
-
-        if in_dip:
-            current_dip_min_angle = min(current_dip_min_angle, elbow_sm)
+    counter.update(lm, t)
+    elbow_sm = counter.elbow_angle_sm
+    plank_angle = counter.plank_angle
+    chest_depth = counter.chest_depth
 
     # -------------------- HUD --------------------
     y = 30
@@ -155,44 +80,41 @@ while True:
         return y + 30
 
     draw_y = 30
-    cv2.putText(frame, f"Reps: {len(reps)}", (10, draw_y),
+    cv2.putText(frame, f"Reps: {counter.count}", (10, draw_y),
                 cv2.FONT_HERSHEY_SIMPLEX, 0.8, (255,255,0), 2)
     draw_y += 30
 
-    if elbow_angle:
+    if counter.elbow_angle:
         cv2.putText(frame, f"Elbow: {int(elbow_sm)}", (10, draw_y),
                     cv2.FONT_HERSHEY_SIMPLEX, 0.7,
-                    (0,255,0) if elbow_sm <= DOWN_ANGLE else (0,0,255), 2)
+                    (0,255,0) if elbow_sm <= counter.DOWN_ANGLE else (0,0,255), 2)
         draw_y += 30
 
     if plank_angle:
         cv2.putText(frame, f"Plank: {int(plank_angle)}", (10, draw_y),
                     cv2.FONT_HERSHEY_SIMPLEX, 0.7,
-                    (0,255,0) if plank_angle >= PLANK_MIN_ANGLE else (0,0,255), 2)
+                    (0,255,0) if plank_angle >= counter.PLANK_MIN_ANGLE else (0,0,255), 2)
         draw_y += 30
 
     if chest_depth:
         cv2.putText(frame, f"Depth: {int(chest_depth)}", (10, draw_y),
                     cv2.FONT_HERSHEY_SIMPLEX, 0.7,
-                    (0,255,0) if chest_depth >= CHEST_DEPTH_MIN else (0,0,255), 2)
+                    (0,255,0) if chest_depth >= counter.CHEST_DEPTH_MIN else (0,0,255), 2)
         draw_y += 30
 
-    cv2.putText(frame, f"State: {state}", (10, draw_y),
+    cv2.putText(frame, f"State: {counter.state}", (10, draw_y),
                 cv2.FONT_HERSHEY_SIMPLEX, 0.7, (200,200,200), 2)
 
-    cv2.imshow("Pushup Counter", frame)
-    out_vid.write(frame)
-
-    if cv2.waitKey(1) & 0xFF in [27, ord("q")]:
-        break
+    display.show(frame)
+    out_vid.write(frame, stamp)
 
 # -------------------- Cleanup --------------------
-cap.release()
+reader.close()
 out_vid.release()
-cv2.destroyAllWindows()
+display.close()
 pose.close()
 
-pd.DataFrame(reps).to_csv("output/pushup_log.csv", index=False)
+pd.DataFrame(counter.rows()).to_csv("output/pushup_log.csv", index=False)
 
 print("Done.")
 print("Saved: output/pushup_annotated.mp4")
@@ -1,38 +1,22 @@
 import cv2
 import mediapipe as mp
-import numpy as np
 import pandas as pd
-from collections import deque
 import os
-
-# ================= UTILITIES =================
-def angle(a, b, c):
-    ba = np.array([a[0] - b[0], a[1] - b[1]])
-    bc = np.array([c[0] - b[0], c[1] - b[1]])
-    cosang = np.clip(
-        np.dot(ba, bc) / (np.linalg.norm(ba) * np.linalg.norm(bc) + 1e-9),
-        -1.0, 1.0
-    )
-    return np.degrees(np.arccos(cosang))
-
-def lm_xy(lm, w, h):
-    return (int(lm.x * w), int(lm.y * h))
-
-# ================= THRESHOLDS =================
-GREEN_ANGLE = 110     # sitting up (liberal)
-SMOOTH_N = 5          # smoothing for stability
+import sys
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "scripts"))
+from counters import LIVE_COUNTERS
+from live_io import CameraSource, FrameReader, VideoWriterThread, Display
 
 # ================= CAMERA =================
-cap = cv2.VideoCapture(0)
-if not cap.isOpened():
-    raise RuntimeError("Cannot access camera")
+reader = FrameReader(CameraSource(0))
+cap = reader.source.cap
 
 fps = cap.get(cv2.CAP_PROP_FPS) or 30
 width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
 height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
 
 os.makedirs("output", exist_ok=True)
-out = cv2.VideoWriter(
+out = VideoWriterThread(
     "output/situp_annotated.mp4",
     cv2.VideoWriter_fourcc(*"mp4v"),
     fps,
@@ -48,22 +32,22 @@ pose = mp_pose.Pose(
 draw = mp.solutions.drawing_utils
 
 # ================= STATE =================
-angle_hist = deque(maxlen=SMOOTH_N)
-prev_color = "RED"
-reps = []
+counter = LIVE_COUNTERS['situp'](width, height)
 
 # ================= MAIN LOOP =================
-while True:
-    ret, frame = cap.read()
-    if not ret:
-        break
+reader.start()
+display = Display("Sit-Up Counter (Live)")
+while not display.quit.is_set():
+    frame, stamp = reader.read(timeout=1.0)
+    if frame is None:
+        if reader.ended:
+            break
+        continue
 
     rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
     result = pose.process(rgb)
 
-    smooth_angle = None
-    curr_color = prev_color
-
+    lm = None
     if result.pose_landmarks:
         draw.draw_landmarks(
             frame,
@@ -73,68 +57,43 @@ while True:
 
         lm = result.pose_landmarks.landmark
 
-        try:
-            shoulder = lm_xy(lm[mp_pose.PoseLandmark.LEFT_SHOULDER], width, height)
-            hip = lm_xy(lm[mp_pose.PoseLandmark.LEFT_HIP], width, height)
-            knee = lm_xy(lm[mp_pose.PoseLandmark.LEFT_KNEE], width, height)
-
-            torso_angle = angle(shoulder, hip, knee)
-            angle_hist.append(torso_angle)
-            smooth_angle = sum(angle_hist) / len(angle_hist)
-
-            # RED / GREEN state
-            curr_color = "GREEN" if smooth_angle <= GREEN_ANGLE else "RED"
-
-            # -------- REP COUNT (RED → GREEN) --------
-            if prev_color == "RED" and curr_color == "GREEN":
-                reps.append({
-                    "rep": len(reps) + 1,
-                    "angle": round(smooth_angle, 2)
-                })
-
-            prev_color = curr_color
-
-        except:
-            pass
+    counter.update(lm, stamp)
 
     # ================= HUD =================
     cv2.putText(
-        frame, f"Sit-Ups: {len(reps)}",
+        frame, f"Sit-Ups: {counter.count}",
         (20, 40),
         cv2.FONT_HERSHEY_SIMPLEX,
         1.0, (0, 255, 255), 2
     )
 
-    if smooth_angle is not None:
-        color = (0, 255, 0) if curr_color == "GREEN" else (0, 0, 255)
+    if counter.smooth_angle is not None:
+        color = (0, 255, 0) if counter.color == "GREEN" else (0, 0, 255)
         cv2.putText(
             frame,
-            f"Torso Angle: {int(smooth_angle)}",
+            f"Torso Angle: {int(counter.smooth_angle)}",
             (20, 90),
             cv2.FONT_HERSHEY_SIMPLEX,
             0.8, color, 2
         )
 
     cv2.putText(
-        frame, f"State: {curr_color}",
+        frame, f"State: {counter.color}",
         (20, 130),
         cv2.FONT_HERSHEY_SIMPLEX,
         0.8, (200, 200, 200), 2
     )
 
-    cv2.imshow("Sit-Up Counter (Live)", frame)
-    out.write(frame)
-
-    if cv2.waitKey(1) & 0xFF in [27, ord("q")]:
-        break
+    display.show(frame)
+    out.write(frame, stamp)
 
 # ================= CLEANUP =================
-cap.release()
+reader.close()
 out.release()
-cv2.destroyAllWindows()
+display.close()
 pose.close()
 
-pd.DataFrame(reps).to_csv("output/situp_log.csv", index=False)
+pd.DataFrame(counter.rows()).to_csv("output/situp_log.csv", index=False)
 
 print("Done.")
 print("Saved: output/situp_annotated.mp4")
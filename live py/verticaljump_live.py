@@ -2,13 +2,10 @@ import cv2
 import os
 import mediapipe as mp
 from tkinter import Tk, filedialog
-from collections import deque
-import numpy as np
 import pandas as pd
-
-# -------- Utilities --------
-def lm_xy(lm, w, h):
-    return (lm.x*w, lm.y*h)
+import sys
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "scripts"))
+from counters import LIVE_COUNTERS
 
 # -------- Pixel to meters conversion --------
 PIXEL_TO_CM = 0.26
@@ -43,16 +40,7 @@ pose = mp_pose.Pose(min_detection_confidence=0.5, model_complexity=1)
 mp_draw = mp.solutions.drawing_utils
 
 # -------- Jump Variables --------
-baseline_y = None
-in_air = False
-peak_y = None
-jump_count = 0
-jump_data = []
-SMOOTH_N = 3
-hip_history = deque(maxlen=SMOOTH_N)
-max_jump_height_px = 0
-time_of_max_height = 0
-
+counter = LIVE_COUNTERS['verticaljump'](width, height, pixel_to_m=PIXEL_TO_M)
 frame_idx = 0
 
 # -------- Processing Loop --------
@@ -69,43 +57,11 @@ while True:
         mp_draw.draw_landmarks(frame, results.pose_landmarks, mp_pose.POSE_CONNECTIONS)
         lm = results.pose_landmarks.landmark
 
-        # Mid-hip
-        left_hip = lm_xy(lm[mp_pose.PoseLandmark.LEFT_HIP], width, height)
-        right_hip = lm_xy(lm[mp_pose.PoseLandmark.RIGHT_HIP], width, height)
-        mid_hip_y = (left_hip[1]+right_hip[1])/2
-
-        hip_history.append(mid_hip_y)
-        hip_smoothed = np.mean(hip_history)
-
-        if baseline_y is None:
-            baseline_y = hip_smoothed
-
-        # Jump detection
-        if not in_air and hip_smoothed < baseline_y - 20:
-            in_air = True
-            peak_y = hip_smoothed
-        elif in_air:
-            if hip_smoothed < peak_y:
-                peak_y = hip_smoothed
-            elif hip_smoothed >= baseline_y - 5:
-                in_air = False
-                jump_height_px = baseline_y - peak_y
-                jump_height_m = jump_height_px * PIXEL_TO_M
-                jump_count += 1
-                jump_data.append({
-                    'count': jump_count,
-                    'jump_height_px': round(jump_height_px,2),
-                    'jump_height_m': round(jump_height_m,3),
-                    'time_sec': round(t,2)
-                })
-                if jump_height_px > max_jump_height_px:
-                    max_jump_height_px = jump_height_px
-                    time_of_max_height = t
-                peak_y = None
+        counter.update(lm, t)
 
         # Display info
-        cv2.putText(frame, f"Jump Count: {jump_count}", (10,30), cv2.FONT_HERSHEY_SIMPLEX,1,(0,255,255),2)
-        cv2.putText(frame, f"Peak Height: {max_jump_height_px*PIXEL_TO_M:.2f} m", (10,70), cv2.FONT_HERSHEY_SIMPLEX,0.8,(0,255,0),2)
+        cv2.putText(frame, f"Jump Count: {counter.count}", (10,30), cv2.FONT_HERSHEY_SIMPLEX,1,(0,255,255),2)
+        cv2.putText(frame, f"Peak Height: {counter.max_jump_height_px*PIXEL_TO_M:.2f} m", (10,70), cv2.FONT_HERSHEY_SIMPLEX,0.8,(0,255,0),2)
         cv2.putText(frame, f"Total Duration: {video_duration_sec:.2f} s", (10,110), cv2.FONT_HERSHEY_SIMPLEX,0.8,(255,0,0),2)
 
     cv2.imshow("Vertical Jump Counter", frame)
@@ -120,11 +76,11 @@ cv2.destroyAllWindows()
 pose.close()
 
 # -------- Save CSV --------
-if jump_data:
-    pd.DataFrame(jump_data).to_csv(csv_path, index=False)
-    print(f"Saved {csv_path} with {len(jump_data)} jumps")
+if counter.rows():
+    pd.DataFrame(counter.rows()).to_csv(csv_path, index=False)
+    print(f"Saved {csv_path} with {counter.count} jumps")
 else:
     print("No jumps detected.")
 
 print(f"Total video duration: {video_duration_sec:.2f} s")
-print(f"Maximum jump height: {max_jump_height_px*PIXEL_TO_M:.2f} m at {time_of_max_height:.2f} s")
+print(f"Maximum jump height: {counter.max_jump_height_px*PIXEL_TO_M:.2f} m at {counter.time_of_max_height:.2f} s")
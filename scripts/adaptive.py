@@ -0,0 +1,120 @@
+"""Latency-targeting quality control for live sessions.
+
+The controller walks a ladder of (input scale, model complexity, frame skip)
+rungs, best quality first. Every processed frame reports how long it took;
+when the smoothed time no longer fits the frame budget (1 / target fps) the
+session steps down a rung, and when there is clear headroom it steps back
+up. Frame times on a skipping rung count per frame slot, so skipping only
+wins when inference alone cannot keep up. Each change is recorded with the
+latency that triggered it.
+
+The heavy model (complexity 2) is not shipped in the MediaPipe wheel and is
+downloaded the first time a graph asks for it, which would stall a live
+session mid-run; its rung is only on the ladder when the model file is
+already installed.
+"""
+import importlib.util
+import os
+import time
+
+HEAVY_MODEL = os.path.join('modules', 'pose_landmark', 'pose_landmark_heavy.tflite')
+
+
+def heavy_model_present():
+    """True when MediaPipe's heavy pose model is on disk (no download needed)."""
+    spec = importlib.util.find_spec('mediapipe')
+    roots = spec.submodule_search_locations if spec else None
+    return any(os.path.exists(os.path.join(root, HEAVY_MODEL)) for root in roots or ())
+
+
+# (scale, model_complexity, skip): skip = frames left out between processed ones
+LADDER = [(1.0, 2, 0)] if heavy_model_present() else []
+LADDER += [
+    (1.0, 1, 0),
+    (0.75, 1, 0),
+    (0.5, 1, 0),
+    (0.5, 0, 0),
+    (0.35, 0, 0),
+    (0.35, 0, 1),
+    (0.35, 0, 2),
+]
+
+
+class AdaptiveController:
+    ALPHA = 0.2          # EWMA weight of the newest frame time
+    UP_MARGIN = 0.6      # step up only when the smoothed time is under this share of the budget
+    HOLD_FRAMES = 15     # frames to settle after a change before deciding again
+    RETRY_FRAMES = 150   # before retrying a rung that was too slow; doubles on each failure
+
+    def __init__(self, target_fps=25, scale=1.0, model_complexity=1, ladder=LADDER):
+        self.ladder = ladder
+        self.budget_ms = 1000.0 / target_fps
+        self.level = self._closest(scale, model_complexity)
+        self.latency_ms = None
+        self.hold = self.HOLD_FRAMES
+        self.frame_idx = 0
+        self.samples = 0
+        self.retry_at = {}      # level -> sample count before which it is not retried
+        self.retry_frames = {}
+        self.changes = []
+
+    def _closest(self, scale, model_complexity):
+        return min(range(len(self.ladder)),
+                   key=lambda i: (abs(self.ladder[i][0] - scale), abs(self.ladder[i][1] - model_complexity), self.ladder[i][2]))
+
+    @property
+    def scale(self):
+        return self.ladder[self.level][0]
+
+    @property
+    def model_complexity(self):
+        return self.ladder[self.level][1]
+
+    @property
+    def skip(self):
+        return self.ladder[self.level][2]
+
+    def should_process(self):
+        """False for frames the current rung skips."""
+        self.frame_idx += 1
+        return (self.frame_idx - 1) % (self.skip + 1) == 0
+
+    def record(self, latency_ms, t=None):
+        """Feed one frame's processing time; returns the change dict when the rung moves."""
+        self.samples += 1
+        # A skipping rung spreads one inference over skip + 1 frame slots
+        latency_ms = latency_ms / (self.skip + 1)
+        if self.latency_ms is None:
+            self.latency_ms = latency_ms
+        else:
+            self.latency_ms += self.ALPHA * (latency_ms - self.latency_ms)
+        if self.hold > 0:
+            self.hold -= 1
+            return None
+
+        if self.latency_ms > self.budget_ms and self.level < len(self.ladder) - 1:
+            # Back off from this rung for longer each time it proves too slow
+            wait = self.retry_frames.get(self.level, self.RETRY_FRAMES // 2) * 2
+            self.retry_frames[self.level] = wait
+            self.retry_at[self.level] = self.samples + wait
+            return self._move(self.level + 1, t)
+        if (self.latency_ms < self.budget_ms * self.UP_MARGIN and self.level > 0 and
+                self.samples >= self.retry_at.get(self.level - 1, 0)):
+            return self._move(self.level - 1, t)
+        return None
+
+    def _move(self, level, t):
+        previous = self.ladder[self.level]
+        self.level = level
+        self.hold = self.HOLD_FRAMES
+        change = {
+            't': round(t if t is not None else time.monotonic(), 3),
+            'latency_ms': round(self.latency_ms, 1),
+            'budget_ms': round(self.budget_ms, 1),
+            'from': {'scale': previous[0], 'model_complexity': previous[1], 'skip': previous[2]},
+            'to': {'scale': self.scale, 'model_complexity': self.model_complexity, 'skip': self.skip},
+        }
+        # The new rung starts from a fresh estimate instead of the old rung's times
+        self.latency_ms = None
+        self.changes.append(change)
+        return change
@@ -0,0 +1,90 @@
+"""Headless analysis of a video (or a frame range of it) with the shared counters.
+
+The *_video.py scripts are the annotated, interactive analyzers; this is the
+same decode -> pose -> counter loop as a function, for callers that run many
+analyses from one process (roster splitting, workers, benchmarks).
+"""
+import cv2
+
+from counters import COUNTERS
+from job_control import stop_requested, stopped
+from pose_backend import create_pose
+
+# Frame size the counters see and the scale pose runs at, as in the *_video.py scripts
+PROCESS = {
+    'pushup': {'size': None, 'scale': 0.5},          # native resolution, pose at half size
+    'pullup': {'size': (960, 540), 'scale': 1.0},
+    'situp': {'size': (960, 540), 'scale': 1.0},
+    'sitreach': {'size': (960, 540), 'scale': 1.0},
+    'broadjump': {'size': (960, 540), 'scale': 1.0},
+    'shuttlerun': {'size': (960, 540), 'scale': 1.0},
+    'verticaljump': {'size': (960, 540), 'scale': 1.0},
+}
+
+
+def _seek(cap, video_path, frame_idx):
+    cap.set(cv2.CAP_PROP_POS_FRAMES, frame_idx)
+    if int(cap.get(cv2.CAP_PROP_POS_FRAMES)) != frame_idx:
+        # Container without exact seeking: walk there without converting the frames
+        cap.open(video_path)
+        for _ in range(frame_idx):
+            if not cap.grab():
+                break
+
+
+def analyze_video(video_path, exercise, start_frame=0, end_frame=None, pose_kwargs=None):
+    """Count ``exercise`` in frames [start_frame, end_frame) of ``video_path``.
+
+    Frame times stay on the source timeline, so rows from a sub-range line up
+    with the full recording. A job that is stopped (job_control) ends early
+    with the rows so far and ``stopped`` set to the reason.
+    """
+    settings = PROCESS[exercise]
+    cap = cv2.VideoCapture(video_path)
+    fps = cap.get(cv2.CAP_PROP_FPS) or 30
+    width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+    height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+    size = settings['size'] or (width, height)
+    scale = settings['scale']
+    if start_frame:
+        _seek(cap, video_path, start_frame)
+
+    counter = COUNTERS[exercise](*size)
+    pose = create_pose(**(pose_kwargs or {'min_detection_confidence': 0.5, 'model_complexity': 1}))
+    frame_idx = start_frame
+    try:
+        # Resuming from a checkpoint: the counter gets the saved poses, decoding starts after them
+        saved = pose.skip_saved() if hasattr(pose, 'skip_saved') else []
+        for landmarks in saved:
+            frame_idx += 1
+            counter.update(landmarks.landmark if landmarks else None, frame_idx / fps)
+        if saved:
+            _seek(cap, video_path, frame_idx)
+        while end_frame is None or frame_idx < end_frame:
+            if stop_requested():
+                break
+            ret, frame = cap.read()
+            if not ret:
+                break
+            frame_idx += 1
+            t = frame_idx / fps
+
+            if settings['size']:
+                frame = cv2.resize(frame, size)
+            if scale != 1.0:
+                frame = cv2.resize(frame, (0, 0), fx=scale, fy=scale)
+            results = pose.process(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+            counter.update(results.pose_landmarks.landmark if results.pose_landmarks else None, t)
+    finally:
+        cap.release()
+        pose.close()
+
+    return {
+        'exercise': exercise,
+        'start_frame': start_frame,
+        'end_frame': frame_idx,
+        'fps': fps,
+        'count': counter.count,
+        'rows': counter.rows(),
+        'stopped': stopped(),
+    }
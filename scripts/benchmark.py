@@ -0,0 +1,313 @@
+"""Throughput benchmark of the analyzers.
+
+Runs every analyzer over a fixed clip corpus, each run in its own process,
+and records per run: frames, frames per second, wall time, CPU seconds (per
+frame too) and peak memory. Modes are the ways a video gets analyzed:
+
+  script    the annotated *_video.py as the server runs it (draw, encode)
+  headless  analyze.analyze_video: decode, pose, counter only
+  multi     multi_person_video.py with the exercise's counter
+  roster    roster_video.py, attempts analyzed in parallel
+
+The corpus is every combination of length (short 10 s, long 60 s),
+resolution (540p, 1080p, 4k) and frame rate (30, 60, 120), named like
+``short_1080p_60``. Clips are looked up as ``<name>.mp4`` in the corpus
+directory; missing ones are rendered there once from a synthetic push-up
+sequence (synthetic.py, truth saved alongside), so real recordings can be
+dropped in under the same names.
+
+Results go to ``bench_<time>.json`` in the results directory and are compared
+with ``baseline.json`` there (or the previous result when there is no
+baseline). A run regresses when its fps drops or its CPU time per frame
+grows by more than the tolerance, or its peak memory by more than the memory
+tolerance; any regression makes the exit status 1.
+
+    python scripts/benchmark.py
+    BENCH_CLIPS=all BENCH_MODES=script,headless python scripts/benchmark.py
+
+Environment:
+  BENCH_ANALYZERS      comma list of exercises (default: all seven)
+  BENCH_MODES          comma list of modes (default script,headless)
+  BENCH_CLIPS          quick | all | comma list of clip names (default quick)
+  BENCH_REPEAT         runs per combination, the median is kept (default 1)
+  BENCH_CORPUS_DIR     clip directory (default ~/.cache/talenttrack/bench_corpus)
+  BENCH_RESULTS_DIR    result directory (default benchmarks/ in the repo)
+  BENCH_TOLERANCE      allowed fps / CPU-per-frame change (default 0.10)
+  BENCH_RSS_TOLERANCE  allowed peak memory growth (default 0.20)
+  BENCH_SAVE_BASELINE  1 to make this run the new baseline
+  BENCH_TIMEOUT_S      longest a single run may take (default 3600)
+  BENCH_KEEP_OUTPUT    1 to keep each run's CSVs and videos under <results>/work/
+"""
+import json
+import os
+import platform
+import runpy
+import shutil
+import statistics
+import subprocess
+import sys
+import time
+import types
+
+import cv2
+
+import synthetic
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(SCRIPTS_DIR)
+
+# Exercise -> annotated analyzer script
+SCRIPTS = {
+    'pushup': 'pushup_video.py',
+    'pullup': 'pullup_video.py',
+    'situp': 'situp_video.py',
+    'sitreach': 'sitreach_video.py',
+    'shuttlerun': 'shuttlerun_video.py',
+    'verticaljump': 'verticaljump_video.py',
+    'broadjump': 'verticalbroadjump_video.py',
+}
+MODES = ('script', 'headless', 'multi', 'roster')
+
+RESOLUTIONS = {'540p': (960, 540), '1080p': (1920, 1080), '4k': (3840, 2160)}
+FRAME_RATES = (30, 60, 120)
+LENGTHS = {'short': 10, 'long': 60}
+CORPUS = {
+    f"{length}_{res}_{fps}": (RESOLUTIONS[res], fps, seconds)
+    for length, seconds in LENGTHS.items() for res in RESOLUTIONS for fps in FRAME_RATES
+}
+QUICK = ('short_540p_30', 'short_1080p_60', 'short_4k_30')
+
+
+# -------- Corpus --------
+def corpus_clip(name, corpus_dir):
+    path = os.path.join(corpus_dir, f"{name}.mp4")
+    if not os.path.exists(path):
+        size, fps, seconds = CORPUS[name]
+        os.makedirs(corpus_dir, exist_ok=True)
+        print(f"Rendering {name} ({size[0]}x{size[1]}, {fps} fps, {seconds} s)...", flush=True)
+        # Push-ups at 30 a minute with a second of rest at each end fill the clip
+        seq = synthetic.generate('pushup', reps=max(1, round((seconds - 2) / 2)), fps=fps, size=size, noise_px=0)
+        synthetic.save(seq, corpus_dir, name)
+        tmp = path + '.part.mp4'
+        synthetic.render(seq, tmp)
+        os.replace(tmp, path)
+    return path
+
+
+# -------- Child process: one analysis --------
+def headless_gui(video):
+    # The analyzers pick their video through tkinter and show frames with
+    # highgui; neither exists on a display-less box, so both are replaced
+    tk = types.ModuleType('tkinter')
+    tk.Tk = lambda: types.SimpleNamespace(withdraw=lambda: None)
+    tk.filedialog = types.SimpleNamespace(askopenfilename=lambda **kwargs: video)
+    sys.modules['tkinter'] = tk
+    cv2.imshow = lambda *args: None
+    cv2.waitKey = lambda *args: -1
+    cv2.destroyAllWindows = lambda: None
+
+
+def run_child(mode, exercise, video):
+    sys.path.insert(0, SCRIPTS_DIR)
+    if mode == 'headless':
+        from job_metrics import report_job
+        from analyze import analyze_video
+        result = analyze_video(video, exercise)
+        report_job(result['end_frame'], exercise)
+        return
+    headless_gui(video)
+    script = {'script': SCRIPTS[exercise], 'multi': 'multi_person_video.py', 'roster': 'roster_video.py'}[mode]
+    runpy.run_path(os.path.join(SCRIPTS_DIR, script), run_name='__main__')
+
+
+# -------- Parent: run, store, compare --------
+def run_one(mode, exercise, clip, video, work_dir, timeout):
+    out_dir = os.path.join(work_dir, f"{exercise}_{mode}_{clip}")
+    os.makedirs(out_dir, exist_ok=True)
+    env = {**os.environ, 'EXERCISE': exercise, 'PYTHONUNBUFFERED': '1', 'JOB_ID': f"bench-{exercise}-{mode}-{clip}"}
+    env.pop('ANALYZER_PROFILE', None)
+    env.pop('JOB_ENQUEUED_AT', None)
+    started = time.monotonic()
+    try:
+        proc = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), '--run', mode, exercise, video],
+            cwd=out_dir, env=env, capture_output=True, text=True, timeout=timeout,
+        )
+    except subprocess.TimeoutExpired:
+        shutil.rmtree(out_dir, ignore_errors=True)
+        return {'status': 'timeout', 'wall_s': round(time.monotonic() - started, 3)}
+    wall = time.monotonic() - started
+    if os.environ.get("BENCH_KEEP_OUTPUT", "0") in ("", "0"):
+        shutil.rmtree(out_dir, ignore_errors=True)
+    report = next((json.loads(line[len('JOB_METRICS '):]) for line in proc.stdout.splitlines()
+                   if line.startswith('JOB_METRICS ')), None)
+    if proc.returncode != 0 or report is None:
+        return {'status': 'failed', 'wall_s': round(wall, 3),
+                'error': (proc.stderr or proc.stdout).strip().splitlines()[-5:]}
+    frames = report['frames']
+    return {
+        'status': 'ok',
+        'frames': frames,
+        'wall_s': round(wall, 3),
+        'fps': report['fps'],
+        'cpu_s': report['cpu_s'],
+        'cpu_ms_per_frame': round(report['cpu_s'] * 1000 / frames, 3) if frames else None,
+        'peak_rss_mb': round(report['peak_rss_bytes'] / 2 ** 20, 1) if report['peak_rss_bytes'] else None,
+    }
+
+
+def median_run(runs):
+    ok = [r for r in runs if r['status'] == 'ok']
+    if not ok:
+        return runs[-1]
+    out = dict(ok[0])
+    for key in ('wall_s', 'fps', 'cpu_s', 'cpu_ms_per_frame', 'peak_rss_mb'):
+        values = [r[key] for r in ok if r.get(key) is not None]
+        out[key] = round(statistics.median(values), 3) if values else None
+    out['repeats'] = len(ok)
+    return out
+
+
+def host_info():
+    import importlib.metadata as metadata
+    versions = {}
+    for pkg in ('mediapipe', 'opencv-python', 'numpy'):
+        try:
+            versions[pkg] = metadata.version(pkg)
+        except metadata.PackageNotFoundError:
+            versions[pkg] = None
+    return {
+        'machine': platform.machine(),
+        'processor': platform.processor() or platform.uname().processor,
+        'cpu_count': os.cpu_count(),
+        'python': platform.python_version(),
+        'pose_backend': os.environ.get("POSE_BACKEND", "mediapipe"),
+        'packages': versions,
+    }
+
+
+def run_key(run):
+    return f"{run['analyzer']}/{run['mode']}/{run['clip']}"
+
+
+def compare(current, previous, tolerance, rss_tolerance):
+    """Regressions of ``current`` runs against ``previous`` as readable strings."""
+    before = {run_key(r): r for r in previous['runs']}
+    regressions = []
+    for run in current['runs']:
+        old = before.get(run_key(run))
+        if old is None or old['status'] != 'ok':
+            continue
+        if run['status'] != 'ok':
+            regressions.append(f"{run_key(run)}: {run['status']} (was ok)")
+            continue
+        checks = (
+            ('fps', -1, tolerance),
+            ('cpu_ms_per_frame', 1, tolerance),
+            ('peak_rss_mb', 1, rss_tolerance),
+        )
+        for key, worse, allowed in checks:
+            new_v, old_v = run.get(key), old.get(key)
+            if not new_v or not old_v:
+                continue
+            change = (new_v - old_v) / old_v
+            if change * worse > allowed:
+                regressions.append(f"{run_key(run)}: {key} {old_v} -> {new_v} ({change:+.1%})")
+    return regressions
+
+
+def print_table(runs):
+    print(f"{'analyzer':<13}{'mode':<10}{'clip':<16}{'frames':>7}{'fps':>9}{'wall s':>9}{'cpu ms/f':>10}{'rss MB':>9}")
+    for r in runs:
+        if r['status'] != 'ok':
+            print(f"{r['analyzer']:<13}{r['mode']:<10}{r['clip']:<16}  {r['status']}")
+            continue
+        print(f"{r['analyzer']:<13}{r['mode']:<10}{r['clip']:<16}{r['frames']:>7}{r['fps'] or 0:>9.1f}"
+              f"{r['wall_s']:>9.1f}{r['cpu_ms_per_frame'] or 0:>10.1f}{r['peak_rss_mb'] or 0:>9.0f}")
+
+
+def _env_list(name, default):
+    value = os.environ.get(name, "")
+    return [v.strip() for v in value.split(",") if v.strip()] or list(default)
+
+
+def main():
+    analyzers = _env_list("BENCH_ANALYZERS", SCRIPTS)
+    modes = _env_list("BENCH_MODES", ('script', 'headless'))
+    clips = _env_list("BENCH_CLIPS", ('quick',))
+    clips = list(QUICK) if clips == ['quick'] else list(CORPUS) if clips == ['all'] else clips
+    for name, known, values in (('analyzer', SCRIPTS, analyzers), ('mode', MODES, modes), ('clip', CORPUS, clips)):
+        unknown = [v for v in values if v not in known]
+        if unknown:
+            raise SystemExit(f"Unknown {name}: {', '.join(unknown)}")
+    repeat = int(os.environ.get("BENCH_REPEAT", "1"))
+    timeout = float(os.environ.get("BENCH_TIMEOUT_S", "3600"))
+    corpus_dir = os.environ.get("BENCH_CORPUS_DIR") or os.path.join(
+        os.path.expanduser("~"), ".cache", "talenttrack", "bench_corpus")
+    results_dir = os.environ.get("BENCH_RESULTS_DIR") or os.path.join(REPO_DIR, "benchmarks")
+    tolerance = float(os.environ.get("BENCH_TOLERANCE", "0.10"))
+    rss_tolerance = float(os.environ.get("BENCH_RSS_TOLERANCE", "0.20"))
+    os.makedirs(results_dir, exist_ok=True)
+
+    stamp = time.strftime("%Y%m%d_%H%M%S")
+    work_dir = os.path.join(results_dir, "work", stamp)
+    runs = []
+    for clip in clips:
+        video = corpus_clip(clip, corpus_dir)
+        (w, h), fps, seconds = CORPUS[clip]
+        for exercise in analyzers:
+            for mode in modes:
+                print(f"{exercise} / {mode} / {clip}...", flush=True)
+                attempts = [run_one(mode, exercise, clip, video, work_dir, timeout) for _ in range(repeat)]
+                run = {'analyzer': exercise, 'mode': mode, 'clip': clip,
+                       'width': w, 'height': h, 'source_fps': fps, 'seconds': seconds,
+                       **median_run(attempts)}
+                runs.append(run)
+    if os.environ.get("BENCH_KEEP_OUTPUT", "0") in ("", "0"):
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    result = {'created': time.strftime("%Y-%m-%dT%H:%M:%S"), 'host': host_info(),
+              'tolerance': tolerance, 'rss_tolerance': rss_tolerance, 'runs': runs}
+    print_table(runs)
+
+    baseline_path = os.path.join(results_dir, "baseline.json")
+    previous_path = baseline_path if os.path.exists(baseline_path) else None
+    if previous_path is None:
+        earlier = sorted(f for f in os.listdir(results_dir) if f.startswith("bench_") and f.endswith(".json"))
+        previous_path = os.path.join(results_dir, earlier[-1]) if earlier else None
+
+    regressions = []
+    if previous_path:
+        with open(previous_path) as f:
+            previous = json.load(f)
+        if previous.get('host', {}).get('processor') != result['host']['processor'] or \
+                previous.get('host', {}).get('cpu_count') != result['host']['cpu_count']:
+            print(f"Warning: {os.path.basename(previous_path)} was recorded on a different host")
+        regressions = compare(result, previous, tolerance, rss_tolerance)
+        result['compared_with'] = os.path.basename(previous_path)
+        result['regressions'] = regressions
+
+    result_path = os.path.join(results_dir, f"bench_{stamp}.json")
+    with open(result_path, 'w') as f:
+        json.dump(result, f, indent=2)
+    print(f"Saved {result_path}")
+    if os.environ.get("BENCH_SAVE_BASELINE", "0") not in ("", "0") or not os.path.exists(baseline_path):
+        with open(baseline_path, 'w') as f:
+            json.dump(result, f, indent=2)
+        print(f"Saved {baseline_path}")
+
+    if regressions:
+        print(f"{len(regressions)} regression(s) against {result['compared_with']}:")
+        for line in regressions:
+            print(f"  {line}")
+        return 1
+    if previous_path:
+        print(f"No regressions against {result['compared_with']}")
+    return 0
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 5 and sys.argv[1] == '--run':
+        run_child(*sys.argv[2:])
+    else:
+        sys.exit(main())
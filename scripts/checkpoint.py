@@ -0,0 +1,189 @@
+"""Checkpoint and resume of an analysis job.
+
+Pose inference is what a long analysis spends its time on, so that is what
+a checkpoint keeps: every ``pose.process`` result of the job so far, exactly
+as the model returned it, and how many there are. ``create_pose()`` wraps
+the job's pose handle in ``CheckpointedPose`` when JOB_CHECKPOINT_DIR is
+set. A restarted job gets the saved results back instead of running the
+model, so the counter, its state (``state``, ``in_dip``, ``reps``,
+``baseline_y``, ...) and everything else the analyzer derives from the
+landmarks come out as they were, and the model takes over at the frame the
+checkpoint ends. Headless analysis (analyze.py) skips the saved frames with a
+seek; the *_video.py scripts still decode and draw them (an annotated MP4
+cannot be appended to) but run no inference on them.
+
+The pose graph tracks between frames and smooths its landmarks, state that
+cannot be saved. So checkpoints fall every JOB_CHECKPOINT_EVERY pose calls
+and the graph starts afresh at each of them in every run, resumed or not:
+a resumed job sees the same model state as an uninterrupted one, and its
+results (rep log, annotated video, report counts) are identical. The price
+is a re-detection every JOB_CHECKPOINT_EVERY frames that a standalone run
+of the script does not have. resume_check.py tests the identity.
+
+A checkpoint directory holds ``landmarks.bin`` (length-prefixed pickles,
+one per pose call) and ``checkpoint.json``, rewritten atomically after the
+log is synced. Log bytes past the last checkpoint are dropped on resume.
+
+Environment:
+  JOB_CHECKPOINT_DIR    checkpoint directory of the job (default: no checkpoints)
+  JOB_CHECKPOINT_EVERY  pose calls between checkpoints (default 900, 30 s at 30 fps)
+"""
+import hashlib
+import json
+import os
+import pickle
+import shutil
+import struct
+from types import SimpleNamespace
+
+DIRNAME = '.checkpoint'      # under a job's output directory (worker.py)
+MARKER = 'checkpoint.json'
+LOG = 'landmarks.bin'
+RECORD = struct.Struct('<I')
+
+_claimed = False
+
+
+def input_key(*parts):
+    """Fingerprint of a job's input; a checkpoint of other input is not resumed.
+
+    Paths among ``parts`` count with their size and modification time.
+    """
+    items = []
+    for part in parts:
+        if isinstance(part, str) and os.path.isfile(part):
+            st = os.stat(part)
+            items.append([part, st.st_size, int(st.st_mtime)])
+        else:
+            items.append(part)
+    return hashlib.sha1(json.dumps(items, default=str).encode()).hexdigest()[:16]
+
+
+def prepare(directory, key):
+    """Keep ``directory`` for a job with input ``key``; a checkpoint of anything else is removed."""
+    try:
+        with open(os.path.join(directory, MARKER)) as f:
+            if json.load(f).get('key') == key:
+                return
+    except (OSError, ValueError):
+        pass
+    shutil.rmtree(directory, ignore_errors=True)
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, MARKER), 'w') as f:
+        json.dump({'key': key, 'frames': 0, 'bytes': 0}, f)
+
+
+def start_job():
+    """Let the next ``create_pose()`` of this process take the job's checkpoint."""
+    global _claimed
+    _claimed = False
+
+
+def claim():
+    """The job's Checkpoint for its first pose handle; None without one or once taken."""
+    global _claimed
+    directory = os.environ.get("JOB_CHECKPOINT_DIR")
+    if not directory or _claimed:
+        return None
+    _claimed = True
+    return Checkpoint(directory, every=int(os.environ.get("JOB_CHECKPOINT_EVERY", "900")))
+
+
+def discard(directory):
+    shutil.rmtree(directory, ignore_errors=True)
+
+
+class Checkpoint:
+    def __init__(self, directory, every=900):
+        self.directory = directory
+        self.every = max(1, every)
+        os.makedirs(directory, exist_ok=True)
+        self.key = None
+        self.saved, end = self._load()
+        path = os.path.join(directory, LOG)
+        self.log = open(path, 'r+b' if os.path.exists(path) else 'wb')
+        self.log.seek(end)
+        self.log.truncate()
+        self.frames = len(self.saved)
+
+    def _load(self):
+        try:
+            with open(os.path.join(self.directory, MARKER)) as f:
+                marker = json.load(f)
+        except (OSError, ValueError):
+            return [], 0
+        self.key = marker.get('key')
+        if marker.get('every', self.every) != self.every or not marker.get('frames'):
+            return [], 0
+        saved = []
+        with open(os.path.join(self.directory, LOG), 'rb') as f:
+            for _ in range(marker['frames']):
+                (size,) = RECORD.unpack(f.read(RECORD.size))
+                saved.append(pickle.loads(f.read(size)))
+        return saved, marker['bytes']
+
+    def record(self, landmarks):
+        data = pickle.dumps(landmarks, protocol=pickle.HIGHEST_PROTOCOL)
+        self.log.write(RECORD.pack(len(data)) + data)
+        self.frames += 1
+        if self.frames % self.every == 0:
+            self.commit()
+
+    def commit(self):
+        self.log.flush()
+        os.fsync(self.log.fileno())
+        marker = {'key': self.key, 'every': self.every, 'frames': self.frames, 'bytes': self.log.tell()}
+        tmp = os.path.join(self.directory, MARKER + '.tmp')
+        with open(tmp, 'w') as f:
+            json.dump(marker, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, os.path.join(self.directory, MARKER))
+
+    def close(self):
+        if not self.log.closed:
+            self.log.close()
+
+
+class CheckpointedPose:
+    """``pose.process`` that saves every result and answers from the checkpoint first.
+
+    ``make_pose`` creates the real handle; it is replaced at every checkpoint boundary.
+    """
+
+    def __init__(self, make_pose, checkpoint):
+        self.make_pose = make_pose
+        self.checkpoint = checkpoint
+        self.pose = None
+        self.calls = 0
+
+    @property
+    def resumed(self):
+        """Pose calls answered from the checkpoint."""
+        return len(self.checkpoint.saved)
+
+    def skip_saved(self):
+        """Saved results not handed out yet, for callers that seek past them instead."""
+        saved = self.checkpoint.saved[self.calls:]
+        self.calls = len(self.checkpoint.saved)
+        return saved
+
+    def process(self, rgb):
+        i = self.calls
+        self.calls += 1
+        if i < len(self.checkpoint.saved):
+            return SimpleNamespace(pose_landmarks=self.checkpoint.saved[i])
+        if i % self.checkpoint.every == 0 and self.pose is not None:
+            self.pose.close()
+            self.pose = None
+        if self.pose is None:
+            self.pose = self.make_pose()
+        result = self.pose.process(rgb)
+        self.checkpoint.record(result.pose_landmarks)
+        return result
+
+    def close(self):
+        if self.pose is not None:
+            self.pose.close()
+            self.pose = None
+        self.checkpoint.close()
@@ -0,0 +1,802 @@
+"""Exercise state machines shared by the video analyzers.
+
+Each counter is fed one frame at a time with ``update(lm, t)`` where ``lm``
+is a MediaPipe landmark list (normalized x/y, ``None`` when no pose was
+found) and ``t`` the frame time in seconds. Thresholds and transitions are
+the ones the *_video.py scripts used inline; ``rows()`` returns what goes
+into the CSV log (sit & reach adds ``summary()``, its best reach). Keeping the logic here lets one upload hold several
+athletes (one counter per track) and lets other front ends reuse it.
+``LIVE_COUNTERS`` holds the live variants; the *_live.py scripts and
+live_engine.py all count with them.
+
+Video counters smooth over the last ``SMOOTH_N`` frames as the scripts did;
+live ones (``online = True``) use a One Euro filter, which reaches a threshold
+a frame or two sooner. Per-frame logs of the video counters (sit & reach,
+shuttle run) are filtered zero-phase over the whole series when read.
+"""
+from collections import deque, namedtuple
+import math
+
+import numpy as np
+
+from filters import MovingAverage, OneEuroFilter, sample_rate, zero_phase
+from jump_fit import fit_flight, flight_samples
+
+# MediaPipe PoseLandmark indices
+NUM_LANDMARKS = 33
+NOSE = 0
+LEFT_SHOULDER, RIGHT_SHOULDER = 11, 12
+LEFT_ELBOW, RIGHT_ELBOW = 13, 14
+LEFT_WRIST, RIGHT_WRIST = 15, 16
+LEFT_HIP, RIGHT_HIP = 23, 24
+LEFT_KNEE, RIGHT_KNEE = 25, 26
+LEFT_ANKLE, RIGHT_ANKLE = 27, 28
+LEFT_FOOT_INDEX, RIGHT_FOOT_INDEX = 31, 32
+
+
+# -------- Utilities --------
+def angle(a, b, c):
+    # Scalar math: called per joint per frame, where numpy's per-call overhead dominates
+    bax, bay = a[0]-b[0], a[1]-b[1]
+    bcx, bcy = c[0]-b[0], c[1]-b[1]
+    cosang = (bax*bcx + bay*bcy) / ((math.hypot(bax, bay)*math.hypot(bcx, bcy))+1e-9)
+    return math.degrees(math.acos(min(1.0, max(-1.0, cosang))))
+
+def lm_xy(lm, w, h):
+    return (lm.x * w, lm.y * h)
+
+
+Landmark = namedtuple('Landmark', 'x y z visibility')
+
+
+def landmarks_from_rows(rows):
+    """33 normalized [x, y, z, visibility] rows -> a landmark list counters accept."""
+    return [Landmark(*row) for row in rows]
+
+
+class Counter:
+    exercise = None
+    log_name = None        # CSV suffix: {filename}_{log_name}.csv
+    per_frame_rows = False  # rows() logs every frame rather than one row per rep
+    online = False          # live variant: One Euro smoothing, rows final as they come
+    SMOOTH_N = 5            # frames averaged by video counters
+    stride = 1              # frames between samples when pose runs on every Nth frame only
+    ONE_EURO = (1.0, 0.01)  # (min cutoff Hz, beta) for live counters, in the signal's units/s
+    ZERO_PHASE_HZ = 4.0     # cutoff of the offline filter over per-frame logs
+
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+
+    def smoother(self):
+        # One Euro works in seconds; the moving average keeps its span in frames
+        if self.online:
+            return OneEuroFilter(*self.ONE_EURO)
+        return MovingAverage(max(1, round(self.SMOOTH_N / self.stride)))
+
+    def xy(self, lm, idx):
+        return lm_xy(lm[idx], self.width, self.height)
+
+    def update(self, lm, t):
+        raise NotImplementedError
+
+    def rows(self):
+        return self.reps
+
+    @property
+    def count(self):
+        return len(self.reps)
+
+
+# -------- Push-ups --------
+class PushupCounter(Counter):
+    exercise = 'pushup'
+    log_name = 'pushup_log'
+    DOWN_ANGLE = 75
+    UP_ANGLE = 110
+    MIN_DIP_DURATION = 0.2
+    SMOOTH_N = 3
+
+    def __init__(self, width, height):
+        super().__init__(width, height)
+        self.angle_filter = self.smoother()
+        self.state = 'up'
+        self.in_dip = False
+        self.dip_start_time = None
+        self.current_dip_min_angle = 180
+        self.reps = []
+        self.elbow_angle = None
+        self.elbow_angle_sm = None
+
+    def update(self, lm, t):
+        self.elbow_angle = None
+        if lm is not None:
+            try:
+                ang_l = angle(self.xy(lm, LEFT_SHOULDER), self.xy(lm, LEFT_ELBOW), self.xy(lm, LEFT_WRIST))
+                ang_r = angle(self.xy(lm, RIGHT_SHOULDER), self.xy(lm, RIGHT_ELBOW), self.xy(lm, RIGHT_WRIST))
+                self.elbow_angle = (ang_l + ang_r)/2
+            except Exception:
+                self.elbow_angle = None
+        if self.elbow_angle is None:
+            return None
+
+        rep = None
+        sm = self.elbow_angle_sm = self.angle_filter(self.elbow_angle, t)
+
+        if self.state == 'up' and sm <= self.DOWN_ANGLE:
+            self.state = 'down'
+            self.in_dip = True
+            self.dip_start_time = t
+            self.current_dip_min_angle = sm
+
+        elif self.state == 'down' and sm >= self.UP_ANGLE:
+            self.state = 'up'
+            if self.in_dip:
+                rep = self._make_rep(t, t - self.dip_start_time)
+                self.reps.append(rep)
+                self.in_dip = False
+                self.dip_start_time = None
+                self.current_dip_min_angle = 180
+
+        if self.in_dip and sm < self.current_dip_min_angle:
+            self.current_dip_min_angle = sm
+        return rep
+
+    def _make_rep(self, t, dip_duration):
+        is_correct = self.current_dip_min_angle <= self.DOWN_ANGLE and dip_duration >= self.MIN_DIP_DURATION
+        return {
+            'count': len(self.reps)+1,
+            'down_time': round(self.dip_start_time,3),
+            'up_time': round(t,3),
+            'dip_duration_sec': round(dip_duration,3),
+            'min_elbow_angle': round(self.current_dip_min_angle,2),
+            'correct': is_correct
+        }
+
+
+# -------- Pull-ups --------
+class PullupCounter(Counter):
+    exercise = 'pullup'
+    log_name = 'pullup_log'
+    SMOOTH_N = 3
+    BOTTOM_ANGLE = 160     # elbows straighter than this: back in the hang
+    TOP_ANGLE = 90         # elbows must bend past this for the rep to count
+    HEAD_RISE_PX = 10      # head rise above the hang that starts a rep
+    MIN_DIP = 0.1
+
+    def __init__(self, width, height):
+        super().__init__(width, height)
+        self.angle_filter = self.smoother()
+        self.state = 'waiting'
+        self.in_dip = False
+        self.dip_start_time = None
+        self.min_angle = None
+        self.reps = []
+        self.initial_head_y = None
+        self.elbow_angle = None
+        self.smoothed_angle = None
+
+    def update(self, lm, t):
+        self.elbow_angle = None
+        head_y = None
+        if lm is not None:
+            try:
+                head_y = self.xy(lm, NOSE)[1]
+                if self.initial_head_y is None:
+                    self.initial_head_y = head_y
+                ang_l = angle(self.xy(lm, LEFT_SHOULDER), self.xy(lm, LEFT_ELBOW), self.xy(lm, LEFT_WRIST))
+                ang_r = angle(self.xy(lm, RIGHT_SHOULDER), self.xy(lm, RIGHT_ELBOW), self.xy(lm, RIGHT_WRIST))
+                self.elbow_angle = (ang_l + ang_r) / 2
+            except Exception:
+                self.elbow_angle = None
+                head_y = None
+        if self.elbow_angle is None or head_y is None:
+            return None
+
+        rep = None
+        self.smoothed_angle = self.angle_filter(self.elbow_angle, t)
+
+        if self.state == 'waiting' and head_y < self.initial_head_y - self.HEAD_RISE_PX:
+            self.state = 'up'
+            self.in_dip = True
+            self.dip_start_time = t
+            self.min_angle = self.smoothed_angle
+
+        elif self.state == 'up':
+            self.min_angle = min(self.min_angle, self.smoothed_angle)
+            if self.smoothed_angle > self.BOTTOM_ANGLE:
+                if head_y >= self.initial_head_y - self.HEAD_RISE_PX and self.in_dip:
+                    dip_duration = t - self.dip_start_time
+                    if dip_duration >= self.MIN_DIP and self.min_angle <= self.TOP_ANGLE:
+                        rep = {
+                            'count': len(self.reps) + 1,
+                            'up_time': round(self.dip_start_time, 2),
+                            'down_time': round(t, 2),
+                            'dip_duration_sec': round(dip_duration, 2),
+                            'min_elbow_angle': round(self.min_angle, 2)
+                        }
+                        self.reps.append(rep)
+                    self.in_dip = False
+                    self.dip_start_time = None
+                    self.state = 'waiting'
+        return rep
+
+
+# -------- Sit-ups --------
+class SitupCounter(Counter):
+    exercise = 'situp'
+    log_name = 'situp_log'
+    SMOOTH_N = 5
+    MIN_DIP_CHANGE = 15
+
+    def __init__(self, width, height):
+        super().__init__(width, height)
+        self.angle_filter = self.smoother()
+        self.state = 'up'
+        self.reps = []
+        self.last_extreme_angle = None
+        self.dip_start_time = None
+        self.elbow_angle = None
+        self.elbow_angle_sm = None
+
+    def update(self, lm, t):
+        self.elbow_angle = None
+        if lm is not None:
+            try:
+                self.elbow_angle = (
+                    angle(self.xy(lm, LEFT_SHOULDER), self.xy(lm, LEFT_ELBOW), self.xy(lm, LEFT_WRIST)) +
+                    angle(self.xy(lm, RIGHT_SHOULDER), self.xy(lm, RIGHT_ELBOW), self.xy(lm, RIGHT_WRIST))
+                ) / 2
+            except Exception:
+                pass
+        if self.elbow_angle is None:
+            return None
+
+        rep = None
+        sm = self.elbow_angle_sm = self.angle_filter(self.elbow_angle, t)
+
+        if self.last_extreme_angle is None:
+            self.last_extreme_angle = sm
+
+        if self.state == 'up' and self.last_extreme_angle - sm >= self.MIN_DIP_CHANGE:
+            self.state = 'down'
+            self.dip_start_time = t
+            self.last_extreme_angle = sm
+
+        elif self.state == 'down' and sm - self.last_extreme_angle >= self.MIN_DIP_CHANGE:
+            self.state = 'up'
+            rep = {
+                'count': len(self.reps) + 1,
+                'down_time': round(self.dip_start_time, 3) if self.dip_start_time else 0,
+                'up_time': round(t, 3),
+                'angle_change': round(sm - self.last_extreme_angle, 2)
+            }
+            self.reps.append(rep)
+            self.dip_start_time = None
+            self.last_extreme_angle = sm
+        return rep
+
+    def dip_time(self, t):
+        return (t - self.dip_start_time) if self.state == 'down' and self.dip_start_time else 0.0
+
+
+# -------- Sit & Reach --------
+class SitReachCounter(Counter):
+    exercise = 'sitreach'
+    log_name = 'sit_and_reach_log'
+    per_frame_rows = True
+    SMOOTH_N = 5
+
+    def __init__(self, width, height, pixel_to_m=0.0026):
+        super().__init__(width, height)
+        self.pixel_to_m = pixel_to_m
+        self.reach_filter = self.smoother()
+        self.max_reach_px = 0
+        self.time_of_max_reach = 0
+        self.reach_data = []
+        self.reach_raw = []       # (t, reach_px) before smoothing, for the offline log
+        self.reach_smoothed = None
+
+    def update(self, lm, t):
+        self.reach_smoothed = None
+        if lm is None:
+            return None
+        try:
+            foot_x = (self.xy(lm, LEFT_FOOT_INDEX)[0] + self.xy(lm, RIGHT_FOOT_INDEX)[0]) / 2
+            hand_x = (self.xy(lm, LEFT_WRIST)[0] + self.xy(lm, RIGHT_WRIST)[0]) / 2
+        except Exception:
+            return None
+
+        # Forward reach distance (positive if hands ahead of feet)
+        self.reach_raw.append((t, hand_x - foot_x))
+        self.reach_smoothed = self.reach_filter(hand_x - foot_x, t)
+        if self.reach_smoothed > self.max_reach_px:
+            self.max_reach_px = self.reach_smoothed
+            self.time_of_max_reach = t
+        row = {
+            'time_s': round(t,3),
+            'reach_px': round(self.reach_smoothed,2),
+            'reach_m': round(self.reach_smoothed*self.pixel_to_m,3)
+        }
+        self.reach_data.append(row)
+        return row
+
+    def _reach(self):
+        """(times, reach_px) of the whole recording, filtered zero-phase."""
+        times = [r[0] for r in self.reach_raw]
+        return times, [float(r) for r in zero_phase([r[1] for r in self.reach_raw], sample_rate(times), self.ZERO_PHASE_HZ)]
+
+    def rows(self):
+        if self.online or not self.reach_raw:
+            return self.reach_data
+        # Whole recording known: zero-phase smoothing keeps the best reach and its time
+        return [
+            {'time_s': round(t,3), 'reach_px': round(r,2), 'reach_m': round(r*self.pixel_to_m,3)}
+            for t, r in zip(*self._reach())
+        ]
+
+    def summary(self):
+        """Best reach and its time, from the same series as rows()."""
+        if self.online or not self.reach_raw:
+            return {'max_reach_px': self.max_reach_px, 'time_of_max_reach': self.time_of_max_reach}
+        times, reach = self._reach()
+        best = int(np.argmax(reach))
+        return {'max_reach_px': max(reach[best], 0), 'time_of_max_reach': times[best] if reach[best] > 0 else 0}
+
+    @property
+    def count(self):
+        return len(self.reach_data)
+
+
+# -------- Broad jump --------
+class BroadJumpCounter(Counter):
+    exercise = 'broadjump'
+    log_name = 'jump_log'
+    SMOOTH_N = 5           # frames to smooth ankle y
+    TAKEOFF_PX = 15        # ankle rise above standing level that starts a jump
+    LANDING_PX = 5         # ankles back within this of the ground end it
+    MAX_AIR_TIME = 2.0     # longer is the athlete walking off, not a jump
+
+    def __init__(self, width, height):
+        super().__init__(width, height)
+        self.state = 'grounded'
+        self.jumps = []
+        self.air_start_time = None
+        self.takeoff_x = None
+        self.ground_y = None
+        self.ankle_filter = self.smoother()
+        self.ankle_y = None
+
+    def update(self, lm, t):
+        self.ankle_y = None
+        ankle_x = None
+        if lm is not None:
+            try:
+                left_ankle = self.xy(lm, LEFT_ANKLE)
+                right_ankle = self.xy(lm, RIGHT_ANKLE)
+                self.ankle_y = (left_ankle[1] + right_ankle[1]) / 2
+                ankle_x = (left_ankle[0] + right_ankle[0]) / 2
+            except Exception:
+                pass
+        if self.ankle_y is None:
+            return None
+
+        jump = None
+        ankle_y_smooth = self.ankle_filter(self.ankle_y, t)
+        if self.ground_y is None:
+            self.ground_y = ankle_y_smooth
+        if self.state == 'grounded':
+            if ankle_y_smooth < self.ground_y - self.TAKEOFF_PX:
+                self.state = 'airborne'
+                self.air_start_time = t
+                self.takeoff_x = ankle_x
+            else:
+                # image y grows downwards: the ground is the lowest the ankles settle
+                self.ground_y = max(self.ground_y, ankle_y_smooth)
+        elif t - self.air_start_time > self.MAX_AIR_TIME:
+            self.state = 'grounded'
+            self.air_start_time = None
+            self.takeoff_x = None
+            self.ground_y = ankle_y_smooth
+        elif ankle_y_smooth >= self.ground_y - self.LANDING_PX:
+            self.state = 'grounded'
+            jump = {
+                'count': len(self.jumps)+1,
+                'takeoff_time': round(self.air_start_time,3),
+                'landing_time': round(t,3),
+                'air_time_s': round(t - self.air_start_time,3),
+                'jump_distance_px': round(ankle_x - self.takeoff_x,2)
+            }
+            self.jumps.append(jump)
+            self.air_start_time = None
+            self.takeoff_x = None
+            self.ground_y = ankle_y_smooth
+        return jump
+
+    def rows(self):
+        return self.jumps
+
+    @property
+    def count(self):
+        return len(self.jumps)
+
+
+# -------- Shuttle run --------
+class ShuttleRunCounter(Counter):
+    exercise = 'shuttlerun'
+    log_name = 'shuttle_run_positions'
+    SMOOTH_N = 5
+    DIR_FRAMES = 3
+    THRESHOLD_PIX = 5
+
+    def __init__(self, width, height):
+        super().__init__(width, height)
+        self.x_filter = self.smoother()
+        self.dir_history = deque(maxlen=self.DIR_FRAMES)
+        self.positions = []
+        self.raw_x = []           # (t, x) before smoothing, for the offline log
+        self.run_count = 0
+        self.status = 'Waiting'
+        self.direction = None
+        self.start_x = None
+        self.last_x = None
+        self.smoothed_x = None
+
+    def foot_keypoints(self, lm):
+        return [self.xy(lm, i) for i in (LEFT_ANKLE, RIGHT_ANKLE, LEFT_FOOT_INDEX, RIGHT_FOOT_INDEX)]
+
+    def update(self, lm, t):
+        if lm is None:
+            return None
+        return self.update_x(np.mean([p[0] for p in self.foot_keypoints(lm)]), t)
+
+    def update_x(self, current_x, t):
+        """Advance on the mean foot x directly (pose keyframe or tracker)."""
+        turn = None
+        self.raw_x.append((t, current_x))
+        self.smoothed_x = self.x_filter(current_x, t)
+
+        # Direction calculation
+        if self.last_x is not None:
+            delta = self.smoothed_x - self.last_x
+            if delta > self.THRESHOLD_PIX:
+                self.dir_history.append('forward')
+            elif delta < -self.THRESHOLD_PIX:
+                self.dir_history.append('backward')
+        self.last_x = self.smoothed_x
+
+        if len(self.dir_history) == self.DIR_FRAMES and all(d == self.dir_history[0] for d in self.dir_history):
+            confirmed_dir = self.dir_history[0]
+            if self.start_x is None:
+                self.start_x = self.smoothed_x
+                self.direction = confirmed_dir
+                self.status = 'Running Towards' if self.direction == 'forward' else 'Returning'
+            elif self.direction != confirmed_dir:
+                self.direction = confirmed_dir
+                if confirmed_dir == 'backward':
+                    self.run_count += 1
+                    self.status = 'Returning'
+                    turn = {'run_count': self.run_count, 'time': round(t, 3)}
+                else:
+                    self.status = 'Running Towards'
+
+        self.positions.append(self.smoothed_x)
+        return turn
+
+    def rows(self):
+        positions = self.positions
+        if not self.online and self.raw_x:
+            times = [r[0] for r in self.raw_x]
+            positions = [float(x) for x in zero_phase([r[1] for r in self.raw_x], sample_rate(times), self.ZERO_PHASE_HZ)]
+        return [{'frame': i, 'x_pos_px': x} for i, x in enumerate(positions, start=1)]
+
+    @property
+    def count(self):
+        return self.run_count
+
+
+# -------- Vertical jump --------
+class VerticalJumpCounter(Counter):
+    exercise = 'verticaljump'
+    log_name = 'vertical_jump_log'
+    SMOOTH_N = 5           # frames to smooth hip y
+    TAKEOFF_PX = 20        # hip rise above baseline that starts a jump
+    LANDING_PX = 5         # hip back within this of baseline ends it
+    MAX_AIR_TIME = 2.0
+    RAW_HISTORY_N = 8
+
+    def __init__(self, width, height, pixel_to_m=0.0026, verbose=False, stride=1):
+        super().__init__(width, height)
+        self.stride = stride
+        self.pixel_to_m = pixel_to_m
+        self.gravity_px = 9.81 / pixel_to_m  # px/s^2, pins the parabola when too few flight samples
+        self.verbose = verbose
+        self.baseline_y = None
+        self.in_air = False
+        self.peak_y = None
+        self.jump_data = []
+        self.hip_filter = self.smoother()
+        self.raw_history = deque(maxlen=self.RAW_HISTORY_N)  # (t, mid_hip_y) before takeoff is confirmed
+        self.flight = []                                      # raw (t, mid_hip_y) since takeoff
+        self.max_jump_height_px = 0
+        self.time_of_max_height = 0
+        self.air_start_time = 0
+        self.air_time = 0
+
+    def _log(self, msg):
+        if self.verbose:
+            print(msg)
+
+    def update(self, lm, t):
+        if lm is None:
+            return None
+        mid_hip_y = (self.xy(lm, LEFT_HIP)[1] + self.xy(lm, RIGHT_HIP)[1]) / 2
+        return self.update_hip(mid_hip_y, t)
+
+    def update_hip(self, mid_hip_y, t):
+        jump = None
+        hip_smoothed = self.hip_filter(mid_hip_y, t)
+
+        if self.baseline_y is None:
+            self.baseline_y = hip_smoothed
+
+        # Jump detection
+        if not self.in_air and hip_smoothed < self.baseline_y - self.TAKEOFF_PX:
+            self.in_air = True
+            self.peak_y = hip_smoothed
+            self.air_start_time = t
+            self.air_time = 0
+            self.flight = [(t, mid_hip_y)]
+            self._log(f"[Jump] Takeoff at {t:.2f}s, baseline={self.baseline_y:.1f}, current={hip_smoothed:.1f}")
+        elif self.in_air:
+            self.flight.append((t, mid_hip_y))
+            self.peak_y = min(self.peak_y, hip_smoothed)
+            self.air_time = t - self.air_start_time
+
+            # Landing detected
+            if hip_smoothed >= self.baseline_y - self.LANDING_PX:
+                jump = self._land(t, hip_smoothed)
+            # Safety: force landing if stuck in air > 2 seconds
+            elif self.air_time > self.MAX_AIR_TIME:
+                self._log(f"[Jump] Force landing after {self.air_time:.2f}s in air")
+                jump = self._land(t, hip_smoothed, min_height_px=10)  # Only count if reasonable height
+        if not self.in_air:
+            self.raw_history.append((t, mid_hip_y))
+        return jump
+
+    def _land(self, t, hip_smoothed, min_height_px=0):
+        jump = self._record_jump(t, min_height_px)
+        self.in_air = False
+        self.peak_y = None
+        self.air_time = 0
+        self.baseline_y = hip_smoothed  # update baseline after landing
+        self.raw_history.clear()
+        return jump
+
+    def _record_jump(self, t, min_height_px):
+        # Ballistic fit of the raw flight samples; fall back to the smoothed peak.
+        # TAKEOFF_PX only picks the samples clearly off the ground: takeoff and
+        # landing are where the arc crosses the standing baseline itself.
+        samples = flight_samples(list(self.raw_history) + self.flight, self.baseline_y - self.TAKEOFF_PX)
+        fit = fit_flight([s[0] for s in samples], [s[1] for s in samples], self.baseline_y, self.gravity_px)
+        if fit is not None:
+            jump_height_px = self.baseline_y - fit['peak_y']
+            takeoff_time, landing_time = fit['takeoff_time'], fit['landing_time']
+            peak_time, air_time = fit['peak_time'], fit['flight_time']
+        else:
+            jump_height_px = self.baseline_y - self.peak_y
+            takeoff_time, landing_time = self.air_start_time, t
+            peak_time, air_time = None, self.air_time
+        if jump_height_px <= min_height_px:
+            return None
+        jump_height_m = jump_height_px * self.pixel_to_m
+        self._log(f"[Jump] Landing at {t:.2f}s, height={jump_height_px:.1f}px ({jump_height_m:.2f}m), air_time={air_time:.3f}s, fit={'parabola' if fit else 'peak'}")
+        jump = {
+            'count': len(self.jump_data) + 1,
+            'takeoff_time': round(takeoff_time,3),
+            'landing_time': round(landing_time,3),
+            'air_time_s': round(air_time,3),
+            'jump_height_px': round(jump_height_px,2),
+            'jump_height_m': round(jump_height_m,3),
+            'peak_time': round(peak_time,3) if peak_time is not None else None,
+            'fit_points': fit['points'] if fit else 0
+        }
+        self.jump_data.append(jump)
+        if jump_height_px > self.max_jump_height_px:
+            self.max_jump_height_px = jump_height_px
+            self.time_of_max_height = takeoff_time
+        return jump
+
+    def rows(self):
+        return self.jump_data
+
+    @property
+    def count(self):
+        return len(self.jump_data)
+
+
+# -------- Live variants --------
+# The live/*_live.py scripts score push-ups with extra form checks, count
+# sit-ups and squats on a single joint-angle zone and keep a simpler jump log.
+class PushupLiveCounter(PushupCounter):
+    online = True
+    ONE_EURO = (1.0, 0.02)
+    PLANK_MIN_ANGLE = 165
+    CHEST_DEPTH_MIN = 40
+
+    def __init__(self, width, height):
+        super().__init__(width, height)
+        self.plank_angle = None
+        self.chest_depth = None
+
+    def update(self, lm, t):
+        self.plank_angle = None
+        self.chest_depth = None
+        if lm is not None:
+            try:
+                ls = self.xy(lm, LEFT_SHOULDER)
+                self.plank_angle = angle(ls, self.xy(lm, LEFT_HIP), self.xy(lm, LEFT_ANKLE))
+                self.chest_depth = self.xy(lm, LEFT_WRIST)[1] - ls[1]
+            except Exception:
+                pass
+        return super().update(lm, t)
+
+    def _make_rep(self, t, dip_duration):
+        is_correct = (
+            self.current_dip_min_angle <= self.DOWN_ANGLE and
+            dip_duration >= self.MIN_DIP_DURATION and
+            self.plank_angle is not None and self.plank_angle >= self.PLANK_MIN_ANGLE and
+            self.chest_depth is not None and self.chest_depth >= self.CHEST_DEPTH_MIN
+        )
+        return {
+            'rep': len(self.reps) + 1,
+            'duration': round(dip_duration, 3),
+            'min_elbow': round(self.current_dip_min_angle, 2),
+            'plank_angle': round(self.plank_angle or 0, 2),
+            'chest_depth': round(self.chest_depth or 0, 2),
+            'correct': is_correct
+        }
+
+
+class AngleZoneCounter(Counter):
+    """Counts RED -> GREEN transitions of a smoothed joint angle."""
+    online = True
+    JOINTS = None          # (a, b, c) landmark indices, angle measured at b
+    GREEN_ANGLE = None
+    angle_field = 'angle'
+
+    def __init__(self, width, height):
+        super().__init__(width, height)
+        self.angle_filter = self.smoother()
+        self.color = 'RED'
+        self.reps = []
+        self.smooth_angle = None
+
+    def update(self, lm, t):
+        self.smooth_angle = None
+        if lm is None:
+            return None
+        try:
+            raw = angle(*(self.xy(lm, i) for i in self.JOINTS))
+        except Exception:
+            return None
+
+        rep = None
+        sm = self.smooth_angle = self.angle_filter(raw, t)
+        color = 'GREEN' if sm <= self.GREEN_ANGLE else 'RED'
+        if self.color == 'RED' and color == 'GREEN':
+            rep = {'rep': len(self.reps) + 1, self.angle_field: round(sm, 2)}
+            self.reps.append(rep)
+        self.color = color
+        return rep
+
+
+class SitupLiveCounter(AngleZoneCounter):
+    exercise = 'situp'
+    log_name = 'situp_log'
+    JOINTS = (LEFT_SHOULDER, LEFT_HIP, LEFT_KNEE)   # torso angle
+    GREEN_ANGLE = 110                               # sitting up (liberal)
+
+
+class SquatLiveCounter(AngleZoneCounter):
+    exercise = 'squat'
+    log_name = 'squat_log'
+    JOINTS = (LEFT_HIP, LEFT_KNEE, LEFT_ANKLE)
+    GREEN_ANGLE = 120                               # knee bent (squat down)
+    angle_field = 'knee_angle'
+
+
+class VerticalJumpLiveCounter(Counter):
+    exercise = 'verticaljump'
+    log_name = 'vertical_jump_log'
+    online = True
+    ONE_EURO = (1.0, 0.05)   # hip y in px; opens up fast enough to keep takeoff and landing on time
+    TAKEOFF_PX = 20
+    LANDING_PX = 5
+
+    def __init__(self, width, height, pixel_to_m=0.0026):
+        super().__init__(width, height)
+        self.pixel_to_m = pixel_to_m
+        self.hip_filter = self.smoother()
+        self.baseline_y = None
+        self.in_air = False
+        self.peak_y = None
+        self.jump_data = []
+        self.max_jump_height_px = 0
+        self.time_of_max_height = 0
+
+    def update(self, lm, t):
+        if lm is None:
+            return None
+        hip_smoothed = self.hip_filter((self.xy(lm, LEFT_HIP)[1] + self.xy(lm, RIGHT_HIP)[1]) / 2, t)
+        if self.baseline_y is None:
+            self.baseline_y = hip_smoothed
+
+        jump = None
+        if not self.in_air and hip_smoothed < self.baseline_y - self.TAKEOFF_PX:
+            self.in_air = True
+            self.peak_y = hip_smoothed
+        elif self.in_air:
+            if hip_smoothed < self.peak_y:
+                self.peak_y = hip_smoothed
+            elif hip_smoothed >= self.baseline_y - self.LANDING_PX:
+                self.in_air = False
+                jump_height_px = self.baseline_y - self.peak_y
+                jump = {
+                    'count': len(self.jump_data) + 1,
+                    'jump_height_px': round(jump_height_px,2),
+                    'jump_height_m': round(jump_height_px * self.pixel_to_m,3),
+                    'time_sec': round(t,2)
+                }
+                self.jump_data.append(jump)
+                if jump_height_px > self.max_jump_height_px:
+                    self.max_jump_height_px = jump_height_px
+                    self.time_of_max_height = t
+                self.peak_y = None
+        return jump
+
+    def rows(self):
+        return self.jump_data
+
+    @property
+    def count(self):
+        return len(self.jump_data)
+
+
+class PullupLiveCounter(PullupCounter):
+    online = True
+    ONE_EURO = (1.0, 0.02)
+
+
+class SitReachLiveCounter(SitReachCounter):
+    online = True
+
+
+class ShuttleRunLiveCounter(ShuttleRunCounter):
+    online = True
+
+
+class BroadJumpLiveCounter(BroadJumpCounter):
+    online = True
+
+
+COUNTERS = {
+    'pushup': PushupCounter,
+    'pullup': PullupCounter,
+    'situp': SitupCounter,
+    'sitreach': SitReachCounter,
+    'broadjump': BroadJumpCounter,
+    'shuttlerun': ShuttleRunCounter,
+    'verticaljump': VerticalJumpCounter,
+}
+
+LIVE_COUNTERS = {
+    'pushup': PushupLiveCounter,
+    'pullup': PullupLiveCounter,
+    'situp': SitupLiveCounter,
+    'squat': SquatLiveCounter,
+    'sitreach': SitReachLiveCounter,
+    'shuttlerun': ShuttleRunLiveCounter,
+    'verticaljump': VerticalJumpLiveCounter,
+    'broadjump': BroadJumpLiveCounter,
+}
@@ -0,0 +1,129 @@
+"""Signal smoothing for the counters.
+
+Online filters take one sample at a time, ``f(x, t) -> smoothed``, in
+constant time and memory:
+
+  MovingAverage          mean of the last n samples, kept as a running sum;
+                         the same numbers as averaging a deque every frame
+  OneEuroFilter          low-pass whose cutoff rises with speed: steady poses
+                         stay still, fast movements come through with little lag
+
+A centred n-frame mean reports every change about n/2 frames late, which is
+what held back live rep feedback. The One Euro filter follows a moving joint
+within a frame or two while smoothing a still one at least as well.
+
+Offline, when the whole series is known, ``zero_phase`` runs a Butterworth
+low-pass forwards and backwards so peaks keep their time and height.
+"""
+import math
+from collections import deque
+
+import numpy as np
+
+DEFAULT_DT = 1 / 30.0   # used when a sample comes without a usable time step
+
+
+class MovingAverage:
+    def __init__(self, n):
+        self.window = deque(maxlen=n)
+        self.total = 0.0
+        self.value = None
+
+    def __call__(self, x, t=None):
+        if len(self.window) == self.window.maxlen:
+            self.total -= self.window[0]
+        self.window.append(x)
+        self.total += x
+        self.value = self.total / len(self.window)
+        return self.value
+
+    def reset(self):
+        self.window.clear()
+        self.total = 0.0
+        self.value = None
+
+
+def _alpha(cutoff, dt):
+    tau = 1.0 / (2 * math.pi * cutoff)
+    return 1.0 / (1.0 + tau / dt)
+
+
+class OneEuroFilter:
+    """Casiez et al., "1 Euro Filter", CHI 2012.
+
+    ``min_cutoff`` (Hz) sets the smoothing at rest, ``beta`` how fast the
+    cutoff opens up per unit/s of speed, ``d_cutoff`` (Hz) smooths the speed
+    estimate itself.
+    """
+
+    def __init__(self, min_cutoff=1.0, beta=0.0, d_cutoff=1.0):
+        self.min_cutoff = min_cutoff
+        self.beta = beta
+        self.d_cutoff = d_cutoff
+        self.reset()
+
+    def __call__(self, x, t=None):
+        if self.value is None:
+            self.value, self.last_t = x, t
+            return x
+        dt = t - self.last_t if t is not None and self.last_t is not None else 0.0
+        if dt <= 0:
+            dt = DEFAULT_DT
+        self.last_t = t
+        a_d = _alpha(self.d_cutoff, dt)
+        self.speed += a_d * ((x - self.value) / dt - self.speed)
+        a = _alpha(self.min_cutoff + self.beta * abs(self.speed), dt)
+        self.value += a * (x - self.value)
+        return self.value
+
+    def reset(self):
+        self.value = None
+        self.speed = 0.0
+        self.last_t = None
+
+
+def _butter2(cutoff_hz, fs):
+    """Second-order Butterworth low-pass (bilinear transform) as (b, a)."""
+    k = math.tan(math.pi * min(cutoff_hz, 0.45 * fs) / fs)
+    norm = 1 + math.sqrt(2) * k + k * k
+    b0 = k * k / norm
+    return (b0, 2 * b0, b0), (1.0, 2 * (k * k - 1) / norm, (1 - math.sqrt(2) * k + k * k) / norm)
+
+
+def _lfilter(b, a, x, zi):
+    # Direct form II transposed, started from steady state at x[0]
+    y = np.empty_like(x)
+    z1, z2 = zi[0] * x[0], zi[1] * x[0]
+    for i, xi in enumerate(x):
+        yi = b[0] * xi + z1
+        z1 = b[1] * xi - a[1] * yi + z2
+        z2 = b[2] * xi - a[2] * yi
+        y[i] = yi
+    return y
+
+
+def zero_phase(values, fs, cutoff_hz):
+    """Forward-backward Butterworth low-pass of a whole series; no lag, no peak shift.
+
+    ``fs`` is the sample rate. Edges are padded with odd reflections so the
+    ends do not droop. Series too short to filter come back unchanged.
+    """
+    x = np.asarray(values, dtype=float)
+    if len(x) < 4 or not fs or cutoff_hz <= 0:
+        return x
+    b, a = _butter2(cutoff_hz, fs)
+    # Filter state of a constant input of 1 (unity gain at DC), scaled by the first sample
+    zi = (b[1] + b[2] - a[1] - a[2], b[2] - a[2])
+    pad = min(len(x) - 1, 9)
+    ext = np.concatenate((2 * x[0] - x[pad:0:-1], x, 2 * x[-1] - x[-2:-pad - 2:-1]))
+    y = _lfilter(b, a, ext, zi)
+    y = _lfilter(b, a, y[::-1], zi)[::-1]
+    return y[pad:len(ext) - pad]
+
+
+def sample_rate(times):
+    """Median frame rate of a list of sample times, None when it cannot be told."""
+    if len(times) < 2:
+        return None
+    dt = float(np.median(np.diff(times)))
+    return 1.0 / dt if dt > 0 else None
@@ -0,0 +1,76 @@
+"""Cooperative stop of an analysis job: cancellation and a wall-clock budget.
+
+The analyzers call ``stop_requested()`` once per frame and leave their
+frame loop when it returns a reason, then save what they have as usual, so
+a stopped job ends within one frame with a rep log (and annotated video)
+covering the frames it processed. The reason goes into the job report as
+``stopped``:
+
+  cancelled  ``request_stop()`` was called, by SIGUSR1 in a worker
+             (worker.py installs the handler) or by the parent of a pool
+  timeout    the budget ran out; the clock starts at import, or at
+             ``start()`` for each job of a long-lived process
+
+Nothing in here can interrupt a call that never returns (a stuck decode);
+the job runner kills the worker when a job overstays its budget by a
+grace period.
+
+Environment:
+  JOB_BUDGET_S  wall-clock budget of the job in seconds (default: none)
+"""
+import os
+import signal
+import time
+
+_deadline = None   # time.time() the budget runs out, None without one
+_reason = None
+_shared = None     # multiprocessing.Event of the parent job, in pool workers
+
+
+def start(budget_s=None):
+    """Clear any stop and start the budget (``budget_s``, else JOB_BUDGET_S) for the next job."""
+    global _deadline, _reason
+    budget = float(budget_s if budget_s is not None else os.environ.get("JOB_BUDGET_S") or 0)
+    _deadline = time.time() + budget if budget > 0 else None
+    _reason = None
+
+
+def deadline():
+    return _deadline
+
+
+def request_stop(reason='cancelled'):
+    global _reason
+    if _reason is None:
+        _reason = reason
+
+
+def stop_requested():
+    """Why the job should stop now ('cancelled' or 'timeout'), None to carry on."""
+    global _reason
+    if _reason is None:
+        if _shared is not None and _shared.is_set():
+            _reason = 'cancelled'
+        elif _deadline is not None and time.time() >= _deadline:
+            _reason = 'timeout'
+    return _reason
+
+
+def stopped():
+    """The reason the job stopped early, once it has noticed; None otherwise."""
+    return _reason
+
+
+def share(event, deadline_at):
+    """Pool worker initializer: stop with the parent (``event``) and at its deadline."""
+    global _shared, _deadline, _reason
+    _shared, _deadline, _reason = event, deadline_at, None
+
+
+def install_signal_handler():
+    """SIGUSR1 cancels the running job (POSIX only)."""
+    if hasattr(signal, 'SIGUSR1'):
+        signal.signal(signal.SIGUSR1, lambda signum, frame: request_stop('cancelled'))
+
+
+start()
@@ -0,0 +1,184 @@
+"""Resource report of one analysis job, for the server's metrics.
+
+Import it early (the clock starts at import) and call ``report_job()`` once
+the results are saved. It prints a single line
+
+    JOB_METRICS {"job_id": ..., "frames": ..., "fps": ..., "cpu_s": ..., ...}
+
+which the server picks out of stdout and aggregates (see
+server/utils/metrics.js). CPU time includes child processes that have been
+waited for (the roster analyzer's workers). Peak RSS is the largest of this
+process and its children.
+
+A long-lived process running many jobs (worker.py) calls ``start_job()``
+before each one so wall and CPU time cover that job only, and reads the
+report back from ``last_report``. The kernel's peak RSS is the process
+lifetime's, so from then on a thread samples RSS every RSS_SAMPLE_S and the
+peak is that job's: the largest sample, or a child waited for during the job
+if it went higher; ``process_usage()`` is what it has in use
+right now (memory, descriptors, threads, pose handles).
+
+A job that left its frame loop early (job_control) reports why in
+``stopped`` ('cancelled' or 'timeout'); its frame count is what it got through.
+
+Environment (set by the server):
+  JOB_ID           id shared with the request, echoed in the report
+  JOB_ENQUEUED_AT  epoch milliseconds the request was accepted, for queue wait
+"""
+import json
+import os
+import sys
+import threading
+import time
+
+import job_control
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+STARTED = time.monotonic()
+STARTED_AT = time.time()
+CPU_AT_START = 0.0
+RSS_SAMPLE_S = 0.1
+last_report = None
+
+_job_peak = None            # (largest RSS sample, children's peak at start_job) once start_job ran
+_peak_lock = threading.Lock()
+
+
+def _maxrss_bytes(who):
+    peak = resource.getrusage(who).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def _lifetime_peak_rss_bytes():
+    if resource is not None:
+        return max(_maxrss_bytes(resource.RUSAGE_SELF), _maxrss_bytes(resource.RUSAGE_CHILDREN))
+    try:
+        import psutil
+    except ImportError:
+        return None
+    info = psutil.Process().memory_info()
+    return getattr(info, 'peak_wset', info.rss)
+
+
+def _sample_rss():
+    global _job_peak
+    rss = _current_rss_bytes()
+    if rss is None:
+        return
+    with _peak_lock:
+        if _job_peak is not None and rss > _job_peak[0]:
+            _job_peak = (rss, _job_peak[1])
+
+
+def _sample_forever():
+    while True:
+        time.sleep(RSS_SAMPLE_S)
+        _sample_rss()
+
+
+def _peak_rss_bytes():
+    if _job_peak is None:
+        return _lifetime_peak_rss_bytes()
+    _sample_rss()
+    peak, children_before = _job_peak
+    if resource is not None:
+        children = _maxrss_bytes(resource.RUSAGE_CHILDREN)
+        if children > children_before:
+            peak = max(peak or 0, children)
+    return peak
+
+
+def _cpu_seconds():
+    t = os.times()
+    return t.user + t.system + t.children_user + t.children_system
+
+
+def _current_rss_bytes():
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import psutil
+    except ImportError:
+        return None
+    return psutil.Process().memory_info().rss
+
+
+def _open_fds():
+    try:
+        return len(os.listdir('/proc/self/fd')) - 1   # minus the listing's own descriptor
+    except OSError:
+        pass
+    try:
+        import psutil
+    except ImportError:
+        return None
+    proc = psutil.Process()
+    return proc.num_fds() if hasattr(proc, 'num_fds') else proc.num_handles()
+
+
+def _native_threads():
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('Threads:'):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+def process_usage():
+    """Resources this process holds right now."""
+    from pose_backend import open_pose_handles
+    return {
+        'rss_bytes': _current_rss_bytes(),
+        'open_fds': _open_fds(),
+        'threads': _native_threads(),
+        'pose_handles': open_pose_handles(),
+    }
+
+
+def start_job():
+    """Restart the clock, CPU baseline and peak RSS for the next job of this process."""
+    global STARTED, STARTED_AT, CPU_AT_START, last_report, _job_peak
+    STARTED = time.monotonic()
+    STARTED_AT = time.time()
+    CPU_AT_START = _cpu_seconds()
+    last_report = None
+    started = _job_peak is not None
+    with _peak_lock:
+        _job_peak = (_current_rss_bytes(),
+                     _maxrss_bytes(resource.RUSAGE_CHILDREN) if resource is not None else 0)
+    if not started:
+        threading.Thread(target=_sample_forever, name="rss-sampler", daemon=True).start()
+
+
+def job_report(frames, exercise):
+    wall = time.monotonic() - STARTED
+    enqueued = os.environ.get("JOB_ENQUEUED_AT")
+    return {
+        'job_id': os.environ.get("JOB_ID"),
+        'exercise': exercise,
+        'frames': int(frames),
+        'wall_s': round(wall, 3),
+        'fps': round(frames / wall, 2) if wall > 0 else None,
+        'cpu_s': round(_cpu_seconds() - CPU_AT_START, 3),
+        'peak_rss_bytes': _peak_rss_bytes(),
+        'queue_wait_s': round(max(0.0, STARTED_AT - float(enqueued) / 1000), 3) if enqueued else None,
+        'stopped': job_control.stopped(),
+    }
+
+
+def report_job(frames, exercise):
+    global last_report
+    report = last_report = job_report(frames, exercise)
+    print("JOB_METRICS " + json.dumps(report), flush=True)
+    return report
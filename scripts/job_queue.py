@@ -0,0 +1,394 @@
+"""Durable queue of analysis jobs in SQLite.
+
+A job moves through
+
+  queued -> running -> done
+     |        |    \\-> failed          (error on the last attempt)
+     |        |    \\-> cancelled       (stopped on request, partial results)
+     |        |    \\-> expired         (out of its time budget, partial results)
+     |        \\-> queued               (error or lost lease, attempts left)
+     \\-> cancelled
+
+``claim()`` hands the next queued job to a runner under a lease that the
+runner renews with ``heartbeat()`` while the job runs. A lease that is not
+renewed in time (runner killed, host gone) expires and ``requeue_expired()``
+puts the job back, counting the attempt; a lease held by a process on this
+host that no longer exists is given back without waiting for the expiry.
+Admission is bounded: ``submit()`` raises QueueFull once ``max_queued`` jobs
+are waiting (and DuplicateJob for an id it already has).
+
+Jobs are ordered shortest expected job first, with aging. Each job gets an
+``estimate_s`` at submit time: its work (probed frame count, weighted for
+resolution, see ``work_units``) times the seconds per unit the last finished
+jobs of the same exercise and mode actually took. The next job is the one
+with the smallest estimate minus ``aging`` times its wait, so a 10 s clip
+does not sit behind a 5 min one, and a long clip still overtakes newer
+short ones once it has waited about its estimate (aging 1). Aging 0 is pure
+shortest-first, a large aging is first come first served.
+
+Everything the server needs to answer for a job after a restart (state,
+attempts, error, output directory, job report) lives in the row.
+"""
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+
+STATES = ('queued', 'running', 'done', 'failed', 'cancelled', 'expired')
+JSON_FIELDS = ('env', 'cleanup', 'report')
+PROBE_FIELDS = ('frames', 'fps', 'width', 'height', 'duration_s')
+
+# Cost model: per-frame work is inference (fixed) plus decode and resize
+# (grows with pixels); this is the decode share at REF_PIXELS
+REF_PIXELS = 1280 * 720
+DECODE_SHARE = 0.3
+DEFAULT_S_PER_UNIT = 0.03      # before any job of the kind has finished
+DEFAULT_ESTIMATE_S = 60.0      # video that could not be probed, nothing learned yet
+LEARN_FROM = 50                # finished jobs the rate is learned from
+# Windows process probe (_pid_alive)
+PROCESS_QUERY_LIMITED_INFORMATION = 0x1000
+ERROR_ACCESS_DENIED = 5
+STILL_ACTIVE = 259
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id            TEXT PRIMARY KEY,
+    state         TEXT NOT NULL,
+    exercise      TEXT,
+    mode          TEXT,
+    activity      TEXT,
+    video         TEXT,
+    script        TEXT,
+    output_dir    TEXT,
+    output_id     TEXT,
+    env           TEXT,
+    cleanup       TEXT,
+    attempts      INTEGER NOT NULL DEFAULT 0,
+    max_attempts  INTEGER NOT NULL,
+    lease_owner   TEXT,
+    lease_expires REAL,
+    heartbeat_at  REAL,
+    enqueued_at   REAL NOT NULL,
+    started_at    REAL,
+    finished_at   REAL,
+    report        TEXT,
+    error         TEXT,
+    frames        INTEGER,
+    fps           REAL,
+    width         INTEGER,
+    height        INTEGER,
+    duration_s    REAL,
+    work          REAL,
+    estimate_s    REAL,
+    budget_s      REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_state ON jobs (state, enqueued_at);
+"""
+
+
+def work_units(frames, width=None, height=None):
+    """Work of a clip in frames at REF_PIXELS; None without a frame count."""
+    if not frames:
+        return None
+    pixels = (width or 0) * (height or 0) or REF_PIXELS
+    return frames * (1 - DECODE_SHARE + DECODE_SHARE * pixels / REF_PIXELS)
+
+
+def _median(values):
+    values = sorted(values)
+    if not values:
+        return None
+    mid = len(values) // 2
+    return values[mid] if len(values) % 2 else (values[mid - 1] + values[mid]) / 2
+
+
+class QueueFull(RuntimeError):
+    pass
+
+
+class DuplicateJob(ValueError):
+    pass
+
+
+def make_owner():
+    """Lease owner id of this process: host, pid and a nonce."""
+    return f"{socket.gethostname()}:{os.getpid()}:{os.urandom(3).hex()}"
+
+
+def _pid_alive(pid):
+    if os.name == 'nt':
+        # os.kill(pid, 0) is not a probe on Windows: it sends Ctrl-C to the console group
+        return _pid_alive_windows(pid)
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        return True   # no permission to signal it, or cannot tell: leave the lease to expire
+    return True
+
+
+def _pid_alive_windows(pid):
+    import ctypes
+    kernel32 = ctypes.windll.kernel32
+    handle = kernel32.OpenProcess(PROCESS_QUERY_LIMITED_INFORMATION, False, pid)
+    if not handle:
+        return kernel32.GetLastError() == ERROR_ACCESS_DENIED   # exists, but not ours to open
+    try:
+        code = ctypes.c_ulong()
+        if not kernel32.GetExitCodeProcess(handle, ctypes.byref(code)):
+            return True
+        return code.value == STILL_ACTIVE
+    finally:
+        kernel32.CloseHandle(handle)
+
+
+def _owner_gone(owner):
+    host, _, rest = (owner or '').partition(':')
+    pid = rest.partition(':')[0]
+    return host == socket.gethostname() and pid.isdigit() and not _pid_alive(int(pid))
+
+
+class JobQueue:
+    def __init__(self, path, max_queued=100, max_attempts=3, lease_s=30.0, aging=1.0):
+        self.path = path
+        self.max_queued = max_queued
+        self.max_attempts = max_attempts
+        self.lease_s = lease_s
+        self.aging = aging
+        self.local = threading.local()
+        db = self._db()
+        db.executescript(SCHEMA)
+        # Databases from before the cost and budget columns
+        have = {row['name'] for row in db.execute("PRAGMA table_info(jobs)")}
+        for column, kind in (('frames', 'INTEGER'), ('fps', 'REAL'), ('width', 'INTEGER'), ('height', 'INTEGER'),
+                             ('duration_s', 'REAL'), ('work', 'REAL'), ('estimate_s', 'REAL'),
+                             ('budget_s', 'REAL')):
+            if column not in have:
+                db.execute(f"ALTER TABLE jobs ADD COLUMN {column} {kind}")
+
+    def _db(self):
+        db = getattr(self.local, 'db', None)
+        if db is None:
+            db = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            db.row_factory = sqlite3.Row
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            self.local.db = db
+        return db
+
+    def _write(self, fn):
+        """Run ``fn(db)`` in one write transaction."""
+        db = self._db()
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            result = fn(db)
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+        db.execute("COMMIT")
+        return result
+
+    @staticmethod
+    def _row(row):
+        if row is None:
+            return None
+        job = dict(row)
+        for key in JSON_FIELDS:
+            job[key] = json.loads(job[key]) if job[key] else None
+        return job
+
+    # Queued jobs in the order claim() takes them; ``now`` drops out of the comparison
+    PRIORITY = f"(COALESCE(estimate_s, {DEFAULT_ESTIMATE_S}) + ? * enqueued_at)"
+
+    # -------- Cost estimates --------
+    def seconds_per_unit(self, exercise=None, mode=None):
+        """Median run time per work unit of the last finished jobs of this exercise and mode.
+
+        Falls back to all finished jobs, then to DEFAULT_S_PER_UNIT.
+        """
+        db = self._db()
+        for where, args in (("exercise IS ? AND mode IS ?", (exercise, mode)), ("1", ())):
+            rows = db.execute(
+                f"SELECT (finished_at - started_at) / work FROM jobs WHERE state = 'done' AND work > 0"
+                f" AND {where} ORDER BY finished_at DESC LIMIT ?", (*args, LEARN_FROM)).fetchall()
+            rate = _median([r[0] for r in rows if r[0] and r[0] > 0])
+            if rate and len(rows) >= 3:
+                return rate
+        return DEFAULT_S_PER_UNIT
+
+    def estimate(self, exercise=None, mode=None, work=None):
+        """Expected run time in seconds of a job with ``work`` units (None: not probed)."""
+        if work:
+            return work * self.seconds_per_unit(exercise, mode)
+        rows = self._db().execute(
+            "SELECT finished_at - started_at FROM jobs WHERE state = 'done' AND exercise IS ? AND mode IS ?"
+            " ORDER BY finished_at DESC LIMIT ?", (exercise, mode, LEARN_FROM)).fetchall()
+        return _median([r[0] for r in rows if r[0]]) or DEFAULT_ESTIMATE_S
+
+    # -------- Producer side --------
+    def submit(self, job, probe=None):
+        """Queue ``job`` (a dict with at least ``id``); returns the stored row.
+
+        ``probe`` is video_probe.probe_video() of the job's video, for the cost estimate.
+        """
+        probe = probe or {}
+        work = work_units(probe.get('frames'), probe.get('width'), probe.get('height'))
+        estimate = round(self.estimate(job.get('exercise'), job.get('mode'), work), 3)
+
+        def insert(db):
+            if db.execute("SELECT 1 FROM jobs WHERE id = ?", (job['id'],)).fetchone():
+                raise DuplicateJob(f"Job {job['id']} already exists")
+            (waiting,) = db.execute("SELECT COUNT(*) FROM jobs WHERE state = 'queued'").fetchone()
+            if self.max_queued and waiting >= self.max_queued:
+                raise QueueFull(f"{waiting} jobs already waiting")
+            db.execute(
+                "INSERT INTO jobs (id, state, exercise, mode, activity, video, script, output_dir, output_id,"
+                " env, cleanup, max_attempts, enqueued_at, frames, fps, width, height, duration_s, work, estimate_s,"
+                " budget_s) VALUES (?, 'queued', ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (job['id'], job.get('exercise'), job.get('mode'), job.get('activity'), job.get('video'),
+                 job.get('script'), job.get('output_dir'), job.get('output_id'),
+                 json.dumps(job.get('env') or {}), json.dumps(job.get('cleanup') or []),
+                 job.get('max_attempts') or self.max_attempts, job.get('enqueued_at') or time.time(),
+                 *(probe.get(key) for key in PROBE_FIELDS), work, estimate, job.get('budget_s')),
+            )
+        self._write(insert)
+        return self.get(job['id'])
+
+    def get(self, job_id):
+        return self._row(self._db().execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone())
+
+    def position(self, job_id):
+        """Jobs ahead of a queued job (0 = next), or None when it is not queued."""
+        ahead = self._ahead(job_id)
+        return len(ahead) if ahead is not None else None
+
+    def _ahead(self, job_id):
+        """Estimates of the queued jobs claim() takes before ``job_id``; None when it is not queued."""
+        db = self._db()
+        mine = db.execute(f"SELECT {self.PRIORITY} AS p, enqueued_at FROM jobs WHERE id = ? AND state = 'queued'",
+                          (self.aging, job_id)).fetchone()
+        if mine is None:
+            return None
+        rows = db.execute(
+            f"SELECT estimate_s FROM jobs WHERE state = 'queued' AND id != ? AND ({self.PRIORITY} < ?"
+            f" OR ({self.PRIORITY} = ? AND enqueued_at < ?))",
+            (job_id, self.aging, mine['p'], self.aging, mine['p'], mine['enqueued_at'])).fetchall()
+        return [r[0] or 0 for r in rows]
+
+    def eta(self, job_id, slots=1):
+        """Seconds until ``job_id`` is expected to finish, with ``slots`` jobs running at once.
+
+        Queued: the running jobs' remaining estimates plus the estimates ahead
+        of it, spread over the slots, plus its own. None once it has ended.
+        """
+        job = self.get(job_id)
+        if job is None or job['state'] not in ('queued', 'running'):
+            return None
+        now = time.time()
+        if job['state'] == 'running':
+            return round(max((job['estimate_s'] or 0) - (now - job['started_at']), 0), 1)
+        running = self._db().execute(
+            "SELECT estimate_s, started_at FROM jobs WHERE state = 'running'").fetchall()
+        busy = sum(max((r['estimate_s'] or 0) - (now - r['started_at']), 0) for r in running)
+        ahead = sum(self._ahead(job_id) or [])
+        return round((busy + ahead) / max(slots, 1) + (job['estimate_s'] or 0), 1)
+
+    def counts(self):
+        rows = self._db().execute("SELECT state, COUNT(*) FROM jobs GROUP BY state").fetchall()
+        return {state: 0 for state in STATES} | {state: n for state, n in rows}
+
+    # -------- Runner side --------
+    def claim(self, owner):
+        """Lease the next queued job to ``owner``; None when the queue is empty."""
+        def take(db):
+            row = db.execute(
+                f"SELECT id FROM jobs WHERE state = 'queued' ORDER BY {self.PRIORITY}, enqueued_at LIMIT 1",
+                (self.aging,)).fetchone()
+            if row is None:
+                return None
+            now = time.time()
+            db.execute(
+                "UPDATE jobs SET state = 'running', attempts = attempts + 1, lease_owner = ?,"
+                " lease_expires = ?, heartbeat_at = ?, started_at = ?, error = NULL WHERE id = ?",
+                (owner, now + self.lease_s, now, now, row['id']),
+            )
+            return row['id']
+        job_id = self._write(take)
+        return self.get(job_id) if job_id else None
+
+    def heartbeat(self, job_id, owner):
+        """Renew the lease; False when ``owner`` no longer holds it."""
+        now = time.time()
+        cur = self._write(lambda db: db.execute(
+            "UPDATE jobs SET lease_expires = ?, heartbeat_at = ? WHERE id = ? AND state = 'running'"
+            " AND lease_owner = ?", (now + self.lease_s, now, job_id, owner)))
+        return cur.rowcount == 1
+
+    def complete(self, job_id, owner, report=None, state='done', error=None):
+        """End a running job for good: done, or cancelled / expired with what it got through."""
+        cur = self._write(lambda db: db.execute(
+            "UPDATE jobs SET state = ?, finished_at = ?, report = ?, error = ?, lease_owner = NULL,"
+            " lease_expires = NULL WHERE id = ? AND state = 'running' AND lease_owner = ?",
+            (state, time.time(), json.dumps(report) if report else None, error, job_id, owner)))
+        return cur.rowcount == 1
+
+    def cancel(self, job_id, error="Cancelled"):
+        """Cancel a queued job; returns the job's state afterwards (None when unknown).
+
+        A running job is left to its runner, which stops it and records 'cancelled'.
+        """
+        def update(db):
+            row = db.execute("SELECT state FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            if row is None:
+                return None
+            if row['state'] != 'queued':
+                return row['state']
+            db.execute("UPDATE jobs SET state = 'cancelled', error = ?, finished_at = ? WHERE id = ?",
+                       (error, time.time(), job_id))
+            return 'cancelled'
+        return self._write(update)
+
+    def fail(self, job_id, owner, error, retry=True):
+        """Record a failed attempt; returns the new state, or None when the lease was lost."""
+        def update(db):
+            row = db.execute("SELECT attempts, max_attempts FROM jobs WHERE id = ? AND state = 'running'"
+                             " AND lease_owner = ?", (job_id, owner)).fetchone()
+            if row is None:
+                return None
+            state = 'queued' if retry and row['attempts'] < row['max_attempts'] else 'failed'
+            db.execute(
+                "UPDATE jobs SET state = ?, error = ?, lease_owner = NULL, lease_expires = NULL,"
+                " finished_at = ? WHERE id = ?",
+                (state, str(error), time.time() if state == 'failed' else None, job_id))
+            return state
+        return self._write(update)
+
+    def release(self, owner):
+        """Give every lease of ``owner`` back without counting the attempt (clean shutdown)."""
+        cur = self._write(lambda db: db.execute(
+            "UPDATE jobs SET state = 'queued', attempts = MAX(attempts - 1, 0), lease_owner = NULL,"
+            " lease_expires = NULL WHERE state = 'running' AND lease_owner = ?", (owner,)))
+        return cur.rowcount
+
+    def requeue_expired(self):
+        """Put back jobs whose lease lapsed or whose local owner died; [(id, new state)]."""
+        def sweep(db):
+            now = time.time()
+            rows = db.execute(
+                "SELECT id, lease_owner, lease_expires, attempts, max_attempts FROM jobs"
+                " WHERE state = 'running'").fetchall()
+            changed = []
+            for row in rows:
+                if row['lease_expires'] >= now and not _owner_gone(row['lease_owner']):
+                    continue
+                state = 'queued' if row['attempts'] < row['max_attempts'] else 'failed'
+                db.execute(
+                    "UPDATE jobs SET state = ?, error = ?, lease_owner = NULL, lease_expires = NULL,"
+                    " finished_at = ? WHERE id = ?",
+                    (state, f"Lease of {row['lease_owner']} lost", now if state == 'failed' else None, row['id']))
+                changed.append((row['id'], state))
+            return changed
+        return self._write(sweep)
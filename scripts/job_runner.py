@@ -0,0 +1,355 @@
+"""Runs queued analysis jobs (job_queue.py) through long-lived workers.
+
+The server starts one runner and talks to it in JSON lines, commands on
+stdin and replies plus job events on stdout:
+
+  -> {"op": "submit", "req": 1, "job": {"id": ..., "exercise": ..., "video": ..., ...}}
+  <- {"op": "submitted", "req": 1, "id": ..., "position": 3, "estimate_s": 12.5, "eta_s": 40.1}
+  <- {"op": "rejected", "req": 1, "id": ..., "reason": "full" | "duplicate", "error": ...}
+  -> {"op": "get", "req": 2, "id": ...}
+  <- {"op": "job", "req": 2, "id": ..., "job": {...row...} | null, "position": ..., "eta_s": ...}
+  -> {"op": "cancel", "req": 3, "id": ...}
+  <- {"op": "cancel", "req": 3, "id": ..., "state": "cancelled" | "running" | ... | null}
+  <- {"event": "running" | "retrying" | "done" | "failed" | "cancelled" | "expired", "id": ...,
+      "job": {...row...}}
+
+Up to JOB_SLOTS jobs run at once, each slot with its own
+worker.WorkerProcess (recycled at the WORKER_* limits), so a burst of
+uploads waits in the queue instead of starting a process each. A running
+job's lease is renewed every third of JOB_LEASE_S; if the runner dies the
+leases lapse and the next runner requeues the jobs, and when stdin closes
+(the server stopping) it stops its workers and gives the jobs back at once.
+
+Each upload is probed on submit (video_probe.py: frame count, fps,
+resolution) so the queue can estimate its cost and run short clips first;
+``position`` and ``eta_s`` (seconds until it should be finished) follow the
+queue's order.
+
+A job runs for at most its ``budget_s`` (default JOB_BUDGET_S) of wall-clock
+time. Cancelling a running job, or running out of budget, makes the
+analyzer stop at its next frame and save what it has (job_control.py); the
+job ends 'cancelled' or 'expired' with those partial results. A worker that
+does not answer within JOB_KILL_GRACE_S of that (a stuck decode) is killed.
+A cancelled queued job never starts.
+
+A job whose worker died is rerun from the checkpoint the worker kept of
+it (checkpoint.py), not from the start.
+
+With JOB_NODE_PORT set the runner also serves its queue over HTTP to
+analysis nodes on other machines (node_service.py, node_worker.py); their
+jobs report the same events, and their slots count into ``eta_s``.
+JOB_SLOTS=0 leaves all the work to nodes.
+
+Each slot's worker gets its share of the cores as a thread budget
+(thread_budget.py), so concurrent jobs do not each size their thread pools
+for the whole machine.
+
+With POSE_BACKEND=tflite/onnx the runner loads the pose models once and its
+workers send their frames to it (pose_service.py), so concurrent jobs share
+inference batches; that inference runs in the runner, on POSE_NUM_THREADS.
+
+A job that ends for good removes the files listed in its ``cleanup`` (the
+upload, the rewritten script); a job that failed for good, or was cancelled
+before it started, also removes its output directory, so nothing is left
+behind for a result that never comes.
+
+Environment:
+  JOB_DB            SQLite file (default jobs.db)
+  JOB_SLOTS         jobs run at once here (default: half the cores, at least 1)
+  JOB_MAX_QUEUED    waiting jobs before submits are rejected (default 100)
+  JOB_MAX_ATTEMPTS  tries per job, lost leases included (default 3)
+  JOB_LEASE_S       lease length in seconds (default 30)
+  JOB_BUDGET_S      wall-clock budget per job in seconds (default 1200, 0 = none)
+  JOB_KILL_GRACE_S  how long a stopped job may take to answer before its worker
+                    is killed (default 30)
+  JOB_AGING         seconds of estimate a job gains per second waited (default 1,
+                    0 = shortest first only)
+  JOB_NODE_PORT     serve the queue to remote nodes on this port (see node_service.py)
+  JOB_THREADS       CPU threads per slot (default: an even share; see thread_budget.py)
+  JOB_PIN_CPUS      1 = pin each slot to its own cores (default 0)
+  JOB_POSE_SERVICE  0 = each worker loads its own tflite/onnx models (see pose_service.py)
+"""
+import json
+import os
+import shutil
+import sys
+import threading
+import time
+
+import checkpoint
+import pose_service
+import thread_budget
+from job_queue import DuplicateJob, JobQueue, QueueFull, make_owner
+from video_probe import probe_video
+from worker import worker_from_env
+
+SWEEP_EVERY_S = 5.0
+
+
+class JobRunner:
+    def __init__(self, queue, slots, out=None, budget_s=0, kill_grace_s=30.0, threads=None, pin=False):
+        self.queue = queue
+        self.slots = slots
+        self.cpu_threads = threads   # per slot; None = an even share of the cores, 0 = no budget
+        self.pin = pin
+        self.budget_s = budget_s
+        self.kill_grace_s = kill_grace_s
+        self.owner = make_owner()
+        self.out = out or sys.stdout
+        self.out_lock = threading.Lock()
+        self.wake = threading.Event()
+        self.stopping = threading.Event()
+        self.workers = []
+        self.threads = []
+        self.active = {}          # job id -> worker running it
+        self.active_lock = threading.Lock()
+        self.cancelling = set()   # running jobs asked to stop
+        self.overran = set()      # running jobs whose worker was killed past the budget
+        self.nodes = None         # node_service.NodeService serving remote nodes, if any
+        self.pose_service = None  # pose_service.PoseService the workers infer through, if any
+
+    def send(self, msg):
+        with self.out_lock:
+            self.out.write(json.dumps(msg, default=str) + "\n")
+            self.out.flush()
+
+    def capacity(self):
+        """Jobs that can run at once: the local slots plus those of live remote nodes."""
+        return self.slots + (self.nodes.remote_slots() if self.nodes is not None else 0)
+
+    def event(self, name, job_id, **extra):
+        self.send({'event': name, 'id': job_id, 'job': self.queue.get(job_id), **extra})
+
+    # -------- Commands --------
+    def handle(self, msg):
+        op, req = msg.get('op'), msg.get('req')
+        if op == 'submit':
+            job = msg.get('job') or {}
+            try:
+                queued = self.queue.submit(job, probe=probe_video(job['video']) if job.get('video') else None)
+            except QueueFull as e:
+                return self.send({'op': 'rejected', 'req': req, 'id': job.get('id'), 'reason': 'full', 'error': str(e)})
+            except DuplicateJob as e:
+                return self.send({'op': 'rejected', 'req': req, 'id': job.get('id'), 'reason': 'duplicate',
+                                  'error': str(e)})
+            self.send({'op': 'submitted', 'req': req, 'id': job['id'], 'position': self.queue.position(job['id']),
+                       'estimate_s': queued['estimate_s'], 'eta_s': self.queue.eta(job['id'], self.capacity())})
+            self.wake.set()
+        elif op == 'get':
+            self.send({'op': 'job', 'req': req, 'id': msg.get('id'), 'job': self.queue.get(msg.get('id')),
+                       'position': self.queue.position(msg.get('id')),
+                       'eta_s': self.queue.eta(msg.get('id'), self.capacity())})
+        elif op == 'cancel':
+            self.send({'op': 'cancel', 'req': req, 'id': msg.get('id'), 'state': self.cancel(msg.get('id'))})
+        else:
+            self.send({'op': 'error', 'req': req, 'error': f"Unknown op: {op}"})
+
+    def cancel(self, job_id):
+        state = self.queue.cancel(job_id, "Cancelled before it started")
+        if state == 'cancelled':
+            self._finish(self.queue.get(job_id), remove_output=True)
+            self.event('cancelled', job_id)
+        elif state == 'running':
+            # Under the lock so the signal cannot reach the worker's next job
+            with self.active_lock:
+                worker = self.active.get(job_id)
+                if worker is None and (self.queue.get(job_id) or {}).get('lease_owner') == self.owner:
+                    self.cancelling.add(job_id)   # claimed by a slot, not started: run_one drops it
+                elif worker is None and self.nodes is not None:
+                    self.nodes.request_cancel(job_id)   # on a remote node: told in its next heartbeat
+                elif worker is not None and job_id not in self.cancelling:
+                    self.cancelling.add(job_id)
+                    worker.interrupt()
+                    self._kill_later(job_id, worker, self.kill_grace_s)
+        return state
+
+    # -------- Slots --------
+    def _heartbeat(self, job_id, worker, done):
+        every = self.queue.lease_s / 3
+        while not done.wait(every):
+            if not self.queue.heartbeat(job_id, self.owner):
+                # Someone else holds the job now; this run's result would be discarded
+                worker.kill()
+                return
+
+    def _kill_later(self, job_id, worker, delay):
+        def overrun():
+            if self.active.get(job_id) is worker:
+                self.overran.add(job_id)
+                worker.kill()
+        timer = threading.Timer(delay, overrun)
+        timer.daemon = True
+        timer.start()
+        return timer
+
+    def _finish(self, job, remove_output=False):
+        for path in job.get('cleanup') or []:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        if remove_output and job.get('output_dir'):
+            shutil.rmtree(job['output_dir'], ignore_errors=True)
+        elif job.get('output_dir'):
+            # Kept for a rerun after a crash; a job that has ended will not be rerun
+            checkpoint.discard(os.path.join(job['output_dir'], checkpoint.DIRNAME))
+
+    def run_one(self, job, worker):
+        job_id = job['id']
+        budget = job['budget_s'] if job['budget_s'] is not None else self.budget_s
+        with self.active_lock:
+            cancelled = job_id in self.cancelling   # between the claim and here
+            if cancelled:
+                self.cancelling.discard(job_id)
+            else:
+                self.active[job_id] = worker
+        if cancelled:
+            if self.queue.complete(job_id, self.owner, None, state='cancelled', error="Cancelled"):
+                self.settle(job, 'cancelled', 0.0)
+            return
+        self.event('running', job_id)
+        started = time.monotonic()
+        done = threading.Event()
+        beat = threading.Thread(target=self._heartbeat, args=(job_id, worker, done), daemon=True)
+        beat.start()
+        # The analyzer stops itself at the budget; this is for one that cannot
+        deadline = self._kill_later(job_id, worker, budget + self.kill_grace_s) if budget else None
+        try:
+            reply = worker.run({'id': job_id, 'exercise': job['exercise'], 'mode': job['mode'] or 'script',
+                                'video': job['video'], 'script': job['script'], 'output_dir': job['output_dir'],
+                                'env': job['env'] or {}, 'budget_s': budget or 0})
+        finally:
+            done.set()
+            if deadline:
+                deadline.cancel()
+            with self.active_lock:
+                self.active.pop(job_id, None)
+                cancelled = job_id in self.cancelling
+                self.cancelling.discard(job_id)
+        killed = job_id in self.overran
+        self.overran.discard(job_id)
+        if self.stopping.is_set():
+            return   # released on shutdown, not this job's fault
+        duration = round(time.monotonic() - started, 3)
+        report = reply.get('report') if reply.get('ok') else None
+        stopped = (report or {}).get('stopped')
+
+        if cancelled or stopped == 'cancelled':
+            if self.queue.complete(job_id, self.owner, report, state='cancelled', error="Cancelled"):
+                self.settle(job, 'cancelled', duration)
+            return
+        if stopped == 'timeout' or (killed and budget):
+            error = f"Ran past its {budget:g} s budget" + ("; worker killed" if killed else "")
+            if self.queue.complete(job_id, self.owner, report, state='expired', error=error):
+                self.settle(job, 'expired', duration)
+            return
+        if reply.get('ok'):
+            if self.queue.complete(job_id, self.owner, report):
+                self.settle(job, 'done', duration)
+            return
+        state = self.queue.fail(job_id, self.owner, reply.get('error') or 'failed')
+        if state:
+            self.settle(job, 'retrying' if state == 'queued' else state, duration)
+
+    def settle(self, job, outcome, duration=None):
+        """Clean up after a recorded attempt and report it: done, cancelled, expired, failed or retrying."""
+        if outcome != 'retrying':
+            self._finish(job, remove_output=outcome == 'failed')
+        self.event(outcome, job['id'], **({} if duration is None else {'duration_s': duration}))
+
+    def slot(self, worker):
+        while not self.stopping.is_set():
+            job = self.queue.claim(self.owner)
+            if job is None:
+                self.wake.wait(1.0)
+                self.wake.clear()
+                continue
+            self.run_one(job, worker)
+        worker.close()
+
+    def sweep(self):
+        while not self.stopping.wait(SWEEP_EVERY_S):
+            for job_id, state in self.queue.requeue_expired():
+                self.settle(self.queue.get(job_id), 'retrying' if state == 'queued' else state)
+                self.wake.set()
+
+    def start(self):
+        for job_id, state in self.queue.requeue_expired():
+            if state == 'failed':
+                self._finish(self.queue.get(job_id), remove_output=True)
+        log = sys.stderr
+        if self.cpu_threads == 0:
+            budgets = [None] * self.slots
+        else:
+            budgets = [thread_budget.budget_env(cpus, self.pin)
+                       for cpus in thread_budget.allot(self.slots, self.cpu_threads)]
+        self.pose_service = pose_service.service_from_env()
+        if self.pose_service is not None:
+            self.pose_service.start()
+            budgets = [{**(env or {}), **self.pose_service.env()} for env in budgets]
+        for env in budgets:
+            worker = worker_from_env(stderr=log, env=env)
+            self.workers.append(worker)
+            self.threads.append(threading.Thread(target=self.slot, args=(worker,), daemon=True))
+        self.threads.append(threading.Thread(target=self.sweep, daemon=True))
+        for t in self.threads:
+            t.start()
+
+    def stop(self):
+        self.stopping.set()
+        self.wake.set()
+        for worker in self.workers:
+            worker.kill()
+        for t in self.threads:
+            t.join(timeout=10)
+        if self.pose_service is not None:
+            self.pose_service.stop()
+        return self.queue.release(self.owner)
+
+
+def queue_from_env():
+    return JobQueue(
+        os.environ.get("JOB_DB", "jobs.db"),
+        max_queued=int(os.environ.get("JOB_MAX_QUEUED", "100")),
+        max_attempts=int(os.environ.get("JOB_MAX_ATTEMPTS", "3")),
+        lease_s=float(os.environ.get("JOB_LEASE_S", "30")),
+        aging=float(os.environ.get("JOB_AGING", "1")),
+    )
+
+
+def runner_from_env(queue, slots, out=None):
+    threads = os.environ.get("JOB_THREADS", "")
+    return JobRunner(queue, slots, out=out, budget_s=float(os.environ.get("JOB_BUDGET_S", "1200")),
+                     kill_grace_s=float(os.environ.get("JOB_KILL_GRACE_S", "30")),
+                     threads=int(threads) if threads.strip() else None,
+                     pin=os.environ.get("JOB_PIN_CPUS") == "1")
+
+
+if __name__ == "__main__":
+    from node_service import service_from_env
+
+    queue = queue_from_env()
+    slots = os.environ.get("JOB_SLOTS", "")
+    slots = int(slots) if slots.strip() else max(1, (os.cpu_count() or 2) // 2)
+    runner = runner_from_env(queue, slots)
+    try:
+        runner.nodes = service_from_env(runner)
+        runner.start()   # loads the pose service's models, if any
+    except (ValueError, RuntimeError) as e:
+        sys.exit(str(e))
+    if runner.nodes is not None:
+        runner.nodes.start()
+    print(f"Job runner {runner.owner}: {slots} slot(s)"
+          f"{f', nodes on port {runner.nodes.port}' if runner.nodes else ''}, queue {queue.counts()}",
+          file=sys.stderr, flush=True)
+    for line in sys.stdin:
+        if not line.strip():
+            continue
+        try:
+            runner.handle(json.loads(line))
+        except ValueError as e:
+            runner.send({'op': 'error', 'error': f"Bad command: {e}"})
+    if runner.nodes is not None:
+        runner.nodes.stop()
+    released = runner.stop()
+    print(f"Job runner stopped, {released} job(s) back in the queue", file=sys.stderr, flush=True)
@@ -0,0 +1,72 @@
+"""Ballistic fit of the mid-hip trajectory during a jump.
+
+Once the feet leave the ground the hip follows a parabola, so a least-squares
+fit of y(t) = a*t^2 + b*t + c to the flight samples gives the apex and the
+takeoff/landing crossings with sub-frame precision. Three samples are enough,
+which lets the analyzer run Pose on every 2nd-4th frame only. Image y grows
+downward, so a ballistic flight has a > 0.
+"""
+import numpy as np
+
+
+def flight_samples(samples, level):
+    """Longest run of consecutive (t, y) samples above ``level`` (y < level)."""
+    best, run = [], []
+    for t, y in samples:
+        if y < level:
+            run.append((t, y))
+        else:
+            if len(run) > len(best):
+                best = run
+            run = []
+    return run if len(run) > len(best) else best
+
+
+def fit_flight(ts, ys, level, gravity_px=None):
+    """Fit the flight parabola and solve it against the takeoff ``level``.
+
+    Returns a dict with peak_time, peak_y, takeoff_time, landing_time,
+    flight_time and rms residual, or None when the samples do not describe
+    a ballistic arc. ``gravity_px`` (px/s^2) pins the curvature when fewer
+    than three samples are available or the free fit is not concave.
+    """
+    ts = np.asarray(ts, dtype=float)
+    ys = np.asarray(ys, dtype=float)
+    if len(ts) < 2:
+        return None
+    t0 = ts[0]
+    tt = ts - t0  # keep the normal equations well conditioned
+
+    coeffs = None
+    if len(ts) >= 3:
+        a, b, c = np.polyfit(tt, ys, 2)
+        if a > 0:
+            coeffs = (a, b, c)
+    if coeffs is None and gravity_px:
+        a = gravity_px / 2.0
+        A = np.stack([tt, np.ones_like(tt)], axis=1)
+        (b, c), *_ = np.linalg.lstsq(A, ys - a * tt ** 2, rcond=None)
+        coeffs = (a, b, c)
+    if coeffs is None:
+        return None
+    a, b, c = coeffs
+
+    t_peak = -b / (2 * a)
+    y_peak = c - b * b / (4 * a)
+    disc = b * b - 4 * a * (c - level)
+    if disc <= 0 or y_peak >= level:
+        return None
+    root = np.sqrt(disc)
+    t_up = (-b - root) / (2 * a)
+    t_down = (-b + root) / (2 * a)
+    residual = ys - (a * tt ** 2 + b * tt + c)
+
+    return {
+        'peak_time': t0 + t_peak,
+        'peak_y': y_peak,
+        'takeoff_time': t0 + t_up,
+        'landing_time': t0 + t_down,
+        'flight_time': t_down - t_up,
+        'rms_px': float(np.sqrt(np.mean(residual ** 2))),
+        'points': len(ts),
+    }
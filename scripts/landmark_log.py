@@ -0,0 +1,133 @@
+"""Compact per-frame landmark log of a live session, for replay.
+
+A log holds exactly what the counter was fed: the frame time and the 33
+landmarks (or no pose) of every frame that reached ``counter.update``, so a
+replay through the same counter reproduces the session rep for rep.
+
+Layout (little endian):
+
+  b'TTLM' version:u8 len:u32 header-json     exercise, width, height, counters, session, ...
+  b'F' t:f64 present:u8 [33 x (x, y, z, visibility):f32]   one per frame
+  b'E' len:u32 json                           at the end: count and rows digest
+
+Landmarks are MediaPipe's float32 values, stored as they are (528 bytes a
+pose frame, 10 without). A log cut short by a crash, gzip-compressed or not,
+reads up to its last whole frame. Names ending in ``.gz`` are gzip-compressed.
+"""
+import gzip
+import hashlib
+import json
+import struct
+
+import numpy as np
+
+from counters import NUM_LANDMARKS, landmarks_from_rows
+
+MAGIC = b'TTLM'
+VERSION = 1
+FRAME = struct.Struct('<dB')
+LENGTH = struct.Struct('<I')
+POSE_BYTES = NUM_LANDMARKS * 4 * 4
+SUFFIX = '_landmarks.ttlm'
+
+
+def rows_digest(rows):
+    """Short hash of a counter's rows; equal digests mean an identical log."""
+    text = json.dumps(rows, sort_keys=True, default=str)
+    return hashlib.sha1(text.encode()).hexdigest()[:16]
+
+
+def _open(path, mode):
+    return gzip.open(path, mode) if path.endswith('.gz') else open(path, mode)
+
+
+class LandmarkLogWriter:
+    def __init__(self, path, **header):
+        self.path = path
+        self.file = _open(path, 'wb')
+        self.frames = 0
+        head = json.dumps({'version': VERSION, **header}).encode()
+        self.file.write(MAGIC + bytes([VERSION]) + LENGTH.pack(len(head)) + head)
+
+    def frame(self, t, lm):
+        """``lm``: MediaPipe landmark list (anything with x/y/z/visibility) or None."""
+        if lm is None:
+            self.file.write(b'F' + FRAME.pack(t, 0))
+        else:
+            pose = np.array([(p.x, p.y, p.z, p.visibility) for p in lm[:NUM_LANDMARKS]], dtype='<f4')
+            self.file.write(b'F' + FRAME.pack(t, 1) + pose.tobytes())
+        self.frames += 1
+
+    def close(self, **end):
+        if self.file is None:
+            return
+        if end:
+            body = json.dumps({'frames': self.frames, **end}, default=str).encode()
+            self.file.write(b'E' + LENGTH.pack(len(body)) + body)
+        self.file.close()
+        self.file = None
+
+
+class LandmarkLog:
+    """Reads a log: ``header``, then ``frames()`` and, once read, ``end``."""
+
+    def __init__(self, path):
+        self.path = path
+        self.file = _open(path, 'rb')
+        try:
+            self.header = self._header()
+        except BaseException:
+            self.file.close()
+            raise
+        self.end = None
+
+    def _header(self):
+        read = self.file.read
+        try:
+            magic, version = read(4), read(1)[0]
+            if magic != MAGIC:
+                raise ValueError(f"{self.path} is not a landmark log")
+            if version > VERSION:
+                raise ValueError(f"{self.path}: log version {version} is newer than this reader")
+            (size,) = LENGTH.unpack(read(LENGTH.size))
+            return json.loads(read(size))
+        except (EOFError, IndexError, struct.error, json.JSONDecodeError) as e:
+            raise ValueError(f"{self.path}: header cut short") from e
+
+    def frames(self):
+        """(t, landmark list or None) per frame, in recorded order."""
+        try:
+            yield from self._frames()
+        except EOFError:
+            return   # a .gz cut short: gzip raises instead of returning a short read
+
+    def _frames(self):
+        read = self.file.read
+        while True:
+            kind = read(1)
+            if kind == b'F':
+                head = read(FRAME.size)
+                if len(head) < FRAME.size:
+                    return
+                t, present = FRAME.unpack(head)
+                if not present:
+                    yield t, None
+                    continue
+                pose = read(POSE_BYTES)
+                if len(pose) < POSE_BYTES:
+                    return
+                yield t, landmarks_from_rows(np.frombuffer(pose, dtype='<f4').reshape(NUM_LANDMARKS, 4).tolist())
+            elif kind == b'E':
+                head = read(LENGTH.size)
+                if len(head) < LENGTH.size:
+                    return
+                body = read(LENGTH.unpack(head)[0])
+                try:
+                    self.end = json.loads(body)
+                except ValueError:
+                    return
+            else:
+                return
+
+    def close(self):
+        self.file.close()
@@ -0,0 +1,235 @@
+"""Count reps from landmarks streamed by the client instead of video.
+
+Clients that already run the pose model on-device send one message per frame
+and the server only advances the exercise counter, so a single asyncio
+process can hold thousands of sessions. One connection is one session; every
+message is a JSON object:
+
+  -> {"type": "start", "exercise": "pushup", "width": 1280, "height": 720,
+      "counters": "live" | "video", "session": "optional-id"}
+  <- {"type": "started", "session": ...}
+  -> {"t": 1.234, "landmarks": [[x, y, z, visibility] * 33]}   (null = no pose)
+  <- {"type": "rep", "t": ..., "count": ..., "rep": {...}}      (only on a rep)
+  -> {"type": "end"}
+  <- {"type": "summary", "count": ..., "frames": ..., "rows": [...]}
+
+Landmarks are MediaPipe-normalized. ``counters`` picks the state machines of
+the live scripts (counters.LIVE_COUNTERS, default) or of the video analyzers
+(counters.COUNTERS). ``t`` is the capture time in seconds; frames whose time
+goes backwards are dropped, and the arrival time is used when it is missing.
+
+Transports: newline-delimited JSON over TCP (always) and WebSocket (when the
+``websockets`` package is installed), one message per line / frame.
+
+Environment:
+  LANDMARK_HOST          bind address (default 127.0.0.1)
+  LANDMARK_WS_PORT       WebSocket port, 0 = off (default 8765)
+  LANDMARK_TCP_PORT      TCP port, 0 = off (default 8766)
+  LANDMARK_MAX_SESSIONS  concurrent sessions before new ones are refused (default 10000)
+  LANDMARK_OUTPUT_DIR    write {session}_{log_name}.csv when a session ends (default: off)
+"""
+import asyncio
+import itertools
+import json
+import os
+import time
+
+import pandas as pd
+
+from counters import COUNTERS, LIVE_COUNTERS, NUM_LANDMARKS, landmarks_from_rows
+
+MAX_LINE = 1 << 16
+BACKLOG = 4096   # the default of 100 resets clients when a whole class connects at once
+
+
+class ProtocolError(ValueError):
+    pass
+
+
+def _json_default(o):
+    return o.item() if hasattr(o, 'item') else str(o)
+
+
+def dumps(msg):
+    return json.dumps(msg, default=_json_default)
+
+
+class LandmarkSession:
+    """Transport-free session: feed() takes one decoded message, returns the replies."""
+
+    def __init__(self, session_id, exercise, width, height, counters='live', output_dir=None):
+        registry = LIVE_COUNTERS if counters == 'live' else COUNTERS
+        if exercise not in registry:
+            raise ProtocolError(f"Unknown exercise for {counters} counters: {exercise}")
+        self.id = session_id
+        self.counter = registry[exercise](width, height)
+        self.output_dir = output_dir
+        self.frames = 0
+        self.out_of_order = 0
+        self.last_t = None
+        self.started = time.monotonic()
+
+    @classmethod
+    def from_start(cls, msg, default_id, output_dir=None):
+        if msg.get('type') != 'start':
+            raise ProtocolError("First message must be {'type': 'start', ...}")
+        try:
+            width, height = int(msg['width']), int(msg['height'])
+        except (KeyError, TypeError, ValueError):
+            raise ProtocolError("start needs integer width and height")
+        return cls(str(msg.get('session') or default_id), msg.get('exercise'), width, height,
+                   msg.get('counters', 'live'), output_dir)
+
+    def feed(self, msg):
+        if msg.get('type') == 'end':
+            return [self.summary()]
+        t = msg.get('t')
+        t = float(t) if t is not None else time.monotonic() - self.started
+        if self.last_t is not None and t < self.last_t:
+            self.out_of_order += 1
+            return []
+        self.last_t = t
+
+        rows = msg.get('landmarks')
+        lm = None
+        if rows is not None:
+            if len(rows) < NUM_LANDMARKS:
+                raise ProtocolError(f"Expected {NUM_LANDMARKS} landmarks, got {len(rows)}")
+            lm = landmarks_from_rows(rows)
+        rep = self.counter.update(lm, t)
+        self.frames += 1
+        if rep is None or self.counter.per_frame_rows:
+            return []
+        return [{'type': 'rep', 't': round(t, 3), 'count': self.counter.count, 'rep': rep}]
+
+    def summary(self):
+        rows = self.counter.rows()
+        csv_file = None
+        if self.output_dir and rows:
+            csv_file = f"{self.id}_{self.counter.log_name}.csv"
+            pd.DataFrame(rows).to_csv(os.path.join(self.output_dir, csv_file), index=False)
+        return {
+            'type': 'summary',
+            'session': self.id,
+            'exercise': self.counter.exercise,
+            'count': self.counter.count,
+            'frames': self.frames,
+            'out_of_order': self.out_of_order,
+            'rows': rows,
+            'csv_file': csv_file,
+        }
+
+
+class LandmarkServer:
+    def __init__(self, max_sessions=10000, output_dir=None):
+        self.max_sessions = max_sessions
+        self.output_dir = output_dir
+        self.active = 0
+        self.ids = itertools.count(1)
+
+    async def serve(self, recv, send):
+        """Drive one connection; ``recv`` returns the next text message or None at EOF."""
+        if self.active >= self.max_sessions:
+            await send(dumps({'type': 'error', 'error': 'server full'}))
+            return
+        self.active += 1
+        session = None
+        try:
+            while True:
+                raw = await recv()
+                if raw is None:
+                    break
+                try:
+                    msg = json.loads(raw)
+                    if session is None:
+                        session = LandmarkSession.from_start(msg, f"lm{next(self.ids)}", self.output_dir)
+                        await send(dumps({'type': 'started', 'session': session.id}))
+                        continue
+                    replies = session.feed(msg)
+                except (ValueError, TypeError, AttributeError) as e:
+                    # A bad frame is reported and skipped; a bad start ends the connection
+                    await send(dumps({'type': 'error', 'error': str(e)}))
+                    if session is None:
+                        return
+                    continue
+                for reply in replies:
+                    await send(dumps(reply))
+                if msg.get('type') == 'end':
+                    session = None
+                    return
+        finally:
+            self.active -= 1
+
+    async def handle_tcp(self, reader, writer):
+        async def recv():
+            try:
+                line = await reader.readuntil(b"\n")
+            except asyncio.IncompleteReadError as e:
+                line = e.partial   # last line without a newline, or b"" at EOF
+            except asyncio.LimitOverrunError:
+                # Ends the connection, as max_size does for WebSocket clients
+                await send(dumps({'type': 'error', 'error': f"line longer than {MAX_LINE} bytes"}))
+                return None
+            return line.decode(errors='replace') if line else None
+
+        async def send(text):
+            writer.write(text.encode() + b"\n")
+            await writer.drain()
+
+        try:
+            await self.serve(recv, send)
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def handle_ws(self, ws, *_):
+        from websockets.exceptions import ConnectionClosed
+
+        async def recv():
+            try:
+                return await ws.recv()
+            except ConnectionClosed:
+                return None
+
+        try:
+            await self.serve(recv, ws.send)
+        except ConnectionClosed:
+            pass
+
+
+async def main(host, ws_port, tcp_port, server):
+    servers = []
+    if tcp_port:
+        servers.append(await asyncio.start_server(server.handle_tcp, host, tcp_port, limit=MAX_LINE, backlog=BACKLOG))
+        print(f"Landmark ingestion (TCP, JSON lines) on {host}:{tcp_port}", flush=True)
+    if ws_port:
+        try:
+            import websockets
+        except ImportError:
+            print("websockets not installed, WebSocket ingestion disabled", flush=True)
+        else:
+            servers.append(await websockets.serve(server.handle_ws, host, ws_port, max_size=MAX_LINE, backlog=BACKLOG))
+            print(f"Landmark ingestion (WebSocket) on ws://{host}:{ws_port}", flush=True)
+    if not servers:
+        raise SystemExit("No transport enabled")
+    await asyncio.gather(*(s.wait_closed() for s in servers))
+
+
+if __name__ == "__main__":
+    output_folder = os.environ.get("LANDMARK_OUTPUT_DIR")
+    if output_folder:
+        os.makedirs(output_folder, exist_ok=True)
+    landmark_server = LandmarkServer(
+        max_sessions=int(os.environ.get("LANDMARK_MAX_SESSIONS", "10000")),
+        output_dir=output_folder,
+    )
+    try:
+        asyncio.run(main(
+            os.environ.get("LANDMARK_HOST", "127.0.0.1"),
+            int(os.environ.get("LANDMARK_WS_PORT", "8765")),
+            int(os.environ.get("LANDMARK_TCP_PORT", "8766")),
+            landmark_server,
+        ))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,87 @@
+"""Per-stage latency statistics for live sessions.
+
+Every processed frame carries the monotonic time the reader thread got it
+from the source, and the session records how long each stage took:
+
+  handoff    waiting in the hand-off slot until a worker picked the frame up
+  inference  resize, colour conversion and the pose model
+  counter    the exercise state machine
+  emit       writing the rep event (rep frames only)
+  total      read to done, i.e. how old the frame is when its result is out
+
+Time spent in the camera or the sender before the read is not included.
+
+Each stage keeps a rolling window for the once-a-second status events and a
+log-bucketed histogram of the whole session for the final summary, so memory
+stays constant however long the session runs.
+"""
+import math
+from collections import deque
+
+STAGES = ('handoff', 'inference', 'counter', 'emit', 'total')
+PERCENTILES = (50, 95, 99)
+
+
+class LatencyHistogram:
+    """Whole-run histogram with geometric buckets (about 2.5% resolution)."""
+    MIN_MS = 0.01
+    RATIO = 1.05
+    BUCKETS = 400   # 0.01 ms .. about 3 minutes; anything slower lands in the last bucket
+
+    def __init__(self):
+        self.counts = [0] * self.BUCKETS
+        self.n = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, ms):
+        i = 0 if ms <= self.MIN_MS else int(math.log(ms / self.MIN_MS, self.RATIO)) + 1
+        self.counts[min(i, self.BUCKETS - 1)] += 1
+        self.n += 1
+        self.total += ms
+        self.max = max(self.max, ms)
+
+    def percentile(self, p):
+        if not self.n:
+            return None
+        rank = math.ceil(self.n * p / 100.0)
+        seen = 0
+        for i, c in enumerate(self.counts):
+            seen += c
+            if seen >= rank:
+                # Geometric middle of the bucket, capped by the largest value seen
+                return min(self.MIN_MS * self.RATIO ** (i - 0.5) if i else self.MIN_MS, self.max)
+        return self.max
+
+    def summary(self):
+        if not self.n:
+            return None
+        out = {f"p{p}": round(self.percentile(p), 2) for p in PERCENTILES}
+        out.update(mean=round(self.total / self.n, 2), max=round(self.max, 2), n=self.n)
+        return out
+
+
+def _window_percentiles(values):
+    ordered = sorted(values)
+    last = len(ordered) - 1
+    return {f"p{p}": round(ordered[min(last, math.ceil(len(ordered) * p / 100.0) - 1)], 2) for p in PERCENTILES}
+
+
+class LatencyStats:
+    WINDOW = 300   # frames in the rolling percentiles, about 10 s at 30 fps
+
+    def __init__(self, stages=STAGES, window=WINDOW):
+        self.windows = {s: deque(maxlen=window) for s in stages}
+        self.histograms = {s: LatencyHistogram() for s in stages}
+
+    def record(self, stage, ms):
+        self.windows[stage].append(ms)
+        self.histograms[stage].add(ms)
+
+    def rolling(self):
+        """p50/p95/p99 per stage over the last WINDOW frames."""
+        return {s: _window_percentiles(w) for s, w in self.windows.items() if w}
+
+    def summary(self):
+        """Percentiles, mean, max and count per stage over the whole session."""
+        return {s: h.summary() for s, h in self.histograms.items() if h.n}
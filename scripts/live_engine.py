@@ -0,0 +1,355 @@
+"""Live rep counting from a local frame source.
+
+Runs the live counters (``counters.LIVE_COUNTERS``) on frames from:
+
+  0, camera:N, camera:DEV  camera device (index, device path or capture URL)
+  pipe:, pipe:-            concatenated JPEG frames on stdin (e.g. ``ffmpeg -f mjpeg -``)
+  pipe:PATH                the same from a file or FIFO
+  ws://HOST:PORT/PATH      local WebSocket, one JPEG per binary message
+                           (needs the ``websockets`` package)
+
+A reader thread hands frames over through a single slot that always holds
+the newest one, so pose runs on the freshest picture and a slow frame never
+builds a queue behind it. Failed reads back off instead of spinning, and a
+camera that keeps failing is reopened.
+
+Events are written to stdout as JSON lines: started, rep, status (once a
+second), finalized. The session stops on a "stop" line on stdin (unless
+frames come from stdin), SIGINT/SIGTERM, end of stream or LIVE_MAX_SECONDS,
+and finalize writes ``{LIVE_SESSION}_{log_name}.csv`` to LIVE_OUTPUT_DIR.
+
+Status events carry rolling p50/p95/p99 latency per pipeline stage (see
+latency.py) with the read, dropped and skipped frame counts; finalized
+carries the same figures for the whole session and is also written to
+``{LIVE_SESSION}_latency.json``.
+
+With LIVE_RECORD=1 every frame the counter sees (time and landmarks) goes to
+``{LIVE_SESSION}_landmarks.ttlm`` (see landmark_log.py), which replay.py runs
+through the counter again without a camera.
+
+Environment:
+  EXERCISE          key in counters.LIVE_COUNTERS (default pushup)
+  LIVE_SOURCE       frame source, see above (required: camera:0 is a camera on
+                    this machine, not the client's)
+  LIVE_OUTPUT_DIR   where the rep log goes (default output)
+  LIVE_SESSION      file name prefix (default live_<exercise>)
+  LIVE_MAX_SECONDS  stop after this long, 0 = until stopped (default 0)
+  LIVE_TARGET_FPS   processing rate the adaptive controller holds by trading
+                    input scale, model complexity and frame skip (default 25,
+                    0 = fixed settings); every change is an 'adapt' event
+  LIVE_RECORD       1 to record the counter's input for replay (default 0)
+"""
+import json
+import os
+import signal
+import sys
+import threading
+import time
+
+import cv2
+import numpy as np
+import pandas as pd
+
+from adaptive import AdaptiveController
+from counters import LIVE_COUNTERS
+from landmark_log import SUFFIX as LOG_SUFFIX, LandmarkLogWriter, rows_digest
+from latency import LatencyStats
+from live_io import CameraSource, FrameReader
+from pose_backend import create_pose
+
+PROCESS_SCALE = {'pushup': 0.5}   # as in pushup_live.py; the others run pose at full size
+STATUS_EVERY_S = 1.0
+SOI, EOI = b'\xff\xd8', b'\xff\xd9'
+
+
+def _json_default(o):
+    return o.item() if hasattr(o, 'item') else str(o)
+
+
+_emit_lock = threading.Lock()
+
+
+def emit(event, **fields):
+    line = json.dumps({'event': event, 'ts': round(time.time(), 3), **fields}, default=_json_default)
+    with _emit_lock:
+        sys.stdout.write(line + "\n")
+        sys.stdout.flush()
+
+
+def _decode(jpeg):
+    return cv2.imdecode(np.frombuffer(jpeg, np.uint8), cv2.IMREAD_COLOR)
+
+
+# -------- Frame sources --------
+# Besides live_io.CameraSource: read() returns a BGR frame, None for a failed
+# read, or raises EOFError when the stream has ended for good.
+class MjpegSource:
+    CHUNK = 1 << 16
+
+    def __init__(self, path='-'):
+        self.stream = sys.stdin.buffer if path == '-' else open(path, 'rb')
+        self.buf = bytearray()
+        self.dropped = 0   # backlog frames skipped without decoding
+
+    def _next_jpeg(self):
+        start = self.buf.find(SOI)
+        if start < 0:
+            del self.buf[:-1]
+            return None
+        del self.buf[:start]
+        end = self.buf.find(EOI, 2)
+        if end < 0:
+            return None
+        jpeg = bytes(self.buf[:end + 2])
+        del self.buf[:end + 2]
+        return jpeg
+
+    def read(self):
+        jpeg = self._next_jpeg()
+        while jpeg is None:
+            chunk = self.stream.read1(self.CHUNK)
+            if not chunk:
+                raise EOFError
+            self.buf += chunk
+            jpeg = self._next_jpeg()
+        # Whole frames already waiting means we are behind; only decode the newest
+        newer = self._next_jpeg()
+        while newer is not None:
+            self.dropped += 1
+            jpeg, newer = newer, self._next_jpeg()
+        return _decode(jpeg)
+
+    def close(self):
+        if self.stream is not sys.stdin.buffer:
+            self.stream.close()
+
+
+class WebSocketSource:
+    def __init__(self, url, timeout=1.0):
+        from websockets.sync.client import connect
+        from websockets.exceptions import ConnectionClosed
+        self.closed_error = ConnectionClosed
+        self.timeout = timeout
+        self.ws = connect(url, max_size=None)
+
+    def read(self):
+        try:
+            msg = self.ws.recv(timeout=self.timeout)
+        except TimeoutError:
+            return None
+        except self.closed_error:
+            raise EOFError
+        return _decode(msg) if isinstance(msg, bytes) else None
+
+    def close(self):
+        self.ws.close()
+
+
+def open_source(spec):
+    spec = str(spec)
+    if spec.startswith(('ws://', 'wss://')):
+        return WebSocketSource(spec)
+    if spec.startswith('pipe:'):
+        return MjpegSource(spec[len('pipe:'):] or '-')
+    if spec.startswith('camera:'):
+        spec = spec[len('camera:'):]
+    return CameraSource(int(spec) if spec.isdigit() else spec)
+
+
+# -------- Session --------
+class LiveSession:
+    def __init__(self, exercise, source, output_dir, name, max_seconds=0, pose_kwargs=None, target_fps=0, on_frame=None,
+                 record=False):
+        self.exercise = exercise
+        self.counter_cls = LIVE_COUNTERS[exercise]
+        self.source = source
+        self.output_dir = output_dir
+        self.name = name
+        self.max_seconds = max_seconds
+        self.pose_kwargs = pose_kwargs or {'min_detection_confidence': 0.5, 'min_tracking_confidence': 0.5, 'model_complexity': 1}
+        self.scale = PROCESS_SCALE.get(exercise, 1.0)
+        self.controller = AdaptiveController(
+            target_fps, self.scale, self.pose_kwargs.get('model_complexity', 1)
+        ) if target_fps else None
+        self.reader = FrameReader(source, on_frame=on_frame)
+        self.stop_event = threading.Event()
+        self.pose = None
+        self.counter = None
+        self.start_time = None
+        self.frames = 0
+        self.last_status = None
+        self.status_frames = 0
+        self.rep_latencies = []
+        self.latency = LatencyStats()
+        self.skipped = 0
+        self.record = record
+        self.recorder = None
+        self.summary = None
+
+    def start(self):
+        if self.controller:
+            self.scale = self.controller.scale
+            self.pose_kwargs = {**self.pose_kwargs, 'model_complexity': self.controller.model_complexity}
+        self.pose = create_pose(**self.pose_kwargs)
+        self.start_time = self.last_status = time.monotonic()
+        self.reader.start()
+        self._emit('started', exercise=self.exercise)
+
+    def stop(self):
+        self.stop_event.set()
+        self.reader.stop()
+
+    def _emit(self, event, **fields):
+        emit(event, **{'session': self.name, **fields})
+
+    def process_frame(self, frame, stamp):
+        """``stamp`` is the monotonic time the reader got the frame; every stage is timed from it."""
+        if self.counter is None:
+            h, w = frame.shape[:2]
+            self.counter = self.counter_cls(w, h)
+            if self.record:
+                self.recorder = LandmarkLogWriter(
+                    os.path.join(self.output_dir, f"{self.name}{LOG_SUFFIX}"),
+                    exercise=self.exercise, width=w, height=h, counters='live', session=self.name,
+                    started=round(time.time(), 3),
+                )
+        if self.controller and not self.controller.should_process():
+            self.skipped += 1
+            return
+        started = time.monotonic()
+        small = cv2.resize(frame, (0, 0), fx=self.scale, fy=self.scale) if self.scale != 1.0 else frame
+        results = self.pose.process(cv2.cvtColor(small, cv2.COLOR_BGR2RGB))
+        inferred = time.monotonic()
+        t = stamp - self.start_time
+        lm = results.pose_landmarks.landmark if results.pose_landmarks else None
+        rep = self.counter.update(lm, t)
+        counted = time.monotonic()
+        if self.recorder:
+            self.recorder.frame(t, lm)
+        self.frames += 1
+        lat = self.latency
+        lat.record('handoff', (started - stamp) * 1000)
+        lat.record('inference', (inferred - started) * 1000)
+        lat.record('counter', (counted - inferred) * 1000)
+        if self.controller:
+            self._adapt((counted - started) * 1000, t)
+        if rep is not None and not self.counter.per_frame_rows:
+            latency_ms = (time.monotonic() - stamp) * 1000
+            self.rep_latencies.append(latency_ms)
+            self._emit('rep', t=round(t, 3), count=self.counter.count, latency_ms=round(latency_ms, 1), rep=rep)
+            done = time.monotonic()
+            lat.record('emit', (done - counted) * 1000)
+        else:
+            done = counted
+        lat.record('total', (done - stamp) * 1000)
+
+    def _adapt(self, latency_ms, t):
+        change = self.controller.record(latency_ms, t)
+        if change is None:
+            return
+        self.scale = self.controller.scale
+        if self.controller.model_complexity != self.pose_kwargs.get('model_complexity'):
+            self.pose_kwargs = {**self.pose_kwargs, 'model_complexity': self.controller.model_complexity}
+            self.pose.close()
+            self.pose = create_pose(**self.pose_kwargs)
+        self._emit('adapt', **change)
+
+    def emit_status(self, now):
+        """Per-session 'status' event with the processing rate since the last one."""
+        elapsed = now - self.last_status
+        self._emit('status',
+                   t=round(now - self.start_time, 3),
+                   fps=round((self.frames - self.status_frames) / elapsed, 1) if elapsed > 0 else 0.0,
+                   count=self.counter.count if self.counter else 0,
+                   frames_read=self.reader.frames,
+                   dropped=self.reader.dropped,
+                   skipped=self.skipped,
+                   read_failures=self.reader.read_failures,
+                   latency_ms=self.latency.rolling())
+        self.last_status, self.status_frames = now, self.frames
+
+    def expired(self, now):
+        return bool(self.max_seconds) and now - self.start_time >= self.max_seconds
+
+    def run(self):
+        while not self.stop_event.is_set():
+            frame, stamp = self.reader.read(timeout=STATUS_EVERY_S)
+            if frame is not None:
+                self.process_frame(frame, stamp)
+            elif self.reader.ended:
+                break
+            now = time.monotonic()
+            if self.expired(now):
+                break
+            if now - self.last_status >= STATUS_EVERY_S:
+                self.emit_status(now)
+        return self.finalize()
+
+    def finalize(self):
+        if self.summary is not None:
+            return self.summary
+        self.stop()
+        self.reader.close()
+        if self.pose is not None:
+            self.pose.close()
+
+        rows = self.counter.rows() if self.counter else []
+        csv_file = None
+        if rows:
+            csv_file = f"{self.name}_{self.counter_cls.log_name}.csv"
+            pd.DataFrame(rows).to_csv(os.path.join(self.output_dir, csv_file), index=False)
+        if self.recorder:
+            self.recorder.close(count=self.counter.count, digest=rows_digest(rows))
+        lat = self.rep_latencies
+        self.summary = {
+            'session': self.name,
+            'exercise': self.exercise,
+            'count': self.counter.count if self.counter else 0,
+            'duration_s': round(time.monotonic() - self.start_time, 3) if self.start_time else 0,
+            'frames': self.frames,
+            'frames_read': self.reader.frames,
+            'dropped': self.reader.dropped,
+            'skipped': self.skipped,
+            'read_failures': self.reader.read_failures,
+            'max_rep_latency_ms': round(max(lat), 1) if lat else None,
+            'mean_rep_latency_ms': round(sum(lat) / len(lat), 1) if lat else None,
+            'latency_ms': self.latency.summary(),
+            'csv_file': csv_file,
+            'latency_file': f"{self.name}_latency.json",
+            'landmark_log': os.path.basename(self.recorder.path) if self.recorder else None,
+            'adaptations': self.controller.changes if self.controller else [],
+        }
+        with open(os.path.join(self.output_dir, self.summary['latency_file']), 'w') as f:
+            json.dump(self.summary, f, indent=2, default=_json_default)
+        self._emit('finalized', **self.summary)
+        return self.summary
+
+
+def watch_stdin(session):
+    for line in sys.stdin:
+        if line.strip().lower() in ('stop', 'q', 'quit'):
+            session.stop()
+            return
+
+
+if __name__ == "__main__":
+    exercise = os.environ.get("EXERCISE", "pushup")
+    source_spec = os.environ.get("LIVE_SOURCE")
+    if not source_spec:
+        sys.exit("LIVE_SOURCE is required (e.g. camera:0 for a camera on this machine)")
+    output_folder = os.environ.get("LIVE_OUTPUT_DIR", "output")
+    filename = os.environ.get("LIVE_SESSION", f"live_{exercise}")
+    max_seconds = float(os.environ.get("LIVE_MAX_SECONDS", "0"))
+    target_fps = float(os.environ.get("LIVE_TARGET_FPS", "25"))
+    os.makedirs(output_folder, exist_ok=True)
+
+    source = open_source(source_spec)
+    record = os.environ.get("LIVE_RECORD", "0") not in ("", "0")
+    session = LiveSession(exercise, source, output_folder, filename, max_seconds, target_fps=target_fps, record=record)
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(sig, lambda *_: session.stop())
+    if not (isinstance(source, MjpegSource) and source.stream is sys.stdin.buffer):
+        threading.Thread(target=watch_stdin, args=(session,), daemon=True).start()
+
+    session.start()
+    session.run()
@@ -0,0 +1,208 @@
+"""Serve several live streams from one process.
+
+Every stream is a ``live_engine.LiveSession`` (its own reader, counter and
+pose state) but none of them runs its own loop. A pool of inference workers
+takes the newest frame of whichever stream has waited longest since it was
+last served, so one busy camera cannot starve the others and a stream is
+never processed by two workers at once. With POSE_BACKEND=tflite/onnx the
+model itself is shared too (see pose_backend).
+
+Streams come from LIVE_STREAMS as ``id=exercise@source`` pairs separated by
+commas, e.g. ``lane1=pushup@0,lane2=squat@1,lane3=situp@pipe:/tmp/cam3``, and
+can be changed at runtime with lines on stdin:
+
+  add ID EXERCISE SOURCE
+  remove ID
+  stop
+
+Events are the live_engine JSON lines, tagged with the stream id as
+``session``; every stream reports its own fps once a second.
+
+Environment (plus the live_engine ones):
+  LIVE_STREAMS   initial streams, see above
+  LIVE_WORKERS   number of inference workers (default: one per stream up to the
+                 core count, growing as streams are added; workers of removed
+                 streams stay for the next ones)
+"""
+import os
+import signal
+import sys
+import threading
+import time
+
+from live_engine import LiveSession, STATUS_EVERY_S, emit, open_source
+
+
+class LiveHost:
+    def __init__(self, output_dir, workers=None, target_fps=0, max_seconds=0, record=False):
+        self.output_dir = output_dir
+        self.record = record
+        self.workers = workers
+        self.target_fps = target_fps
+        self.max_seconds = max_seconds
+        self.cond = threading.Condition()
+        self.sessions = {}
+        self.last_served = {}
+        self.busy = set()
+        self.running = False
+        self.threads = []
+        self.summaries = {}
+
+    def _wake(self):
+        with self.cond:
+            self.cond.notify_all()
+
+    # -------- Streams --------
+    def add_stream(self, stream_id, exercise, source_spec):
+        session = LiveSession(
+            exercise, open_source(source_spec), self.output_dir, stream_id,
+            max_seconds=self.max_seconds, target_fps=self.target_fps, on_frame=self._wake,
+            record=self.record,
+        )
+        with self.cond:
+            if stream_id in self.sessions:
+                raise ValueError(f"Stream {stream_id} already exists")
+            self.sessions[stream_id] = session
+            self.last_served[stream_id] = 0.0
+        session.start()
+        if self.running and self._grow_pool():
+            emit('host_workers', workers=len(self.threads))
+        return session
+
+    def remove_stream(self, stream_id):
+        with self.cond:
+            session = self.sessions.get(stream_id)
+            if session is None:
+                return None
+            session.stop()
+            # Let an in-flight frame finish before the pose graph is closed
+            while stream_id in self.busy:
+                self.cond.wait()
+            # wait() let go of the lock: a concurrent remove may have finished it meanwhile
+            if self.sessions.get(stream_id) is not session:
+                return None
+            del self.sessions[stream_id]
+            del self.last_served[stream_id]
+        summary = session.finalize()
+        self.summaries[stream_id] = summary
+        return summary
+
+    # -------- Scheduling --------
+    def _next_job(self):
+        with self.cond:
+            while self.running:
+                ready = [
+                    sid for sid, s in self.sessions.items()
+                    if sid not in self.busy and not s.stop_event.is_set() and s.reader.pending
+                ]
+                if ready:
+                    # Least recently served first: round-robin that skips idle streams
+                    sid = min(ready, key=self.last_served.get)
+                    frame, stamp = self.sessions[sid].reader.read(timeout=0)
+                    if frame is None:
+                        continue
+                    self.busy.add(sid)
+                    self.last_served[sid] = time.monotonic()
+                    return sid, frame, stamp
+                self.cond.wait(STATUS_EVERY_S)
+            return None, None, None
+
+    def _worker(self):
+        while True:
+            sid, frame, stamp = self._next_job()
+            if sid is None:
+                return
+            try:
+                self.sessions[sid].process_frame(frame, stamp)
+            except Exception as e:
+                emit('error', session=sid, error=str(e))
+            finally:
+                with self.cond:
+                    self.busy.discard(sid)
+                    self.cond.notify_all()
+
+    def _grow_pool(self):
+        """Start workers up to LIVE_WORKERS, else one per stream up to the core count."""
+        with self.cond:
+            n = self.workers or max(1, min(len(self.sessions), os.cpu_count() or 1))
+            new = [threading.Thread(target=self._worker, daemon=True) for _ in range(n - len(self.threads))]
+            self.threads += new
+        for th in new:
+            th.start()
+        return len(new)
+
+    def start(self):
+        self.running = True
+        self._grow_pool()
+        emit('host_started', workers=len(self.threads), streams=list(self.sessions))
+
+    def monitor(self, stop_event):
+        """Status once a second; finalizes streams that ended or ran out of time."""
+        while not stop_event.wait(STATUS_EVERY_S):
+            now = time.monotonic()
+            for sid, session in list(self.sessions.items()):
+                done = session.expired(now) or (session.reader.ended and not session.reader.pending)
+                if done and sid not in self.busy:
+                    self.remove_stream(sid)
+                else:
+                    session.emit_status(now)
+
+    def close(self):
+        for sid in list(self.sessions):
+            self.remove_stream(sid)
+        with self.cond:
+            self.running = False
+            self.cond.notify_all()
+        for th in self.threads:
+            th.join(timeout=2.0)
+        emit('host_finalized', streams=self.summaries)
+        return self.summaries
+
+
+def parse_streams(spec):
+    streams = []
+    for item in filter(None, (s.strip() for s in spec.split(','))):
+        stream_id, rest = item.split('=', 1)
+        exercise, source = rest.split('@', 1)
+        streams.append((stream_id.strip(), exercise.strip(), source.strip()))
+    return streams
+
+
+def watch_stdin(host, stop_event):
+    for line in sys.stdin:
+        parts = line.split()
+        if not parts:
+            continue
+        try:
+            if parts[0] == 'add' and len(parts) == 4:
+                host.add_stream(*parts[1:])
+            elif parts[0] == 'remove' and len(parts) == 2:
+                host.remove_stream(parts[1])
+            elif parts[0] in ('stop', 'q', 'quit'):
+                break
+        except Exception as e:
+            emit('error', command=line.strip(), error=str(e))
+    stop_event.set()
+
+
+if __name__ == "__main__":
+    output_folder = os.environ.get("LIVE_OUTPUT_DIR", "output")
+    os.makedirs(output_folder, exist_ok=True)
+    host = LiveHost(
+        output_folder,
+        workers=int(os.environ.get("LIVE_WORKERS", "0")) or None,
+        target_fps=float(os.environ.get("LIVE_TARGET_FPS", "25")),
+        max_seconds=float(os.environ.get("LIVE_MAX_SECONDS", "0")),
+        record=os.environ.get("LIVE_RECORD", "0") not in ("", "0"),
+    )
+    for stream in parse_streams(os.environ.get("LIVE_STREAMS", "")):
+        host.add_stream(*stream)
+
+    stop_event = threading.Event()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(sig, lambda *_: stop_event.set())
+    threading.Thread(target=watch_stdin, args=(host, stop_event), daemon=True).start()
+
+    host.start()
+    host.monitor(stop_event)
+    host.close()
@@ -0,0 +1,244 @@
+"""Capture, recording and display threads for live sessions.
+
+Reading the camera, running pose, writing the annotated video and showing
+the preview in one loop lets a slow model back frames up in the camera
+driver, so the on-screen count trails the athlete. Here each side runs on
+its own thread and the counting loop only ever sees the newest frame:
+
+  FrameReader        reads a source into a single-slot LatestFrame; failed
+                     reads back off instead of spinning
+  VideoWriterThread  writes annotated frames from a bounded queue, placed on
+                     the file's timeline by their capture stamps
+  Display            the preview window; highgui only works on the main thread
+                     on macOS, so the counting loop draws it itself
+
+Set LIVE_DISPLAY=0 to run without a preview window.
+"""
+import os
+import queue
+import threading
+import time
+
+import cv2
+
+READ_BACKOFF_S = (0.01, 0.5)   # first and longest wait after a failed read
+REOPEN_AFTER = 20              # failed reads in a row before a camera is reopened
+
+
+class LatestFrame:
+    """Single-slot hand-off: put() overwrites, get() returns the newest frame once."""
+
+    def __init__(self):
+        self.cond = threading.Condition()
+        self.frame = None
+        self.stamp = None
+        self.dropped = 0
+        self.closed = False
+
+    def put(self, frame, stamp):
+        with self.cond:
+            if self.frame is not None:
+                self.dropped += 1
+            self.frame, self.stamp = frame, stamp
+            self.cond.notify()
+
+    def get(self, timeout=None):
+        with self.cond:
+            if self.frame is None and not self.closed:
+                self.cond.wait(timeout)
+            frame, stamp = self.frame, self.stamp
+            self.frame = None
+            return frame, stamp
+
+    def close(self):
+        with self.cond:
+            self.closed = True
+            self.cond.notify_all()
+
+
+# read() returns a BGR frame, None for a failed read, or raises EOFError
+# when the stream has ended for good.
+class CameraSource:
+    def __init__(self, device=0):
+        self.device = device
+        self.cap = None
+        self.open()
+        if not self.cap.isOpened():
+            raise RuntimeError(f"Cannot access camera {device}")
+
+    def open(self):
+        if self.cap is not None:
+            self.cap.release()
+        self.cap = cv2.VideoCapture(self.device)
+        self.cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)  # newest frame, not a driver backlog
+
+    reopen = open
+
+    def read(self):
+        ret, frame = self.cap.read()
+        return frame if ret else None
+
+    def close(self):
+        self.cap.release()
+
+
+class FrameReader:
+    """Reads ``source`` on a thread; read() returns (frame, monotonic stamp).
+
+    ``on_frame`` is called after every new frame, for hosts that wait on
+    several readers at once.
+    """
+
+    def __init__(self, source, clock=None, on_frame=None):
+        self.source = source
+        self.clock = clock or time.monotonic
+        self.on_frame = on_frame
+        self.slot = LatestFrame()
+        self.stop_event = threading.Event()
+        self.read_failures = 0
+        self.frames = 0
+        self.thread = threading.Thread(target=self._loop, daemon=True)
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def _loop(self):
+        backoff = READ_BACKOFF_S[0]
+        failures = 0
+        while not self.stop_event.is_set():
+            try:
+                frame = self.source.read()
+            except EOFError:
+                break
+            if frame is None:
+                failures += 1
+                self.read_failures += 1
+                if failures % REOPEN_AFTER == 0 and hasattr(self.source, 'reopen'):
+                    self.source.reopen()
+                # Wait on the stop event rather than spinning on a dead source
+                self.stop_event.wait(backoff)
+                backoff = min(backoff * 2, READ_BACKOFF_S[1])
+                continue
+            failures = 0
+            backoff = READ_BACKOFF_S[0]
+            self.frames += 1
+            self.slot.put(frame, self.clock())
+            if self.on_frame:
+                self.on_frame()
+        self.slot.close()
+        if self.on_frame:
+            self.on_frame()
+
+    def read(self, timeout=None):
+        return self.slot.get(timeout)
+
+    @property
+    def ended(self):
+        return self.slot.closed
+
+    @property
+    def pending(self):
+        return self.slot.frame is not None
+
+    @property
+    def dropped(self):
+        # Sources that skip a backlog themselves (MJPEG pipes) count those too
+        return self.slot.dropped + getattr(self.source, 'dropped', 0)
+
+    def stop(self):
+        self.stop_event.set()
+        self.slot.close()
+
+    def close(self, timeout=2.0):
+        self.stop()
+        self.thread.join(timeout)
+        # A source blocked in read() (e.g. an idle pipe) is left to process exit
+        if not self.thread.is_alive():
+            self.source.close()
+
+
+class VideoWriterThread:
+    """cv2.VideoWriter on a background thread; frames are dropped when the queue is full.
+
+    A live loop only hands over the frames it got through pose, fewer than
+    the camera's ``fps`` the file plays at. Given capture stamps, each frame
+    is written to the slot its stamp falls in and the previous one repeated
+    over the gap, so the recording keeps real time; frames without a stamp
+    are written back to back.
+    """
+
+    def __init__(self, path, fourcc, fps, size, max_queue=64):
+        self.writer = cv2.VideoWriter(path, fourcc, fps, size)
+        self.fps = fps
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.dropped = 0
+        self.repeated = 0
+        self.written = 0
+        self.thread = threading.Thread(target=self._loop, daemon=True)
+        self.thread.start()
+
+    def write(self, frame, stamp=None):
+        try:
+            self.queue.put_nowait((frame, stamp))
+        except queue.Full:
+            self.dropped += 1
+
+    def _loop(self):
+        start = last = None
+        while True:
+            item = self.queue.get()
+            if item is None:
+                break
+            frame, stamp = item
+            if stamp is None:
+                self.writer.write(frame)
+                self.written += 1
+                continue
+            start = stamp if start is None else start
+            due = int(round((stamp - start) * self.fps))
+            while self.written < due:
+                self.writer.write(last)
+                self.written += 1
+                self.repeated += 1
+            if self.written == due:   # else its slot is taken by a frame from the same period
+                self.writer.write(frame)
+                self.written += 1
+            last = frame
+
+    def release(self):
+        self.queue.put(None)
+        self.thread.join()
+        self.writer.release()
+
+
+class Display:
+    """Preview window, drawn by show() on the calling thread.
+
+    Call it from the main thread: macOS only allows highgui windows there.
+    Frames that come faster than ``fps`` are not drawn. ``quit`` is set when
+    one of ``quit_keys`` is pressed in the window.
+    """
+
+    def __init__(self, title, fps=30, quit_keys=(27, ord('q')), enabled=None):
+        self.title = title
+        self.interval = 1.0 / fps
+        self.quit_keys = quit_keys
+        self.quit = threading.Event()
+        self.next_draw = 0.0
+        if enabled is None:
+            enabled = os.environ.get("LIVE_DISPLAY", "1") != "0"
+        self.enabled = enabled
+
+    def show(self, frame):
+        now = time.monotonic()
+        if not self.enabled or now < self.next_draw:
+            return
+        self.next_draw = now + self.interval
+        cv2.imshow(self.title, frame)
+        if cv2.waitKey(1) & 0xFF in self.quit_keys:
+            self.quit.set()
+
+    def close(self):
+        if self.enabled:
+            cv2.destroyAllWindows()
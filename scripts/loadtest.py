@@ -0,0 +1,348 @@
+"""Concurrent-load test of the video processing service.
+
+Sends a weighted mix of uploads to a running server's /api/process-video at
+increasing load levels and records, per request, the turnaround seen by the
+client and the queue wait and processing time the job reported back
+(``jobMetrics``, see job_metrics.py). Every level is summarised as
+throughput, error rate and p50/p99 of turnaround, queue wait and processing,
+which together make the saturation curve: throughput flattens and turnaround
+climbs once the box has no more room.
+
+Two ways to apply load:
+
+  closed  level = uploads in flight; each client sends its next upload as
+          soon as the previous one returns (how many at once can it take)
+  open    level = arrivals per minute, Poisson distributed, regardless of
+          how the server keeps up (what does a test day's arrival rate do)
+
+The mix is a comma list of ``activity[@clip][:weight]``, e.g.
+``Push-ups:3,Sit-ups@/data/situps.mp4:1``. Activities without a clip get a
+rendered synthetic one (synthetic.py): four reps at 540p and 30 fps.
+
+The saturation point is the first level that fails requests, whose p99
+turnaround exceeds LOAD_SLO_S, or whose throughput falls short by more than
+LOAD_KNEE: closed, of growing over the previous level; open, of keeping up
+with the arrival rate. The level before it is the largest the box sustains. Results go to
+``load_<time>.json`` and ``.csv`` in the results directory.
+
+    node server/server.js &
+    LOAD_LEVELS=1,2,4,8 python scripts/loadtest.py
+    LOAD_ARRIVAL=open LOAD_LEVELS=2,4,8,16 LOAD_SLO_S=120 python scripts/loadtest.py
+
+Environment:
+  LOAD_URL          server base URL (default http://localhost:3001)
+  LOAD_MIX          upload mix, see above (default Push-ups:2,Sit-ups:1,Pull-ups:1,Vertical Jump:1)
+  LOAD_ARRIVAL      closed | open (default closed)
+  LOAD_LEVELS       comma list of concurrency levels or arrivals per minute (default 1,2,4,8)
+  LOAD_JOBS         uploads per level (default: 4 per client in closed mode, 20 in open mode)
+  LOAD_MODE         upload mode field, e.g. multi or roster (default: single)
+  LOAD_SLO_S        p99 turnaround that counts as saturated (default 300)
+  LOAD_KNEE         relative throughput gain below which a level is saturated (default 0.10)
+  LOAD_TIMEOUT_S    longest a single upload may take (default 1800)
+  LOAD_SEED         arrival and mix seed (default 0)
+  LOAD_CORPUS_DIR   synthetic clip directory (default ~/.cache/talenttrack/bench_corpus)
+  LOAD_RESULTS_DIR  result directory (default benchmarks/ in the repo)
+"""
+import csv
+import http.client
+import json
+import math
+import os
+import random
+import threading
+import time
+import uuid
+from urllib.parse import urlsplit
+
+import synthetic
+from benchmark import REPO_DIR, host_info
+
+# Upload activity -> synthetic exercise (server.js activityExercises)
+ACTIVITIES = {
+    'Push-ups': 'pushup',
+    'Pull-ups': 'pullup',
+    'Sit-ups': 'situp',
+    'Vertical Jump': 'verticaljump',
+    'Shuttle Run': 'shuttlerun',
+    'Sit Reach': 'sitreach',
+    'Vertical Broad Jump': 'broadjump',
+    'Standing Broad Jump': 'broadjump',
+}
+CLIP_SIZE = (960, 540)
+CLIP_FPS = 30
+CLIP_REPS = 4
+
+
+# -------- Uploads --------
+def synthetic_clip(exercise, corpus_dir):
+    path = os.path.join(corpus_dir, f"load_{exercise}_540p_{CLIP_FPS}.mp4")
+    if not os.path.exists(path):
+        os.makedirs(corpus_dir, exist_ok=True)
+        print(f"Rendering a {exercise} clip...", flush=True)
+        seq = synthetic.generate(exercise, reps=CLIP_REPS, fps=CLIP_FPS, size=CLIP_SIZE)
+        tmp = path + '.part.mp4'
+        synthetic.render(seq, tmp)
+        os.replace(tmp, path)
+    return path
+
+
+def parse_mix(spec, corpus_dir):
+    """[(activity, clip path, weight)] from ``activity[@clip][:weight]`` items."""
+    mix = []
+    for item in (s.strip() for s in spec.split(",") if s.strip()):
+        weight = 1.0
+        head, sep, tail = item.rpartition(':')
+        if sep and tail.replace('.', '', 1).isdigit():
+            item, weight = head, float(tail)
+        activity, _, clip = item.partition('@')
+        activity = activity.strip()
+        if activity not in ACTIVITIES:
+            raise SystemExit(f"Unknown activity in LOAD_MIX: {activity}")
+        mix.append((activity, clip.strip() or synthetic_clip(ACTIVITIES[activity], corpus_dir), weight))
+    return mix
+
+
+def multipart(fields, file_field, filename, data, content_type='video/mp4'):
+    boundary = uuid.uuid4().hex
+    parts = []
+    for name, value in fields.items():
+        parts.append(f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode())
+    parts.append(
+        f'--{boundary}\r\nContent-Disposition: form-data; name="{file_field}"; filename="{filename}"\r\n'
+        f'Content-Type: {content_type}\r\n\r\n'.encode()
+    )
+    parts += [data, f'\r\n--{boundary}--\r\n'.encode()]
+    return b''.join(parts), f'multipart/form-data; boundary={boundary}'
+
+
+class Uploader:
+    def __init__(self, url, mix, mode=None, timeout=1800):
+        self.url = urlsplit(url)
+        self.mix = mix
+        self.mode = mode
+        self.timeout = timeout
+        self.data = {}
+        for _, clip, _ in mix:
+            if clip not in self.data:
+                with open(clip, 'rb') as f:
+                    self.data[clip] = f.read()
+
+    def pick(self, rng):
+        activity, clip, _ = rng.choices(self.mix, weights=[w for _, _, w in self.mix])[0]
+        return activity, clip
+
+    def send(self, activity, clip, job_id):
+        fields = {'activityName': activity}
+        if self.mode:
+            fields['mode'] = self.mode
+        body, content_type = multipart(fields, 'video', os.path.basename(clip), self.data[clip])
+        conn_cls = http.client.HTTPSConnection if self.url.scheme == 'https' else http.client.HTTPConnection
+        conn = conn_cls(self.url.netloc, timeout=self.timeout)
+        run = {'job_id': job_id, 'activity': activity, 'clip': os.path.basename(clip)}
+        started = time.monotonic()
+        try:
+            conn.request('POST', self.url.path.rstrip('/') + '/api/process-video', body=body,
+                         headers={'Content-Type': content_type, 'X-Job-Id': job_id})
+            response = conn.getresponse()
+            payload = response.read()
+            run['status'] = response.status
+            try:
+                reply = json.loads(payload)
+            except ValueError:
+                reply = {}
+            if response.status != 200:
+                run['error'] = reply.get('details') or reply.get('error') or payload[:200].decode(errors='replace')
+            report = reply.get('jobMetrics') or {}
+            run['queue_wait_s'] = report.get('queue_wait_s')
+            run['processing_s'] = report.get('wall_s')
+        except (OSError, http.client.HTTPException) as e:
+            run['status'] = 0
+            run['error'] = str(e) or type(e).__name__
+        finally:
+            conn.close()
+        run['turnaround_s'] = round(time.monotonic() - started, 3)
+        return run
+
+
+# -------- Load levels --------
+def run_closed(uploader, clients, jobs, rng, level):
+    """``clients`` uploads in flight until ``jobs`` have been sent."""
+    runs, lock = [], threading.Lock()
+    plan = [(n, *uploader.pick(rng)) for n in range(jobs)][::-1]
+    started = time.monotonic()
+
+    def client():
+        while True:
+            with lock:
+                if not plan:
+                    return
+                n, activity, clip = plan.pop()
+            run = uploader.send(activity, clip, f"load-{level:g}-{n}-{uuid.uuid4().hex[:6]}")
+            run['sent_s'] = round(time.monotonic() - started - run['turnaround_s'], 3)
+            with lock:
+                runs.append(run)
+
+    threads = [threading.Thread(target=client, daemon=True) for _ in range(clients)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return runs, time.monotonic() - started
+
+
+def run_open(uploader, per_minute, jobs, rng, level):
+    """Poisson arrivals at ``per_minute`` whether or not earlier uploads are done."""
+    runs, lock, threads = [], threading.Lock(), []
+    started = time.monotonic()
+    due = 0.0
+
+    def one(activity, clip, n, sent):
+        run = uploader.send(activity, clip, f"load-{level:g}-{n}-{uuid.uuid4().hex[:6]}")
+        run['sent_s'] = round(sent, 3)
+        with lock:
+            runs.append(run)
+
+    for n in range(jobs):
+        delay = started + due - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        activity, clip = uploader.pick(rng)
+        t = threading.Thread(target=one, args=(activity, clip, n, time.monotonic() - started), daemon=True)
+        t.start()
+        threads.append(t)
+        due += rng.expovariate(per_minute / 60.0)
+    for t in threads:
+        t.join()
+    return runs, time.monotonic() - started
+
+
+def percentile(values, p):
+    values = sorted(v for v in values if v is not None)
+    if not values:
+        return None
+    return round(values[min(len(values) - 1, math.ceil(len(values) * p / 100.0) - 1)], 2)
+
+
+def peak_in_flight(runs):
+    edges = sorted([(r['sent_s'], 1) for r in runs] + [(r['sent_s'] + r['turnaround_s'], -1) for r in runs],
+                   key=lambda e: (e[0], e[1]))
+    peak = current = 0
+    for _, step in edges:
+        current += step
+        peak = max(peak, current)
+    return peak
+
+
+def summarize(level, runs, wall):
+    ok = [r for r in runs if r['status'] == 200]
+    summary = {
+        'level': level,
+        'jobs': len(runs),
+        'ok': len(ok),
+        'error_rate': round(1 - len(ok) / len(runs), 3) if runs else None,
+        'wall_s': round(wall, 1),
+        'throughput_per_min': round(len(ok) / wall * 60, 2) if wall > 0 else None,
+        'peak_in_flight': peak_in_flight(runs),
+    }
+    last_sent = max((r['sent_s'] for r in runs), default=0)
+    summary['arrival_per_min'] = round((len(runs) - 1) / last_sent * 60, 2) if last_sent > 0 else None
+    for key in ('turnaround_s', 'queue_wait_s', 'processing_s'):
+        for p in (50, 99):
+            summary[f"{key[:-2]}_p{p}_s"] = percentile([r.get(key) for r in ok], p)
+    return summary
+
+
+def find_knee(levels, knee, slo_s, arrival):
+    """Index of the first saturated level, or None."""
+    for i, s in enumerate(levels):
+        if s['turnaround_p99_s'] is not None and s['turnaround_p99_s'] > slo_s:
+            return i
+        if s['error_rate']:
+            return i
+        if arrival == 'open':
+            # Open loop: saturated once completions fall behind arrivals
+            if (s['throughput_per_min'] or 0) < (s['arrival_per_min'] or s['level']) * (1 - knee):
+                return i
+        elif i and levels[i - 1]['throughput_per_min']:
+            gain = (s['throughput_per_min'] or 0) / levels[i - 1]['throughput_per_min'] - 1
+            if gain < knee:
+                return i
+    return None
+
+
+def print_curve(levels, arrival):
+    unit = 'clients' if arrival == 'closed' else 'per min'
+    top = max((s['throughput_per_min'] or 0) for s in levels) or 1
+    print(f"{unit:>8}{'jobs/min':>10}{'err':>6}{'p50 s':>8}{'p99 s':>8}{'wait p99':>10}{'proc p50':>10}  throughput")
+    for s in levels:
+        bar = '#' * round(30 * (s['throughput_per_min'] or 0) / top)
+        print(f"{s['level']:>8g}{s['throughput_per_min'] or 0:>10.2f}{s['error_rate'] or 0:>6.0%}"
+              f"{s['turnaround_p50_s'] or 0:>8.1f}{s['turnaround_p99_s'] or 0:>8.1f}"
+              f"{s['queue_wait_p99_s'] or 0:>10.1f}{s['processing_p50_s'] or 0:>10.1f}  {bar}")
+
+
+def main():
+    arrival = os.environ.get("LOAD_ARRIVAL", "closed")
+    if arrival not in ('closed', 'open'):
+        raise SystemExit("LOAD_ARRIVAL must be closed or open")
+    levels = [float(v) for v in os.environ.get("LOAD_LEVELS", "1,2,4,8").split(",") if v.strip()]
+    jobs_env = os.environ.get("LOAD_JOBS")
+    slo_s = float(os.environ.get("LOAD_SLO_S", "300"))
+    knee = float(os.environ.get("LOAD_KNEE", "0.10"))
+    corpus_dir = os.environ.get("LOAD_CORPUS_DIR") or os.path.join(
+        os.path.expanduser("~"), ".cache", "talenttrack", "bench_corpus")
+    results_dir = os.environ.get("LOAD_RESULTS_DIR") or os.path.join(REPO_DIR, "benchmarks")
+    rng = random.Random(int(os.environ.get("LOAD_SEED", "0")))
+    url = os.environ.get("LOAD_URL", "http://localhost:3001")
+
+    mix = parse_mix(os.environ.get("LOAD_MIX", "Push-ups:2,Sit-ups:1,Pull-ups:1,Vertical Jump:1"), corpus_dir)
+    uploader = Uploader(url, mix, os.environ.get("LOAD_MODE") or None,
+                        float(os.environ.get("LOAD_TIMEOUT_S", "1800")))
+    print(f"Load test of {url}: {arrival} loop, levels {', '.join(f'{v:g}' for v in levels)}", flush=True)
+
+    summaries, runs = [], []
+    for level in levels:
+        if arrival == 'closed':
+            jobs = int(jobs_env) if jobs_env else 4 * int(level)
+            level_runs, wall = run_closed(uploader, int(level), jobs, rng, level)
+        else:
+            jobs = int(jobs_env) if jobs_env else 20
+            level_runs, wall = run_open(uploader, level, jobs, rng, level)
+        summary = summarize(level, level_runs, wall)
+        summaries.append(summary)
+        runs += [{'level': level, **r} for r in sorted(level_runs, key=lambda r: r['sent_s'])]
+        print(f"level {level:g}: {summary['ok']}/{summary['jobs']} ok, {summary['throughput_per_min']} jobs/min, "
+              f"p99 turnaround {summary['turnaround_p99_s']} s", flush=True)
+        failures = [r for r in level_runs if r['status'] != 200]
+        for r in failures[:3]:
+            print(f"  {r['job_id']}: {r['status']} {r.get('error', '')}"[:200])
+
+    print_curve(summaries, arrival)
+    index = find_knee(summaries, knee, slo_s, arrival)
+    if index is None:
+        sustained, note = summaries[-1]['level'], "no saturation reached; try higher levels"
+    elif index == 0:
+        sustained, note = None, f"saturated already at level {summaries[0]['level']:g}"
+    else:
+        sustained, note = summaries[index - 1]['level'], f"saturates at level {summaries[index]['level']:g}"
+    print(f"Sustained level: {sustained if sustained is None else format(sustained, 'g')} ({note})")
+
+    os.makedirs(results_dir, exist_ok=True)
+    stamp = time.strftime("%Y%m%d_%H%M%S")
+    result = {'created': time.strftime("%Y-%m-%dT%H:%M:%S"), 'host': host_info(), 'url': url,
+              'arrival': arrival, 'mix': [{'activity': a, 'clip': c, 'weight': w} for a, c, w in mix],
+              'slo_s': slo_s, 'knee': knee, 'sustained_level': sustained, 'note': note,
+              'levels': summaries, 'runs': runs}
+    base = os.path.join(results_dir, f"load_{stamp}")
+    with open(base + '.json', 'w') as f:
+        json.dump(result, f, indent=2)
+    with open(base + '.csv', 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=list(summaries[0]))
+        writer.writeheader()
+        writer.writerows(summaries)
+    print(f"Saved {base}.json and {base}.csv")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,231 @@
+"""Multi-athlete support for the video analyzers.
+
+A person detector finds everyone in the frame every ``detect_every`` frames,
+an IoU tracker keeps stable track IDs, and each track gets its own pose graph
+(run on its crop) and its own exercise counter from ``counters``. Between
+detector frames a track's box follows its own landmarks, the same way the
+MediaPipe pose graph tracks between detections.
+
+Detector:
+  default                HOG people detector shipped with OpenCV (no model file)
+  PERSON_DETECTOR_MODEL  SSD-style cv2.dnn model (e.g. MobileNet-SSD); with
+  PERSON_DETECTOR_CONFIG its prototxt/pbtxt and PERSON_CLASS_ID (15 for VOC, 1 for COCO)
+"""
+import os
+
+import cv2
+import numpy as np
+
+from counters import COUNTERS
+from pose_backend import create_pose, make_result
+
+CROP_PAD = 0.2  # fraction of the box added on every side before running pose
+
+
+# -------- Person detection --------
+def _nms(boxes, scores, iou_threshold=0.4):
+    if not boxes:
+        return []
+    idx = cv2.dnn.NMSBoxes([list(map(int, b)) for b in boxes], [float(s) for s in scores], 0.0, iou_threshold)
+    return [boxes[i] for i in np.array(idx).flatten()]
+
+
+class HogPersonDetector:
+    def __init__(self, scale=0.5):
+        self.scale = scale
+        self.hog = cv2.HOGDescriptor()
+        self.hog.setSVMDetector(cv2.HOGDescriptor_getDefaultPeopleDetector())
+
+    def detect(self, frame):
+        small = cv2.resize(frame, (0, 0), fx=self.scale, fy=self.scale)
+        rects, weights = self.hog.detectMultiScale(small, winStride=(8, 8), padding=(8, 8), scale=1.05)
+        boxes = [tuple(v / self.scale for v in r) for r in rects]
+        return _nms(boxes, np.ravel(weights) if len(weights) else [])
+
+
+class DnnPersonDetector:
+    def __init__(self, model, config=None, person_class=15, min_confidence=0.5, input_size=300):
+        self.net = cv2.dnn.readNet(model, config) if config else cv2.dnn.readNet(model)
+        self.person_class = person_class
+        self.min_confidence = min_confidence
+        self.input_size = input_size
+
+    def detect(self, frame):
+        h, w = frame.shape[:2]
+        blob = cv2.dnn.blobFromImage(frame, 0.007843, (self.input_size, self.input_size), 127.5)
+        self.net.setInput(blob)
+        out = self.net.forward().reshape(-1, 7)  # [image, class, conf, x1, y1, x2, y2]
+        boxes, scores = [], []
+        for _, cls, conf, x1, y1, x2, y2 in out:
+            if int(cls) == self.person_class and conf >= self.min_confidence:
+                boxes.append((x1 * w, y1 * h, (x2 - x1) * w, (y2 - y1) * h))
+                scores.append(conf)
+        return _nms(boxes, scores)
+
+
+def create_person_detector():
+    model = os.environ.get("PERSON_DETECTOR_MODEL")
+    if model:
+        return DnnPersonDetector(
+            model,
+            os.environ.get("PERSON_DETECTOR_CONFIG"),
+            person_class=int(os.environ.get("PERSON_CLASS_ID", "15")),
+        )
+    return HogPersonDetector()
+
+
+# -------- Tracking --------
+def iou(a, b):
+    ax, ay, aw, ah = a
+    bx, by, bw, bh = b
+    ix = max(0.0, min(ax + aw, bx + bw) - max(ax, bx))
+    iy = max(0.0, min(ay + ah, by + bh) - max(ay, by))
+    inter = ix * iy
+    union = aw * ah + bw * bh - inter
+    return inter / union if union > 0 else 0.0
+
+
+class Track:
+    def __init__(self, track_id, box, counter, pose):
+        self.id = track_id
+        self.box = box
+        self.counter = counter
+        self.pose = pose
+        self.misses = 0
+        self.frames = 0
+        self.first_seen = None
+        self.last_seen = None
+        self.pose_landmarks = None
+
+    def close(self):
+        """Free the pose graph; the counter and its rows stay for the report."""
+        if self.pose is not None:
+            self.pose.close()
+            self.pose = None
+
+
+class IouTracker:
+    def __init__(self, make_track, iou_threshold=0.3, max_misses=30, max_tracks=8):
+        self.make_track = make_track
+        self.iou_threshold = iou_threshold
+        self.max_misses = max_misses
+        self.max_tracks = max_tracks
+        self.tracks = []
+        self.finished = []
+        self.next_id = 1
+
+    def update(self, boxes):
+        pairs = sorted(
+            ((iou(tr.box, b), ti, bi) for ti, tr in enumerate(self.tracks) for bi, b in enumerate(boxes)),
+            reverse=True,
+        )
+        used_t, used_b = set(), set()
+        for score, ti, bi in pairs:
+            if score < self.iou_threshold:
+                break
+            if ti in used_t or bi in used_b:
+                continue
+            self.tracks[ti].box = boxes[bi]
+            self.tracks[ti].misses = 0
+            used_t.add(ti)
+            used_b.add(bi)
+
+        for ti, tr in enumerate(self.tracks):
+            if ti not in used_t:
+                tr.misses += 1
+        for bi, box in enumerate(boxes):
+            if bi not in used_b and len(self.tracks) < self.max_tracks:
+                self.tracks.append(self.make_track(self.next_id, box))
+                self.next_id += 1
+
+        alive = []
+        for tr in self.tracks:
+            if tr.misses <= self.max_misses:
+                alive.append(tr)
+            else:
+                tr.close()
+                self.finished.append(tr)
+        self.tracks = alive
+        return self.tracks
+
+    def all_tracks(self):
+        return sorted(self.finished + self.tracks, key=lambda tr: tr.id)
+
+
+# -------- Per-track pose --------
+def crop_box(box, w, h, pad=CROP_PAD):
+    x, y, bw, bh = box
+    x0 = int(max(0, x - bw * pad))
+    y0 = int(max(0, y - bh * pad))
+    x1 = int(min(w, x + bw * (1 + pad)))
+    y1 = int(min(h, y + bh * (1 + pad)))
+    return x0, y0, x1, y1
+
+
+def pose_on_crop(pose, frame, box):
+    """Run ``pose`` on the padded crop and return frame-normalized landmarks."""
+    h, w = frame.shape[:2]
+    x0, y0, x1, y1 = crop_box(box, w, h)
+    if x1 - x0 < 16 or y1 - y0 < 16:
+        return None
+    crop = cv2.cvtColor(frame[y0:y1, x0:x1], cv2.COLOR_BGR2RGB)
+    results = pose.process(crop)
+    if not results.pose_landmarks:
+        return None
+    cw, ch = x1 - x0, y1 - y0
+    points = np.array([
+        ((p.x * cw + x0) / w, (p.y * ch + y0) / h, p.z * cw / w, p.visibility)
+        for p in results.pose_landmarks.landmark
+    ])
+    return make_result(points).pose_landmarks
+
+
+def landmarks_box(landmarks, w, h):
+    xs = np.array([p.x for p in landmarks.landmark]) * w
+    ys = np.array([p.y for p in landmarks.landmark]) * h
+    return (xs.min(), ys.min(), xs.max() - xs.min(), ys.max() - ys.min())
+
+
+class MultiAthleteAnalyzer:
+    def __init__(self, exercise, width, height, detect_every=5, max_athletes=8, counter_kwargs=None, **pose_kwargs):
+        self.width = width
+        self.height = height
+        self.detect_every = detect_every
+        self.detector = create_person_detector()
+        counter_cls = COUNTERS[exercise]
+        counter_kwargs = counter_kwargs or {}
+
+        def make_track(track_id, box):
+            return Track(track_id, box, counter_cls(width, height, **counter_kwargs), create_pose(**pose_kwargs))
+
+        self.tracker = IouTracker(make_track, max_tracks=max_athletes)
+        self.frame_idx = 0
+
+    def process(self, frame, t):
+        self.frame_idx += 1
+        if (self.frame_idx - 1) % self.detect_every == 0:
+            tracks = self.tracker.update(self.detector.detect(frame))
+        else:
+            tracks = self.tracker.tracks
+
+        for tr in tracks:
+            if tr.misses > 0:
+                tr.pose_landmarks = None
+                continue
+            tr.pose_landmarks = pose_on_crop(tr.pose, frame, tr.box)
+            lm = tr.pose_landmarks.landmark if tr.pose_landmarks else None
+            tr.counter.update(lm, t)
+            if tr.pose_landmarks is not None:
+                tr.frames += 1
+                tr.first_seen = t if tr.first_seen is None else tr.first_seen
+                tr.last_seen = t
+                tr.box = landmarks_box(tr.pose_landmarks, self.width, self.height)
+        return tracks
+
+    def athletes(self, min_frames=15):
+        """Tracks seen for at least ``min_frames`` pose frames, in ID order."""
+        return [tr for tr in self.tracker.all_tracks() if tr.frames >= min_frames]
+
+    def close(self):
+        for tr in self.tracker.all_tracks():
+            tr.close()
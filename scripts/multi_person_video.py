@@ -0,0 +1,120 @@
+import cv2
+import mediapipe as mp
+from multi_person import MultiAthleteAnalyzer
+from profiler import tracer_from_env
+from job_metrics import report_job
+from job_control import stop_requested
+from tkinter import Tk, filedialog
+import pandas as pd
+import os
+
+# -------- Settings --------
+PROC_W, PROC_H = 960, 540
+EXERCISE = os.environ.get("EXERCISE", "pushup")   # key in counters.COUNTERS
+DETECT_EVERY = int(os.environ.get("DETECT_EVERY", "5"))
+MAX_ATHLETES = int(os.environ.get("MAX_ATHLETES", "8"))
+MIN_TRACK_FRAMES = 15   # shorter tracks are passers-by or detector noise
+
+TRACK_COLORS = [(0,255,255), (0,255,0), (255,0,255), (255,128,0), (0,128,255), (255,255,0), (128,0,255), (0,0,255)]
+
+# -------- File Selection --------
+Tk().withdraw()
+video_path = filedialog.askopenfilename(title="Select Video", filetypes=[("Video Files","*.mp4;*.avi;*.mov")])
+if not video_path:
+    print("No file selected, exiting...")
+    exit()
+
+filename = os.path.splitext(os.path.basename(video_path))[0]
+output_folder = filename
+os.makedirs(output_folder, exist_ok=True)
+output_video_path = os.path.join(output_folder, f"{filename}_annotated.mp4")
+
+# -------- Video Setup --------
+cap = cv2.VideoCapture(video_path)
+fps = cap.get(cv2.CAP_PROP_FPS) or 30
+fourcc = cv2.VideoWriter_fourcc(*'avc1')  # H.264 codec
+out_vid = cv2.VideoWriter(output_video_path, fourcc, fps, (PROC_W, PROC_H))
+
+# -------- MediaPipe --------
+mp_pose = mp.solutions.pose
+mp_draw = mp.solutions.drawing_utils
+analyzer = MultiAthleteAnalyzer(
+    EXERCISE, PROC_W, PROC_H,
+    detect_every=DETECT_EVERY, max_athletes=MAX_ATHLETES,
+    min_detection_confidence=0.5, model_complexity=1
+)
+
+frame_idx = 0
+
+tracer = tracer_from_env()
+
+# -------- Processing Loop --------
+while True:
+    if stop_requested():   # cancelled or out of time: keep what we have
+        break
+    tracer.frame()
+    ret, frame = cap.read()
+    if not ret:
+        break
+    tracer.mark('decode')
+
+    frame = cv2.resize(frame, (PROC_W, PROC_H))
+    tracer.mark('resize')
+    frame_idx += 1
+    t = frame_idx / fps
+
+    tracks = analyzer.process(frame, t)
+    tracer.mark('pose')
+
+    # -------- Display --------
+    for tr in tracks:
+        color = TRACK_COLORS[(tr.id - 1) % len(TRACK_COLORS)]
+        x, y, w, h = (int(v) for v in tr.box)
+        cv2.rectangle(frame, (x, y), (x + w, y + h), color, 2)
+        cv2.putText(frame, f"#{tr.id}: {tr.counter.count}", (x, max(20, y - 8)), cv2.FONT_HERSHEY_SIMPLEX, 0.7, color, 2)
+        if tr.pose_landmarks is not None:
+            mp_draw.draw_landmarks(frame, tr.pose_landmarks, mp_pose.POSE_CONNECTIONS)
+    cv2.putText(frame, f"Athletes: {len(tracks)}", (10,30), cv2.FONT_HERSHEY_SIMPLEX, 0.9, (0,255,255), 2)
+    cv2.putText(frame, f"Time: {t:.2f}s", (10,65), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (255,255,0), 2)
+
+    tracer.mark('overlay')
+    cv2.imshow("Multi-Athlete Counter", frame)
+    tracer.mark('display')
+    out_vid.write(frame)
+    tracer.mark('write')
+    if cv2.waitKey(int(1000/fps)) & 0xFF in [27, ord('q')]:
+        break
+
+# -------- Cleanup --------
+cap.release()
+out_vid.release()
+cv2.destroyAllWindows()
+analyzer.close()
+tracer.write(output_folder, filename)
+
+# -------- Save CSV (one log per athlete) --------
+summary = []
+for tr in analyzer.athletes(MIN_TRACK_FRAMES):
+    rows = tr.counter.rows()
+    csv_path = os.path.join(output_folder, f"{filename}_athlete{tr.id}_{tr.counter.log_name}.csv")
+    if rows:
+        pd.DataFrame(rows).to_csv(csv_path, index=False)
+        print(f"Saved {csv_path} with {len(rows)} rows")
+    summary.append({
+        'athlete_id': tr.id,
+        'exercise': EXERCISE,
+        'count': tr.counter.count,
+        'first_seen': round(tr.first_seen, 3),
+        'last_seen': round(tr.last_seen, 3),
+        'pose_frames': tr.frames,
+        'log_file': os.path.basename(csv_path) if rows else ''
+    })
+
+summary_path = os.path.join(output_folder, f"{filename}_athletes_summary.csv")
+if summary:
+    pd.DataFrame(summary).to_csv(summary_path, index=False)
+    print(f"Saved {summary_path} with {len(summary)} athletes")
+else:
+    print("No athletes detected.")
+
+report_job(frame_idx, EXERCISE)
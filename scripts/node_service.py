@@ -0,0 +1,323 @@
+"""HTTP service that lets analysis nodes on other machines run queued jobs.
+
+The job runner starts it when JOB_NODE_PORT is set; node_worker.py on any
+machine that can reach the port then takes jobs from the same queue as the
+runner's own slots. JSON in and out, under the runner's leases:
+
+  POST /claim                  {"owner", "slots", "running"} -> {"job": {...}, "lease_s"} | 204
+  POST /jobs/<id>/heartbeat    {"owner"} -> {"ok": bool, "cancel": bool}
+  GET  /jobs/<id>/video        the uploaded video            (lease holder only)
+  GET  /jobs/<id>/script       the rewritten analyzer script (lease holder only)
+  PUT  /jobs/<id>/files/<path> one result file into the job's output directory
+  POST /jobs/<id>/complete     {"owner", "report", "state", "error"}
+  POST /jobs/<id>/fail         {"owner", "error"} -> {"state"}
+  POST /release                {"owner"}: give the owner's running jobs back
+  GET  /jobs/<id>              {"job": {"id", "state", "attempts", "error"}}
+  GET  /nodes                  hosts seen within a lease, with their slots
+
+Jobs only come in through the runner (the server's submits); nodes cannot
+add any, and never see the coordinator's script, env or cleanup paths.
+
+Every claim, and every heartbeat, advertises the node's slots, and the
+runner counts them into the queue's completion estimates. A node that stops
+heartbeating (crashed, cut off) loses its leases, and the runner's sweep
+requeues its jobs for whoever claims next. A cancelled remote job is told so
+in its next heartbeat. Requests and file transfers for a job other than the
+caller's own lease are refused. With JOB_NODE_TOKEN set every request
+needs ``Authorization: Bearer <token>``; the service listens on loopback
+only unless there is a token.
+
+To try nodes out on one machine, run the runner with no local slots and
+send it jobs on stdin as the server does:
+
+    JOB_SLOTS=0 JOB_NODE_PORT=8765 python scripts/job_runner.py
+    NODE_COORDINATOR=http://127.0.0.1:8765 NODE_WORK_DIR=/tmp/node1 python scripts/node_worker.py
+
+Environment:
+  JOB_NODE_PORT   port to listen on
+  JOB_NODE_HOST   address to listen on (default 127.0.0.1; any other needs a token)
+  JOB_NODE_TOKEN  shared secret nodes must send (default: none)
+"""
+import ipaddress
+import json
+import os
+import re
+import shutil
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import unquote, urlsplit
+
+CHUNK = 1 << 20
+# Job fields a node gets; paths are the coordinator's, the node fetches the files
+NODE_FIELDS = ('id', 'exercise', 'mode', 'activity', 'video', 'output_dir', 'output_id', 'env', 'budget_s',
+               'attempts', 'estimate_s')
+
+
+def _is_loopback(host):
+    if host == 'localhost':
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+
+class HttpError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class NodeService:
+    def __init__(self, runner, port, host='127.0.0.1', token=None):
+        if not token and not _is_loopback(host):
+            raise ValueError(f"Node service on {host} needs a token (JOB_NODE_TOKEN)")
+        self.runner = runner
+        self.queue = runner.queue
+        self.token = token
+        self.nodes = {}          # owner -> {'host', 'slots', 'running', 'seen'}
+        self.cancels = set()     # running remote jobs to stop
+        self.lock = threading.Lock()
+        handler = type('NodeHandler', (_Handler,), {'service': self})
+        self.server = ThreadingHTTPServer((host, port), handler)
+        self.server.daemon_threads = True
+        self.thread = None
+
+    @property
+    def port(self):
+        return self.server.server_address[1]
+
+    def start(self):
+        self.thread = threading.Thread(target=self.server.serve_forever, name="node-service", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    # -------- Nodes --------
+    def _seen(self, body):
+        owner = body.get('owner')
+        if not owner:
+            raise HttpError(400, "owner is required")
+        with self.lock:
+            node = self.nodes.setdefault(owner, {'host': owner.split(':')[0], 'slots': 0, 'running': 0})
+            node['seen'] = time.time()
+            for key in ('slots', 'running'):
+                if key in body:
+                    node[key] = int(body[key])
+        return owner
+
+    def live_nodes(self):
+        """Nodes seen within a lease; owner ids stay private, they are what a lease is checked against."""
+        cutoff = time.time() - self.queue.lease_s
+        with self.lock:
+            return [dict(node) for node in self.nodes.values() if node['seen'] >= cutoff]
+
+    def remote_slots(self):
+        return sum(node['slots'] for node in self.live_nodes())
+
+    def request_cancel(self, job_id):
+        with self.lock:
+            self.cancels.add(job_id)
+
+    def _held(self, job_id, owner):
+        job = self.queue.get(job_id)
+        if job is None:
+            raise HttpError(404, f"Unknown job {job_id}")
+        if job['state'] != 'running' or job['lease_owner'] != owner:
+            raise HttpError(409, f"Job {job_id} is not leased to {owner}")
+        return job
+
+    # -------- Actions --------
+    def claim(self, body):
+        owner = self._seen(body)
+        job = self.queue.claim(owner)
+        if job is None:
+            return None
+        self.runner.event('running', job['id'], node=owner)
+        return {'job': {key: job.get(key) for key in NODE_FIELDS} | {'script': bool(job.get('script'))},
+                'lease_s': self.queue.lease_s}
+
+    def heartbeat(self, job_id, body):
+        owner = self._seen(body)
+        ok = self.queue.heartbeat(job_id, owner)
+        with self.lock:
+            cancel = job_id in self.cancels
+        return {'ok': ok, 'cancel': ok and cancel}
+
+    def complete(self, job_id, body):
+        owner = self._seen(body)
+        state = body.get('state') or 'done'
+        if state not in ('done', 'cancelled', 'expired'):
+            raise HttpError(400, f"Cannot complete as {state}")
+        job = self._held(job_id, owner)
+        if not self.queue.complete(job_id, owner, body.get('report'), state=state, error=body.get('error')):
+            raise HttpError(409, f"Job {job_id} is not leased to {owner}")
+        self._settled(job, state)
+        return {'ok': True}
+
+    def fail(self, job_id, body):
+        owner = self._seen(body)
+        job = self._held(job_id, owner)
+        state = self.queue.fail(job_id, owner, body.get('error') or 'failed')
+        if state:
+            self._settled(job, 'retrying' if state == 'queued' else state)
+        return {'state': state}
+
+    def _settled(self, job, outcome):
+        with self.lock:
+            self.cancels.discard(job['id'])
+        self.runner.settle(job, outcome, round(time.time() - job['started_at'], 3))
+        self.runner.wake.set()
+
+    def release(self, body):
+        owner = self._seen(body)
+        released = self.queue.release(owner)
+        with self.lock:
+            self.nodes.pop(owner, None)
+        self.runner.wake.set()
+        return {'released': released}
+
+    def output_path(self, job, relpath):
+        rel = os.path.normpath(unquote(relpath))
+        if os.path.isabs(rel) or rel.startswith('..') or not job.get('output_dir'):
+            raise HttpError(400, f"Bad result path {relpath}")
+        return os.path.join(job['output_dir'], rel)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    service = None
+    protocol_version = 'HTTP/1.1'
+
+    ROUTES = (
+        ('POST', r'/claim', 'claim'),
+        ('POST', r'/release', 'release'),
+        ('GET', r'/nodes', 'nodes'),
+        ('GET', r'/jobs/([^/]+)', 'get'),
+        ('POST', r'/jobs/([^/]+)/heartbeat', 'heartbeat'),
+        ('POST', r'/jobs/([^/]+)/complete', 'complete'),
+        ('POST', r'/jobs/([^/]+)/fail', 'fail'),
+        ('GET', r'/jobs/([^/]+)/(video|script)', 'download'),
+        ('PUT', r'/jobs/([^/]+)/files/(.+)', 'upload'),
+    )
+
+    def log_message(self, fmt, *args):
+        pass
+
+    def _reply(self, status, body=None):
+        data = json.dumps(body, default=str).encode() if body is not None else b''
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _body(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        self._consumed = True
+        return json.loads(self.rfile.read(length)) if length else {}
+
+    def _route(self, method):
+        service = self.service
+        path = urlsplit(self.path).path.rstrip('/')
+        try:
+            if service.token and self.headers.get('Authorization') != f"Bearer {service.token}":
+                raise HttpError(401, "Bad or missing token")
+            for verb, pattern, action in self.ROUTES:
+                match = re.fullmatch(pattern, path)
+                if verb == method and match:
+                    return getattr(self, f"do_{action}")(*match.groups())
+            raise HttpError(404, f"No route for {method} {path}")
+        except HttpError as e:
+            self._drain()
+            self._reply(e.status, {'error': str(e)})
+        except (ValueError, KeyError) as e:
+            self._reply(400, {'error': f"Bad request: {e}"})
+
+    def _drain(self):
+        # Unread request body would be taken for the next request on the connection
+        length = int(self.headers.get('Content-Length') or 0)
+        if length and not getattr(self, '_consumed', False):
+            self.rfile.read(length)
+        self._consumed = True
+
+    def do_GET(self):
+        self._consumed = False
+        self._route('GET')
+
+    def do_POST(self):
+        self._consumed = False
+        self._route('POST')
+
+    def do_PUT(self):
+        self._consumed = False
+        self._route('PUT')
+
+    # -------- Actions --------
+    def do_claim(self):
+        result = self.service.claim(self._body())
+        if result is None:
+            return self._reply(204)
+        self._reply(200, result)
+
+    def do_release(self):
+        self._reply(200, self.service.release(self._body()))
+
+    def do_nodes(self):
+        self._reply(200, {'nodes': self.service.live_nodes(), 'slots': self.service.remote_slots()})
+
+    def do_get(self, job_id):
+        job = self.service.queue.get(job_id)
+        if job is None:
+            raise HttpError(404, f"Unknown job {job_id}")
+        self._reply(200, {'job': {key: job[key] for key in ('id', 'state', 'attempts', 'error')}})
+
+    def do_heartbeat(self, job_id):
+        self._reply(200, self.service.heartbeat(job_id, self._body()))
+
+    def do_complete(self, job_id):
+        self._reply(200, self.service.complete(job_id, self._body()))
+
+    def do_fail(self, job_id):
+        self._reply(200, self.service.fail(job_id, self._body()))
+
+    def do_download(self, job_id, which):
+        job = self.service._held(job_id, self.headers.get('X-Lease-Owner'))
+        path = job.get(which)
+        if not path or not os.path.exists(path):
+            raise HttpError(404, f"Job {job_id} has no {which}")
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/octet-stream')
+        self.send_header('Content-Length', str(os.path.getsize(path)))
+        self.end_headers()
+        with open(path, 'rb') as f:
+            shutil.copyfileobj(f, self.wfile, CHUNK)
+
+    def do_upload(self, job_id, relpath):
+        job = self.service._held(job_id, self.headers.get('X-Lease-Owner'))
+        dest = self.service.output_path(job, relpath)
+        os.makedirs(os.path.dirname(dest), exist_ok=True)
+        remaining = int(self.headers.get('Content-Length') or 0)
+        tmp = dest + '.part'
+        with open(tmp, 'wb') as f:
+            while remaining:
+                chunk = self.rfile.read(min(CHUNK, remaining))
+                if not chunk:
+                    raise HttpError(400, "Upload cut short")
+                f.write(chunk)
+                remaining -= len(chunk)
+        self._consumed = True
+        os.replace(tmp, dest)
+        self._reply(200, {'ok': True})
+
+
+def service_from_env(runner):
+    """The runner's NodeService when JOB_NODE_PORT is set, else None."""
+    port = os.environ.get("JOB_NODE_PORT")
+    if not port:
+        return None
+    return NodeService(runner, int(port), host=os.environ.get("JOB_NODE_HOST", "127.0.0.1"),
+                       token=os.environ.get("JOB_NODE_TOKEN") or None)
+
@@ -0,0 +1,294 @@
+"""Analysis node: runs jobs of a job runner on another machine.
+
+The node claims jobs from the runner's node service (node_service.py) over
+HTTP and runs them in its own workers, with the same JobRunner as the
+coordinator; only the queue behind it is remote. For each job it downloads
+the video and the rewritten script, points the script's paths at its own
+copies, runs it, uploads the output directory (the rep log, annotated video,
+...) into the job's output directory on the coordinator, and reports the
+result there. Every claim and heartbeat advertises the node's slots.
+
+Leases work as they do locally: a job is heartbeated while it runs, and a
+node that dies or loses the coordinator for longer than a lease has its jobs
+requeued for others. Checkpoints (checkpoint.py) stay with the node that
+wrote them, so a job retried elsewhere starts from the beginning.
+
+    NODE_COORDINATOR=http://10.0.0.5:8765 python scripts/node_worker.py
+
+Environment:
+  NODE_COORDINATOR  base URL of the runner's node service (required)
+  NODE_SLOTS        jobs run at once here (default: half the cores, at least 1)
+  NODE_WORK_DIR     local copies of videos and results (default: ./node-work); job copies
+                    left in it are removed at start, and a non-empty directory
+                    the node did not create is refused
+  JOB_NODE_TOKEN    shared secret of the node service (default: none)
+  and the worker's WORKER_* settings, JOB_BUDGET_S, JOB_KILL_GRACE_S
+"""
+import http.client
+import json
+import os
+import re
+import shutil
+import signal
+import sys
+import threading
+import time
+from urllib.parse import quote, urlsplit
+
+import checkpoint
+from job_runner import runner_from_env
+
+CHUNK = 1 << 20
+RETRY_FOR_S = 60.0
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+WORK_MARKER = '.node-work'   # marks a work directory as the node's own
+
+
+class CoordinatorError(Exception):
+    def __init__(self, status, message):
+        super().__init__(f"{status}: {message}")
+        self.status = status
+
+
+def _posix(path):
+    return path.replace('\\', '/')
+
+
+class RemoteQueue:
+    """The part of JobQueue a JobRunner uses, answered by the coordinator."""
+
+    def __init__(self, url, work_dir, slots, token=None):
+        parts = urlsplit(url)
+        self.host = parts.hostname
+        self.port = parts.port or (443 if parts.scheme == 'https' else 80)
+        self.https = parts.scheme == 'https'
+        self.prefix = parts.path.rstrip('/')
+        self.work_dir = os.path.abspath(work_dir)
+        self._clear_work_dir()
+        self.slots = slots
+        self.token = token
+        self.lease_s = 30.0
+        self.jobs = {}            # job id -> local job, while it runs here
+        self.lock = threading.Lock()
+        self.failing_since = {}   # job id -> time.time() heartbeats started failing
+        self.on_cancel = None     # called with a job id the coordinator wants stopped
+
+    # -------- HTTP --------
+    def _request(self, method, path, body=None, headers=None, retry=True):
+        """(response, connection) of one request; connection errors are retried for a while."""
+        give_up = time.monotonic() + (RETRY_FOR_S if retry else 0)
+        headers = dict(headers or {})
+        if self.token:
+            headers['Authorization'] = f"Bearer {self.token}"
+        if isinstance(body, dict):
+            body = json.dumps(body).encode()
+            headers['Content-Type'] = 'application/json'
+        while True:
+            conn_type = http.client.HTTPSConnection if self.https else http.client.HTTPConnection
+            conn = conn_type(self.host, self.port, timeout=60)
+            try:
+                if hasattr(body, 'read'):
+                    headers['Content-Length'] = str(os.fstat(body.fileno()).st_size)
+                    body.seek(0)
+                conn.request(method, self.prefix + path, body=body, headers=headers)
+                return conn.getresponse(), conn
+            except (OSError, http.client.HTTPException) as e:
+                conn.close()
+                if time.monotonic() >= give_up:
+                    raise ConnectionError(f"Coordinator unreachable: {e}") from e
+                time.sleep(2)
+
+    def _call(self, method, path, body=None, retry=True):
+        resp, conn = self._request(method, path, body, retry=retry)
+        try:
+            data = resp.read()
+        finally:
+            conn.close()
+        if resp.status == 204:
+            return None
+        payload = json.loads(data) if data else {}
+        if resp.status >= 400:
+            raise CoordinatorError(resp.status, payload.get('error', resp.reason))
+        return payload
+
+    def _download(self, job_id, which, dest, owner):
+        resp, conn = self._request('GET', f"/jobs/{quote(job_id)}/{which}", headers={'X-Lease-Owner': owner})
+        try:
+            if resp.status != 200:
+                raise CoordinatorError(resp.status, resp.read()[:200].decode(errors='replace'))
+            with open(dest, 'wb') as f:
+                shutil.copyfileobj(resp, f, CHUNK)
+        finally:
+            conn.close()
+
+    def _upload(self, job_id, relpath, path, owner):
+        with open(path, 'rb') as f:
+            resp, conn = self._request('PUT', f"/jobs/{quote(job_id)}/files/{quote(_posix(relpath))}", body=f,
+                                       headers={'X-Lease-Owner': owner,
+                                                'Content-Type': 'application/octet-stream'})
+        try:
+            data = resp.read()
+        finally:
+            conn.close()
+        if resp.status != 200:
+            raise CoordinatorError(resp.status, data[:200].decode(errors='replace'))
+
+    # -------- Local copies --------
+    def _clear_work_dir(self):
+        """Remove job copies left by a crashed run (their jobs were requeued); refuse a directory not ours."""
+        marker = os.path.join(self.work_dir, WORK_MARKER)
+        os.makedirs(self.work_dir, exist_ok=True)
+        entries = os.listdir(self.work_dir)
+        if entries and WORK_MARKER not in entries:
+            raise ValueError(f"{self.work_dir} is not empty and not a node work directory")
+        for name in entries:
+            path = os.path.join(self.work_dir, name)
+            if name != WORK_MARKER and os.path.isdir(path) and not os.path.islink(path):
+                shutil.rmtree(path, ignore_errors=True)
+        open(marker, 'a').close()
+
+    def _rebase_script(self, text, job, video, output_dir):
+        """The coordinator's script with its video, output and scripts paths swapped for this node's."""
+        text = text.replace(_posix(job['video']), _posix(video))
+        text = text.replace(_posix(job['output_dir']), _posix(output_dir))
+        return re.sub(r'^sys\.path\.insert\(0, r"[^"]*"\)$', lambda _: f'sys.path.insert(0, r"{_posix(SCRIPTS_DIR)}")',
+                      text, count=1, flags=re.M)
+
+    def _localize(self, job, owner):
+        base = os.path.join(self.work_dir, job['id'])
+        shutil.rmtree(base, ignore_errors=True)
+        os.makedirs(base)
+        video = os.path.join(base, os.path.basename(job['video']))
+        self._download(job['id'], 'video', video, owner)
+        output_dir = os.path.join(base, os.path.basename(job['output_dir'].rstrip('/\\')))
+        os.makedirs(output_dir)
+        script = None
+        if job.pop('script'):
+            script = os.path.join(base, 'script.py')
+            self._download(job['id'], 'script', script, owner)
+            with open(script, encoding='utf-8') as f:
+                text = f.read()
+            with open(script, 'w', encoding='utf-8') as f:
+                f.write(self._rebase_script(text, job, video, output_dir))
+        return dict(job, video=video, script=script, output_dir=output_dir, base=base,
+                    remote_output_dir=job['output_dir'], state='running', lease_owner=owner, cleanup=[])
+
+    # -------- JobQueue --------
+    def claim(self, owner):
+        with self.lock:
+            running = len(self.jobs)
+        try:
+            reply = self._call('POST', '/claim', {'owner': owner, 'slots': self.slots, 'running': running})
+        except (ConnectionError, CoordinatorError) as e:
+            print(f"Node: no claim: {e}", file=sys.stderr, flush=True)
+            return None
+        if reply is None:
+            return None
+        self.lease_s = float(reply.get('lease_s') or self.lease_s)
+        try:
+            job = self._localize(reply['job'], owner)
+        except (OSError, CoordinatorError) as e:
+            shutil.rmtree(os.path.join(self.work_dir, reply['job']['id']), ignore_errors=True)
+            self.fail(reply['job']['id'], owner, f"Node could not fetch the job: {e}")
+            return None
+        with self.lock:
+            self.jobs[job['id']] = job
+        return job
+
+    def get(self, job_id):
+        with self.lock:
+            if job_id in self.jobs:
+                return dict(self.jobs[job_id])
+        try:
+            return self._call('GET', f"/jobs/{quote(job_id)}", retry=False)['job']
+        except (ConnectionError, CoordinatorError):
+            return None
+
+    def heartbeat(self, job_id, owner):
+        """Renew the lease; False once the coordinator refused it or has not answered for a lease."""
+        try:
+            reply = self._call('POST', f"/jobs/{quote(job_id)}/heartbeat",
+                               {'owner': owner, 'slots': self.slots, 'running': len(self.jobs)}, retry=False)
+        except (ConnectionError, CoordinatorError):
+            since = self.failing_since.setdefault(job_id, time.time())
+            return time.time() - since < self.lease_s
+        self.failing_since.pop(job_id, None)
+        if reply.get('cancel') and self.on_cancel is not None:
+            self.on_cancel(job_id)
+        return bool(reply.get('ok'))
+
+    def complete(self, job_id, owner, report=None, state='done', error=None):
+        job = self._forget(job_id)
+        if job is None:
+            return False
+        try:
+            for root, dirs, files in os.walk(job['output_dir']):
+                dirs[:] = [d for d in dirs if d != checkpoint.DIRNAME]
+                for name in files:
+                    path = os.path.join(root, name)
+                    self._upload(job_id, os.path.relpath(path, job['output_dir']), path, owner)
+            self._call('POST', f"/jobs/{quote(job_id)}/complete",
+                       {'owner': owner, 'report': report, 'state': state, 'error': error})
+            return True
+        except (ConnectionError, CoordinatorError) as e:
+            print(f"Node: result of {job_id} not delivered: {e}", file=sys.stderr, flush=True)
+            return False
+        finally:
+            shutil.rmtree(job['base'], ignore_errors=True)
+
+    def fail(self, job_id, owner, error, retry=True):
+        job = self._forget(job_id)
+        if job is not None:
+            shutil.rmtree(job['base'], ignore_errors=True)
+        try:
+            return self._call('POST', f"/jobs/{quote(job_id)}/fail", {'owner': owner, 'error': str(error)})['state']
+        except (ConnectionError, CoordinatorError):
+            return None
+
+    def cancel(self, job_id, error="Cancelled"):
+        with self.lock:
+            return 'running' if job_id in self.jobs else None
+
+    def _forget(self, job_id):
+        self.failing_since.pop(job_id, None)
+        with self.lock:
+            return self.jobs.pop(job_id, None)
+
+    def release(self, owner):
+        with self.lock:
+            jobs, self.jobs = list(self.jobs.values()), {}
+        for job in jobs:
+            shutil.rmtree(job['base'], ignore_errors=True)
+        try:
+            return self._call('POST', '/release', {'owner': owner}, retry=False)['released']
+        except (ConnectionError, CoordinatorError):
+            return 0   # the coordinator requeues them when the leases run out
+
+    def requeue_expired(self):
+        return []   # the coordinator's sweep does this
+
+
+if __name__ == "__main__":
+    url = os.environ.get("NODE_COORDINATOR")
+    if not url:
+        sys.exit("NODE_COORDINATOR is required")
+    slots = os.environ.get("NODE_SLOTS", "")
+    slots = int(slots) if slots.strip() else max(1, (os.cpu_count() or 2) // 2)
+    try:
+        queue = RemoteQueue(url, os.environ.get("NODE_WORK_DIR", "node-work"), slots,
+                            token=os.environ.get("JOB_NODE_TOKEN") or None)
+    except ValueError as e:
+        sys.exit(str(e))
+    runner = runner_from_env(queue, slots)
+    queue.on_cancel = runner.cancel
+    try:
+        runner.start()
+    except RuntimeError as e:
+        sys.exit(str(e))
+    print(f"Node {runner.owner}: {slots} slot(s) for {url}", file=sys.stderr, flush=True)
+    stopped = threading.Event()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(sig, lambda *_: stopped.set())
+    stopped.wait()
+    released = runner.stop()
+    print(f"Node stopped, {released} job(s) back in the queue", file=sys.stderr, flush=True)
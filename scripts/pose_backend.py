@@ -0,0 +1,452 @@
+"""Pose inference backends for the analyzer scripts.
+
+Every analyzer calls ``pose.process(rgb)`` and reads
+``results.pose_landmarks.landmark``. ``create_pose()`` returns an object with
+that interface, backed by one of:
+
+  mediapipe  mp.solutions.pose.Pose (default, one graph per job)
+  tflite     pose_detection.tflite + pose_landmark_*.tflite through TFLite (XNNPACK)
+  onnx       the same models converted to ONNX through ONNX Runtime
+
+The tflite/onnx backends run MediaPipe's pose pipeline themselves (person
+detector, rotated ROI, landmark model; see ``BatchedPose``) through one
+``BatchScheduler`` per model, which stacks the frames of every client into a
+single inference call. Under the job runner the schedulers live in the
+runner's pose service (pose_service.py), fed by all of its workers;
+live_host.py batches its streams in its own process.
+
+Environment:
+  POSE_BACKEND        mediapipe | tflite | onnx
+  POSE_MODEL_PATH     landmark model file for tflite/onnx (pose_landmark_*)
+  POSE_DETECTOR_PATH  person detector model file for tflite/onnx (pose_detection)
+  POSE_NUM_THREADS    inference threads (default: all cores)
+  POSE_MAX_BATCH      largest batch per inference call (default 8)
+  POSE_BATCH_WAIT_MS  how long to wait for a batch to fill (default 4)
+  JOB_CHECKPOINT_DIR  checkpoint the job's pose results (see checkpoint.py)
+"""
+import functools
+import math
+import os
+import queue
+import threading
+from concurrent.futures import Future
+from types import SimpleNamespace
+
+import cv2
+import numpy as np
+
+NUM_LANDMARKS = 33        # MediaPipe PoseLandmark count
+MODEL_LANDMARKS = 39      # 33 body + 6 auxiliary ROI points in the BlazePose landmark model
+ROI_SCALE = 1.25          # same ROI expansion the MediaPipe pose graph uses
+MIN_ROI_PX = 32
+
+
+def _sigmoid(x):
+    return 1.0 / (1.0 + np.exp(-x))
+
+
+# -------- Result objects --------
+def _landmark_list(points):
+    # Build the protobuf MediaPipe's drawing utils expect when it is installed,
+    # otherwise plain objects with the same attributes.
+    try:
+        from mediapipe.framework.formats import landmark_pb2
+    except ImportError:
+        return SimpleNamespace(landmark=[
+            SimpleNamespace(x=float(x), y=float(y), z=float(z), visibility=float(v))
+            for x, y, z, v in points
+        ])
+    lm_list = landmark_pb2.NormalizedLandmarkList()
+    for x, y, z, v in points:
+        lm_list.landmark.add(x=float(x), y=float(y), z=float(z), visibility=float(v))
+    return lm_list
+
+
+def make_result(points):
+    """Wrap an (33, 4) array of normalized x, y, z, visibility like a Pose result."""
+    if points is None:
+        return SimpleNamespace(pose_landmarks=None)
+    return SimpleNamespace(pose_landmarks=_landmark_list(points))
+
+
+# -------- Handle accounting --------
+# Pose handles created and not closed yet; a long-lived worker (worker.py)
+# reports it after every job, so a graph that is never closed shows up
+_open_handles = 0
+_handles_lock = threading.Lock()
+
+
+def _track(delta):
+    global _open_handles
+    with _handles_lock:
+        _open_handles += delta
+
+
+def open_pose_handles():
+    return _open_handles
+
+
+# -------- MediaPipe backend --------
+class MediaPipeBackend:
+    def __init__(self, **pose_kwargs):
+        import mediapipe as mp
+        self.pose = mp.solutions.pose.Pose(**pose_kwargs)
+        self.closed = False
+        _track(1)
+
+    def process(self, rgb):
+        return self.pose.process(rgb)
+
+    def close(self):
+        if not self.closed:
+            self.closed = True
+            _track(-1)
+        self.pose.close()
+
+
+# -------- Model runtimes --------
+class ModelRuntime:
+    """One model file; ``outputs(batch)`` runs (N, S, S, 3) float32 and returns its raw output arrays."""
+    input_size = 256
+
+    def outputs(self, batch):
+        raise NotImplementedError
+
+
+class TFLiteRuntime(ModelRuntime):
+    def __init__(self, model_path, num_threads=None):
+        try:
+            from tflite_runtime.interpreter import Interpreter
+        except ImportError:
+            from tensorflow.lite import Interpreter
+        # XNNPACK is the default CPU delegate for float models; num_threads sizes its pool.
+        self.interpreter = Interpreter(model_path=model_path, num_threads=num_threads or os.cpu_count())
+        self.interpreter.allocate_tensors()
+        self.input_index = self.interpreter.get_input_details()[0]['index']
+        self.input_size = int(self.interpreter.get_input_details()[0]['shape'][1])
+        self.batch = 1
+
+    def outputs(self, batch):
+        n = len(batch)
+        if n != self.batch:
+            self.interpreter.resize_tensor_input(self.input_index, [n, self.input_size, self.input_size, 3])
+            self.interpreter.allocate_tensors()
+            self.batch = n
+        self.interpreter.set_tensor(self.input_index, batch)
+        self.interpreter.invoke()
+        return [self.interpreter.get_tensor(d['index']) for d in self.interpreter.get_output_details()]
+
+
+class OnnxRuntime(ModelRuntime):
+    def __init__(self, model_path, num_threads=None):
+        import onnxruntime as ort
+        opts = ort.SessionOptions()
+        opts.intra_op_num_threads = num_threads or os.cpu_count()
+        opts.inter_op_num_threads = 1
+        self.session = ort.InferenceSession(model_path, sess_options=opts, providers=['CPUExecutionProvider'])
+        inp = self.session.get_inputs()[0]
+        self.input_name = inp.name
+        self.nchw = inp.shape[1] == 3
+        self.input_size = int(inp.shape[2] if self.nchw else inp.shape[1])
+        # Converted models often pin the batch dimension to 1.
+        self.dynamic_batch = not isinstance(inp.shape[0], int)
+
+    def outputs(self, batch):
+        if self.nchw:
+            batch = np.ascontiguousarray(batch.transpose(0, 3, 1, 2))
+        if self.dynamic_batch:
+            return self.session.run(None, {self.input_name: batch})
+        parts = [self.session.run(None, {self.input_name: b[None]}) for b in batch]
+        return [np.concatenate(outs) for outs in zip(*parts)]
+
+
+def open_runtime(backend, model_path, num_threads=None):
+    return TFLiteRuntime(model_path, num_threads) if backend == "tflite" else OnnxRuntime(model_path, num_threads)
+
+
+# -------- BlazePose models --------
+class LandmarkModel:
+    """The BlazePose landmark model on square ROI crops.
+
+    ``run(batch)`` takes (N, S, S, 3) uint8 RGB and returns ``(landmarks,
+    presence)`` with shapes (N, 39, 5) in crop pixels and (N,).
+    """
+
+    def __init__(self, runtime):
+        self.runtime = runtime
+        self.input_size = runtime.input_size
+
+    def run(self, batch):
+        n = len(batch)
+        landmarks = presence = None
+        for out in self.runtime.outputs(batch.astype(np.float32) / 255.0):
+            out = np.asarray(out).reshape(n, -1)
+            if out.shape[1] == MODEL_LANDMARKS * 5 and landmarks is None:
+                landmarks = out.reshape(n, MODEL_LANDMARKS, 5)
+            elif out.shape[1] == 1 and presence is None:
+                presence = out[:, 0]
+        if landmarks is None or presence is None:
+            raise ValueError("model outputs do not look like a BlazePose landmark model")
+        return landmarks, presence
+
+
+class DetectorModel:
+    """The BlazePose person detector on letterboxed frames.
+
+    ``run(batch)`` takes (N, S, S, 3) uint8 RGB and returns ``(regressors,
+    scores)``: (N, A, 12) box and keypoint offsets in input pixels and (N, A)
+    logits, one per SSD anchor.
+    """
+
+    def __init__(self, runtime):
+        self.runtime = runtime
+        self.input_size = runtime.input_size
+
+    def run(self, batch):
+        n, a = len(batch), len(ssd_anchors(self.input_size))
+        regressors = scores = None
+        for out in self.runtime.outputs(batch.astype(np.float32) / 127.5 - 1.0):
+            out = np.asarray(out)
+            if out.size == n * a * DETECTOR_COORDS and regressors is None:
+                regressors = out.reshape(n, a, DETECTOR_COORDS)
+            elif out.size == n * a and scores is None:
+                scores = out.reshape(n, a)
+        if regressors is None or scores is None:
+            raise ValueError("model outputs do not look like a BlazePose detector")
+        return regressors, scores
+
+
+DETECTOR_COORDS = 12      # box (cx, cy, w, h) + 4 keypoints (x, y); keypoints 0/1 align the body
+DETECTOR_STRIDES = (8, 16, 32, 32, 32)
+DETECTOR_NMS_IOU = 0.3
+
+
+@functools.lru_cache(maxsize=None)
+def ssd_anchors(size, strides=DETECTOR_STRIDES):
+    """(A, 2) normalized anchor centers of the BlazePose detector (fixed-size anchors, 2 per cell and layer)."""
+    centers = []
+    layer = 0
+    while layer < len(strides):
+        # Layers with the same stride share a feature map; each adds two anchors per cell
+        last = layer
+        while last < len(strides) and strides[last] == strides[layer]:
+            last += 1
+        cells = math.ceil(size / strides[layer])
+        per_cell = 2 * (last - layer)
+        for y in range(cells):
+            for x in range(cells):
+                centers.extend([((x + 0.5) / cells, (y + 0.5) / cells)] * per_cell)
+        layer = last
+    return np.array(centers, dtype=np.float32)
+
+
+def decode_detection(regressors, scores, anchors, size, min_score):
+    """(score, (4, 2) keypoints in input pixels) of the strongest person, or None.
+
+    As in MediaPipe's weighted non-maximum suppression, the keypoints are the
+    score-weighted mean over the boxes that overlap the best one.
+    """
+    scores = _sigmoid(np.clip(scores, -100.0, 100.0))
+    best = int(np.argmax(scores))
+    if scores[best] < min_score:
+        return None
+    centers = regressors[:, :2] / size + anchors
+    half = regressors[:, 2:4] / size / 2
+    boxes = np.concatenate([centers - half, centers + half], axis=1)
+    lo = np.maximum(boxes[:, :2], boxes[best, :2])
+    hi = np.minimum(boxes[:, 2:], boxes[best, 2:])
+    inter = np.prod(np.clip(hi - lo, 0, None), axis=1)
+    area = np.prod(boxes[:, 2:] - boxes[:, :2], axis=1)
+    iou = inter / np.maximum(area + area[best] - inter, 1e-9)
+    members = (scores >= min_score) & (iou > DETECTOR_NMS_IOU)
+    members[best] = True
+    weights = scores[members]
+    keypoints = regressors[members, 4:].reshape(-1, 4, 2) / size + anchors[members, None, :]
+    keypoints = (weights[:, None, None] * keypoints).sum(axis=0) / weights.sum()
+    return float(scores[best]), keypoints * size
+
+
+def _align(start, end):
+    """Square ROI (cx, cy, side, rotation) centered on ``start`` and turned so ``end`` points up.
+
+    MediaPipe's alignment: the body spans twice the start-end distance, widened by ROI_SCALE.
+    """
+    dx, dy = end[0] - start[0], end[1] - start[1]
+    rotation = math.pi / 2 - math.atan2(-dy, dx)
+    rotation = rotation - 2 * math.pi * math.floor((rotation + math.pi) / (2 * math.pi))
+    side = max(2 * math.hypot(dx, dy) * ROI_SCALE, MIN_ROI_PX)
+    return float(start[0]), float(start[1]), side, rotation
+
+
+# -------- Cross-job batching --------
+class BatchScheduler:
+    """Collects inputs of one model from every client and runs them as one batch."""
+
+    def __init__(self, model, max_batch=8, max_wait_ms=4):
+        self.model = model
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000.0
+        self.requests = queue.Queue()
+        self.clients = 0   # open BatchedPose handles; a batch holds at most one frame of each
+        self.clients_lock = threading.Lock()
+        self.batches = 0
+        self.frames = 0
+        self._thread = threading.Thread(target=self._loop, name="pose-batcher", daemon=True)
+        self._thread.start()
+
+    @property
+    def input_size(self):
+        return self.model.input_size
+
+    def attach(self, n=1):
+        with self.clients_lock:
+            self.clients += n
+
+    def submit(self, crop):
+        fut = Future()
+        self.requests.put((crop, fut))
+        return fut
+
+    def _loop(self):
+        while True:
+            pending = [self.requests.get()]
+            try:
+                # Waiting only pays when another client may still send a frame
+                while len(pending) < min(self.max_batch, self.clients):
+                    pending.append(self.requests.get(timeout=self.max_wait))
+            except queue.Empty:
+                pass
+            batch = np.stack([crop for crop, _ in pending])
+            try:
+                outputs = self.model.run(batch)
+            except Exception as e:
+                for _, fut in pending:
+                    fut.set_exception(e)
+                continue
+            self.batches += 1
+            self.frames += len(pending)
+            for i, (_, fut) in enumerate(pending):
+                fut.set_result(tuple(out[i] for out in outputs))
+
+
+class BatchedPose:
+    """Per-job handle with the ``pose.process`` interface, following the MediaPipe pose graph.
+
+    Without a pose to follow, the detector finds the person on the
+    letterboxed frame and its two alignment keypoints (hip center and
+    body extent) give a rotated square ROI; the landmark model runs on that
+    crop. After a found pose the next ROI comes from the model's own two
+    auxiliary alignment landmarks, so the detector only runs again once
+    presence drops under ``min_tracking_confidence``. MediaPipe's landmark
+    and visibility smoothing is not reproduced; the counters smooth.
+    """
+
+    def __init__(self, landmarks, detector, min_detection_confidence=0.5, min_tracking_confidence=0.5, **_):
+        self.landmarks = landmarks   # BatchScheduler of the landmark model
+        self.detector = detector     # BatchScheduler of the detector
+        self.min_detection_confidence = min_detection_confidence
+        self.min_tracking_confidence = min_tracking_confidence
+        self.roi = None  # (cx, cy, side, rotation) in pixels and radians
+        self.closed = False
+        landmarks.attach(1)
+        _track(1)
+
+    def _detect(self, rgb):
+        h, w = rgb.shape[:2]
+        size = self.detector.input_size
+        scale = size / max(w, h)
+        ox, oy = (size - w * scale) / 2, (size - h * scale) / 2
+        M = np.array([[scale, 0, ox], [0, scale, oy]], dtype=np.float32)
+        frame = cv2.warpAffine(rgb, M, (size, size), flags=cv2.INTER_LINEAR, borderMode=cv2.BORDER_CONSTANT)
+        regressors, scores = self.detector.submit(frame).result()
+        found = decode_detection(regressors, scores, ssd_anchors(size), size, self.min_detection_confidence)
+        if found is None:
+            return None
+        keypoints = (found[1] - (ox, oy)) / scale
+        return _align(keypoints[0], keypoints[1])
+
+    def process(self, rgb):
+        h, w = rgb.shape[:2]
+        roi = self.roi or self._detect(rgb)
+        if roi is None:
+            return make_result(None)
+        cx, cy, side, rotation = roi
+        size = self.landmarks.input_size
+        c, s = math.cos(rotation), math.sin(rotation)
+        # Image -> crop: rotate by -rotation about the ROI center, then scale to the model input
+        k = size / side
+        M = np.array([[k * c, k * s, 0], [-k * s, k * c, 0]], dtype=np.float32)
+        M[:, 2] = size / 2 - M[:, :2] @ (cx, cy)
+        crop = cv2.warpAffine(rgb, M, (size, size), flags=cv2.INTER_LINEAR, borderMode=cv2.BORDER_CONSTANT)
+        raw, presence = self.landmarks.submit(crop).result()
+        if float(presence) < self.min_tracking_confidence:
+            self.roi = None
+            return make_result(None)
+
+        u, v = (raw[:, 0] - size / 2) / k, (raw[:, 1] - size / 2) / k
+        px, py = cx + c * u - s * v, cy + s * u + c * v
+        pz = raw[:, 2] / k / w
+        vis = _sigmoid(raw[:, 3])
+        points = np.stack([px / w, py / h, pz, vis], axis=1)[:NUM_LANDMARKS]
+        self.roi = _align((px[NUM_LANDMARKS], py[NUM_LANDMARKS]), (px[NUM_LANDMARKS + 1], py[NUM_LANDMARKS + 1]))
+        return make_result(points)
+
+    def close(self):
+        if not self.closed:
+            self.closed = True
+            self.landmarks.attach(-1)
+            _track(-1)
+
+
+# -------- Factory --------
+_schedulers = None
+_schedulers_lock = threading.Lock()
+
+
+def local_schedulers(backend=None):
+    """{'landmark', 'detector'}: BatchSchedulers over models loaded in this process."""
+    backend = backend or os.environ.get("POSE_BACKEND", "tflite")
+    paths = {'landmark': os.environ.get("POSE_MODEL_PATH"), 'detector': os.environ.get("POSE_DETECTOR_PATH")}
+    for name, var in (('landmark', "POSE_MODEL_PATH"), ('detector', "POSE_DETECTOR_PATH")):
+        if not paths[name]:
+            raise RuntimeError(f"{var} is required for the {backend} pose backend")
+    threads = int(os.environ.get("POSE_NUM_THREADS", "0")) or None
+    batching = dict(max_batch=int(os.environ.get("POSE_MAX_BATCH", "8")),
+                    max_wait_ms=float(os.environ.get("POSE_BATCH_WAIT_MS", "4")))
+    return {
+        'landmark': BatchScheduler(LandmarkModel(open_runtime(backend, paths['landmark'], threads)), **batching),
+        'detector': BatchScheduler(DetectorModel(open_runtime(backend, paths['detector'], threads)), **batching),
+    }
+
+
+def shared_schedulers(backend=None):
+    """This process's schedulers: the job runner's pose service when it has one, else local ones."""
+    global _schedulers
+    with _schedulers_lock:
+        if _schedulers is None:
+            import pose_service
+            _schedulers = pose_service.connect() or local_schedulers(backend)
+        return _schedulers
+
+
+def create_pose(backend=None, **pose_kwargs):
+    """Drop-in replacement for ``mp.solutions.pose.Pose(**pose_kwargs)``.
+
+    The first handle of a job with a checkpoint directory is checkpointed
+    (checkpoint.py).
+    """
+    import checkpoint
+    job_checkpoint = checkpoint.claim()
+    if job_checkpoint is not None:
+        return checkpoint.CheckpointedPose(lambda: _new_pose(backend, **pose_kwargs), job_checkpoint)
+    return _new_pose(backend, **pose_kwargs)
+
+
+def _new_pose(backend=None, **pose_kwargs):
+    backend = backend or os.environ.get("POSE_BACKEND", "mediapipe")
+    if backend == "mediapipe":
+        return MediaPipeBackend(**pose_kwargs)
+    if backend in ("tflite", "onnx"):
+        schedulers = shared_schedulers(backend)
+        return BatchedPose(schedulers['landmark'], schedulers['detector'], **pose_kwargs)
+    raise ValueError(f"Unknown POSE_BACKEND: {backend}")
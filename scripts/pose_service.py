@@ -0,0 +1,139 @@
+"""Pose inference shared by all of a job runner's workers.
+
+With POSE_BACKEND=tflite/onnx each worker process running its own models
+would have a BatchScheduler with one client, so frames of concurrent jobs
+never share a batch. The job runner instead loads the models once, in a
+``PoseService``, and gives every slot's worker its address; the workers'
+BatchedPose handles (roster_split's processes included) send their crops
+over a pipe and the service stacks the crops of all jobs into one call:
+
+  -> ('hello',)                      <- {'landmark': input size, 'detector': input size}
+  -> ('attach', model, n)            <- None: a handle opened (1) or closed (-1)
+  -> ('landmark' | 'detector', crop) <- ('ok', output, ...) | ('error', message)
+
+Crops travel as uint8. Every client thread has its own connection, so the
+tracks of a multi-athlete job batch with each other too; a connection that
+drops gives back the handles it attached.
+
+Environment (read by the job runner):
+  JOB_POSE_SERVICE  0 = every worker loads its own models (default: one service
+                    when POSE_BACKEND is tflite or onnx)
+and set by it for its workers:
+  POSE_SERVICE, POSE_SERVICE_KEY  address and key of the service
+"""
+import os
+import threading
+from concurrent.futures import Future
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Client, Listener
+
+import pose_backend
+
+
+class PoseService:
+    def __init__(self, schedulers):
+        self.schedulers = schedulers   # model name -> pose_backend.BatchScheduler
+        self.key = os.urandom(16)
+        self.listener = Listener(authkey=self.key)   # Unix socket, or a named pipe on Windows
+        self.closed = False
+        self.thread = None
+
+    def env(self):
+        """What a worker needs to connect."""
+        return {'POSE_SERVICE': self.listener.address, 'POSE_SERVICE_KEY': self.key.hex()}
+
+    def start(self):
+        self.thread = threading.Thread(target=self._accept, name="pose-service", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.closed = True
+        self.listener.close()
+
+    def _accept(self):
+        while not self.closed:
+            try:
+                conn = self.listener.accept()
+            except (OSError, EOFError, AuthenticationError):
+                continue
+            threading.Thread(target=self._serve, args=(conn,), daemon=True).start()
+
+    def _serve(self, conn):
+        attached = {}
+        try:
+            while True:
+                kind, *args = conn.recv()
+                if kind == 'hello':
+                    conn.send({name: s.input_size for name, s in self.schedulers.items()})
+                elif kind == 'attach':
+                    name, n = args
+                    self.schedulers[name].attach(n)
+                    attached[name] = attached.get(name, 0) + n
+                    conn.send(None)
+                else:
+                    try:
+                        conn.send(('ok',) + self.schedulers[kind].submit(args[0]).result())
+                    except Exception as e:
+                        conn.send(('error', f"{type(e).__name__}: {e}"))
+        except (EOFError, OSError):
+            pass
+        finally:
+            for name, n in attached.items():
+                self.schedulers[name].attach(-n)
+            conn.close()
+
+
+# -------- Workers --------
+class _Link:
+    """Connections to the service: one per thread, and new ones in a forked child."""
+
+    def __init__(self, address, key):
+        self.address = address
+        self.key = key
+        self.local = threading.local()
+        self.sizes = self.call('hello')
+
+    def call(self, *msg):
+        local = self.local
+        if getattr(local, 'pid', None) != os.getpid():
+            local.conn = Client(self.address, authkey=self.key)
+            local.pid = os.getpid()
+        local.conn.send(msg)
+        return local.conn.recv()
+
+
+class RemoteScheduler:
+    """A BatchScheduler of the service, with the same ``submit``/``attach``."""
+
+    def __init__(self, link, name):
+        self.link = link
+        self.name = name
+        self.input_size = link.sizes[name]
+
+    def attach(self, n=1):
+        self.link.call('attach', self.name, n)
+
+    def submit(self, crop):
+        fut = Future()
+        status, *outputs = self.link.call(self.name, crop)
+        if status == 'ok':
+            fut.set_result(tuple(outputs))
+        else:
+            fut.set_exception(RuntimeError(f"Pose service: {outputs[0]}"))
+        return fut
+
+
+def connect():
+    """RemoteSchedulers of the service named by POSE_SERVICE, or None without one."""
+    address = os.environ.get("POSE_SERVICE")
+    if not address:
+        return None
+    link = _Link(address, bytes.fromhex(os.environ.get("POSE_SERVICE_KEY", "")))
+    return {name: RemoteScheduler(link, name) for name in link.sizes}
+
+
+def service_from_env():
+    """The runner's PoseService when its workers would run tflite/onnx models, else None."""
+    if os.environ.get("POSE_BACKEND") not in ("tflite", "onnx") or os.environ.get("JOB_POSE_SERVICE") == "0":
+        return None
+    return PoseService(pose_backend.local_schedulers())
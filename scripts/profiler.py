@@ -0,0 +1,128 @@
+"""Opt-in per-stage timing of the analyzer frame loop.
+
+The loop marks the end of each stage; the time since the previous mark is
+charged to that stage:
+
+    tracer = tracer_from_env()
+    while True:
+        tracer.frame()
+        ret, frame = cap.read()
+        tracer.mark('decode')
+        ...
+        out_vid.write(frame)
+        tracer.mark('write')
+    tracer.write(output_folder, filename)
+
+Disabled (the default) the tracer is a NullTracer whose methods do nothing.
+Enabled, a mark costs one perf_counter() call and a list append. write()
+saves ``{filename}_profile.json`` (per-stage totals, share of the loop,
+p50/p95/p99) and ``{filename}_trace.json``, a Chrome trace of the frames that
+can be opened in chrome://tracing or https://ui.perfetto.dev.
+
+Environment:
+  ANALYZER_PROFILE               1 to profile the job (the server sets it per request)
+  ANALYZER_PROFILE_TRACE_FRAMES  frames kept in the timeline (default 3000; stats cover all)
+"""
+import json
+import os
+import time
+
+from latency import LatencyHistogram
+
+
+class NullTracer:
+    enabled = False
+
+    def frame(self):
+        pass
+
+    def mark(self, stage):
+        pass
+
+    def write(self, output_dir, name):
+        return None
+
+
+class Tracer:
+    enabled = True
+
+    def __init__(self, trace_frames=3000, clock=time.perf_counter):
+        self.clock = clock
+        self.trace_frames = trace_frames
+        self.stats = {}          # stage -> LatencyHistogram, in first-seen order
+        self.events = []         # (frame, stage, start, duration) while frames <= trace_frames
+        self.frames = 0
+        self.started = None
+        self.last = None
+        self.new_frame = False
+
+    def frame(self):
+        """Start of a frame; time until the next mark belongs to its first stage."""
+        self.last = self.clock()
+        if self.started is None:
+            self.started = self.last
+        self.new_frame = True
+
+    def mark(self, stage):
+        now = self.clock()
+        if self.last is None:
+            self.frame()
+            now = self.last
+        # Frames count from their first mark, so the read that ends the video is not one
+        if self.new_frame:
+            self.frames += 1
+            self.new_frame = False
+        elapsed = now - self.last
+        hist = self.stats.get(stage)
+        if hist is None:
+            hist = self.stats[stage] = LatencyHistogram()
+        hist.add(elapsed * 1000)
+        if self.frames <= self.trace_frames:
+            self.events.append((self.frames, stage, self.last, elapsed))
+        self.last = now
+
+    def summary(self):
+        loop_ms = sum(h.total for h in self.stats.values())
+        stages = {}
+        for stage, hist in self.stats.items():
+            stages[stage] = {
+                'total_s': round(hist.total / 1000, 3),
+                'share': round(hist.total / loop_ms, 4) if loop_ms else 0.0,
+                **hist.summary(),
+            }
+        wall = (self.last - self.started) if self.started is not None else 0.0
+        return {
+            'frames': self.frames,
+            'wall_s': round(wall, 3),
+            'fps': round(self.frames / wall, 2) if wall > 0 else None,
+            'stages': stages,
+        }
+
+    def chrome_trace(self):
+        events = [{'name': 'process_name', 'ph': 'M', 'pid': 1, 'args': {'name': 'analyzer'}}]
+        for frame, stage, start, dur in self.events:
+            events.append({
+                'name': stage, 'cat': 'stage', 'ph': 'X', 'pid': 1, 'tid': 1,
+                'ts': round((start - self.started) * 1e6, 1), 'dur': round(dur * 1e6, 1),
+                'args': {'frame': frame},
+            })
+        return {'traceEvents': events, 'displayTimeUnit': 'ms'}
+
+    def write(self, output_dir, name):
+        profile = self.summary()
+        profile['trace_file'] = f"{name}_trace.json"
+        profile['trace_frames'] = min(self.frames, self.trace_frames)
+        with open(os.path.join(output_dir, f"{name}_profile.json"), 'w') as f:
+            json.dump(profile, f, indent=2)
+        with open(os.path.join(output_dir, profile['trace_file']), 'w') as f:
+            json.dump(self.chrome_trace(), f)
+        slowest = sorted(profile['stages'].items(), key=lambda kv: -kv[1]['total_s'])
+        print(f"Profile: {profile['frames']} frames, {profile['fps']} fps; " +
+              ", ".join(f"{s} {v['share']:.0%}" for s, v in slowest))
+        return profile
+
+
+def tracer_from_env():
+    if os.environ.get("ANALYZER_PROFILE", "0") in ("", "0"):
+        return NullTracer()
+    return Tracer(trace_frames=int(os.environ.get("ANALYZER_PROFILE_TRACE_FRAMES", "3000")))
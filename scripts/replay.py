@@ -0,0 +1,158 @@
+"""Replay recorded live sessions through the counters, without a camera.
+
+Takes landmark logs written with LIVE_RECORD=1 (``*_landmarks.ttlm``, see
+landmark_log.py) or synthetic sequences (``*_landmarks.npz`` next to their
+``*_truth.json``, see synthetic.py), feeds every frame to a fresh counter
+and reports the count, a digest of the rows and the counter's cost per frame
+(p50/p95/p99 in microseconds, plus total CPU seconds).
+
+A log ends with the count and digest of the live session that wrote it, so
+a replay that disagrees means the counter changed behaviour; synthetic
+sequences are checked against their expected count. Any mismatch makes the
+exit status 1.
+
+``fast`` pace runs frames back to back (CPU cost, regression runs);
+``realtime`` sleeps to the recorded frame times, scaled by the speed.
+
+    REPLAY_LOG=output/live_pushup_landmarks.ttlm python scripts/replay.py
+    REPLAY_LOG=output REPLAY_PACE=realtime REPLAY_SPEED=2 python scripts/replay.py
+
+Environment:
+  REPLAY_LOG         log file, folder of logs, or comma list (required)
+  REPLAY_PACE        fast | realtime (default fast)
+  REPLAY_SPEED       realtime speed-up (default 1)
+  REPLAY_COUNTERS    live | video (default: as recorded; video for synthetic
+                     exercises the analyzers know)
+  REPLAY_EXERCISE    counter to use instead of the recorded exercise
+  REPLAY_OUTPUT_DIR  write {name}_replay.json and the rows CSV there (default: off)
+"""
+import json
+import os
+import sys
+import time
+
+import pandas as pd
+
+from counters import COUNTERS, LIVE_COUNTERS
+from landmark_log import SUFFIX, LandmarkLog, rows_digest
+from latency import LatencyHistogram
+
+NPZ_SUFFIX = '_landmarks.npz'
+
+
+def _name(path):
+    base = os.path.basename(path)
+    for suffix in (SUFFIX + '.gz', SUFFIX, NPZ_SUFFIX):
+        if base.endswith(suffix):
+            return base[:-len(suffix)]
+    return os.path.splitext(base)[0]
+
+
+def open_recording(path):
+    """(info, frame iterator, expected()) for a landmark log or a synthetic sequence."""
+    if path.endswith(NPZ_SUFFIX):
+        import synthetic
+        seq = synthetic.load(os.path.dirname(path) or '.', _name(path))
+        info = {'exercise': seq.exercise, 'width': seq.size[0], 'height': seq.size[1],
+                'counters': 'video' if seq.exercise in COUNTERS else 'live', 'source': 'synthetic'}
+        return info, seq.frames(), lambda: {'count': seq.truth['expected_count']}
+    log = LandmarkLog(path)
+    info = {**log.header, 'source': 'recorded'}
+    return info, log.frames(), lambda: log.end or {}
+
+
+def replay(path, exercise=None, counters=None, pace='fast', speed=1.0):
+    info, frames, expected = open_recording(path)
+    exercise = exercise or info['exercise']
+    kind = counters or info.get('counters', 'live')
+    counter = (LIVE_COUNTERS if kind == 'live' else COUNTERS)[exercise](info['width'], info['height'])
+
+    cost = LatencyHistogram()
+    clock = time.perf_counter
+    realtime = pace == 'realtime'
+    started, cpu_started = clock(), time.process_time()
+    first_t = None
+    n = 0
+    for t, lm in frames:
+        if realtime:
+            if first_t is None:
+                first_t = t
+            delay = started + (t - first_t) / speed - clock()
+            if delay > 0:
+                time.sleep(delay)
+        before = clock()
+        counter.update(lm, t)
+        cost.add((clock() - before) * 1e6)
+        n += 1
+    rows = counter.rows()
+    wall = clock() - started
+
+    result = {
+        'recording': os.path.basename(path),
+        'source': info['source'],
+        'exercise': exercise,
+        'counter': type(counter).__name__,
+        'pace': pace,
+        'frames': n,
+        'count': counter.count,
+        'digest': rows_digest(rows),
+        'wall_s': round(wall, 3),
+        'cpu_s': round(time.process_time() - cpu_started, 3),
+        'counter_us': cost.summary(),
+    }
+    want = expected()
+    same_counter = exercise == info['exercise'] and kind == info.get('counters', 'live')
+    if want and same_counter:
+        result['expected_count'] = want.get('count')
+        result['expected_digest'] = want.get('digest')
+        result['match'] = (
+            (want.get('count') is None or counter.per_frame_rows or want['count'] == counter.count) and
+            (want.get('digest') is None or want['digest'] == result['digest'])
+        )
+    return result, rows
+
+
+def find_recordings(spec):
+    paths = []
+    for item in (s.strip() for s in spec.split(",") if s.strip()):
+        if os.path.isdir(item):
+            paths += sorted(
+                os.path.join(item, f) for f in os.listdir(item)
+                if f.endswith((SUFFIX, SUFFIX + '.gz', NPZ_SUFFIX))
+            )
+        else:
+            paths.append(item)
+    return paths
+
+
+if __name__ == "__main__":
+    spec = os.environ.get("REPLAY_LOG", "")
+    paths = find_recordings(spec)
+    if not paths:
+        raise SystemExit("Set REPLAY_LOG to a landmark log, a folder of logs or a comma list")
+    output_folder = os.environ.get("REPLAY_OUTPUT_DIR")
+    if output_folder:
+        os.makedirs(output_folder, exist_ok=True)
+
+    mismatches = 0
+    for path in paths:
+        result, rows = replay(
+            path,
+            exercise=os.environ.get("REPLAY_EXERCISE") or None,
+            counters=os.environ.get("REPLAY_COUNTERS") or None,
+            pace=os.environ.get("REPLAY_PACE", "fast"),
+            speed=float(os.environ.get("REPLAY_SPEED", "1")),
+        )
+        us = result['counter_us'] or {}
+        verdict = {True: 'match', False: 'MISMATCH', None: 'no reference'}[result.get('match')]
+        print(f"{result['recording']}: {result['count']} reps over {result['frames']} frames, "
+              f"counter p50 {us.get('p50')} us p99 {us.get('p99')} us, {result['cpu_s']} CPU s; {verdict}"
+              + (f" (expected {result['expected_count']})" if result.get('match') is False else ""))
+        mismatches += result.get('match') is False
+        if output_folder:
+            name = _name(path)
+            with open(os.path.join(output_folder, f"{name}_replay.json"), 'w') as f:
+                json.dump(result, f, indent=2)
+            if rows:
+                pd.DataFrame(rows).to_csv(os.path.join(output_folder, f"{name}_replay.csv"), index=False)
+    sys.exit(1 if mismatches else 0)
@@ -0,0 +1,99 @@
+"""Check that a resumed job gives exactly what an uninterrupted one gives.
+
+Runs the headless analysis (analyze.py) of one clip with checkpoints
+(checkpoint.py) three times: straight through; cut short by a simulated
+crash after RESUME_CRASH_AT pose calls; and once more, resuming from the
+checkpoint the crash left. The resumed run's count, rows and every pose
+result (the checkpoint logs, byte for byte) must equal the uninterrupted
+run's; any difference makes the exit status 1.
+
+    RESUME_EXERCISE=situp RESUME_VIDEO=clip.mp4 python scripts/resume_check.py
+
+Environment:
+  RESUME_VIDEO          clip to analyze (default: the benchmark's short_540p_30 clip)
+  RESUME_EXERCISE       exercise (default pushup)
+  RESUME_CRASH_AT       pose calls before the crash (default: two and a half checkpoints)
+  JOB_CHECKPOINT_EVERY  pose calls between checkpoints (default here 60)
+"""
+import json
+import os
+import shutil
+import sys
+import tempfile
+
+import analyze
+import checkpoint
+import pose_backend
+from benchmark import corpus_clip
+
+
+class Crash(Exception):
+    pass
+
+
+def run(video, exercise, directory, crash_at=None):
+    """analyze_video() checkpointing into ``directory``; None when the crash came first."""
+    real = pose_backend._new_pose
+    calls = [0]
+
+    def crashing(*args, **kwargs):
+        pose = real(*args, **kwargs)
+        process = pose.process
+
+        def process_or_crash(rgb):
+            calls[0] += 1
+            if calls[0] > crash_at:
+                raise Crash()
+            return process(rgb)
+        pose.process = process_or_crash
+        return pose
+
+    checkpoint.prepare(directory, checkpoint.input_key(video, exercise))
+    checkpoint.start_job()
+    os.environ["JOB_CHECKPOINT_DIR"] = directory
+    if crash_at is not None:
+        pose_backend._new_pose = crashing
+    try:
+        return analyze.analyze_video(video, exercise)
+    except Crash:
+        return None
+    finally:
+        pose_backend._new_pose = real
+        del os.environ["JOB_CHECKPOINT_DIR"]
+
+
+def _log(directory):
+    with open(os.path.join(directory, checkpoint.LOG), 'rb') as f:
+        return f.read()
+
+
+def main():
+    video = os.environ.get("RESUME_VIDEO") or corpus_clip(
+        'short_540p_30', os.path.join(os.path.expanduser("~"), ".cache", "talenttrack", "bench_corpus"))
+    exercise = os.environ.get("RESUME_EXERCISE", "pushup")
+    every = int(os.environ.setdefault("JOB_CHECKPOINT_EVERY", "60"))
+    crash_at = int(os.environ.get("RESUME_CRASH_AT") or every * 5 // 2)
+    work = tempfile.mkdtemp(prefix="resume_check_")
+    try:
+        straight = run(video, exercise, os.path.join(work, 'straight'))
+        resumed_dir = os.path.join(work, 'resumed')
+        if run(video, exercise, resumed_dir, crash_at) is not None:
+            sys.exit(f"{os.path.basename(video)} has no more than {crash_at} frames; lower RESUME_CRASH_AT")
+        with open(os.path.join(resumed_dir, checkpoint.MARKER)) as f:
+            saved = json.load(f)['frames']
+        resumed = run(video, exercise, resumed_dir)
+
+        problems = [f"{key} differs" for key in ('count', 'rows', 'end_frame') if straight[key] != resumed[key]]
+        if _log(os.path.join(work, 'straight')) != _log(resumed_dir):
+            problems.append("pose results differ")
+        print(f"{exercise} on {os.path.basename(video)}: crash after {crash_at} pose calls, resumed from "
+              f"{saved}; uninterrupted {straight['count']} over {straight['end_frame']} frames, "
+              f"resumed {resumed['count']} over {resumed['end_frame']}: "
+              + ("; ".join(problems) if problems else "identical"), flush=True)
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
+    sys.exit(1 if problems else 0)
+
+
+if __name__ == "__main__":
+    main()
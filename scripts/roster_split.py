@@ -0,0 +1,137 @@
+"""Split a whole-class recording into per-athlete attempts.
+
+A cheap scan samples the video at ``scan_fps`` and records whether a pose is
+present and how much the picture moves. An attempt runs while someone is
+present and moving; it ends when nobody is in frame for ``exit_gap_s`` (the
+athlete walked off) or the scene stays idle for ``idle_gap_s`` (waiting for
+the next student). Attempts are then analyzed in parallel worker processes
+and returned in recording order.
+"""
+from concurrent.futures import ProcessPoolExecutor, wait
+import multiprocessing
+
+import cv2
+import numpy as np
+
+import job_control
+import thread_budget
+from analyze import analyze_video
+from pose_backend import create_pose
+
+SCAN_SIZE = (320, 180)
+MOTION_SIZE = (160, 90)
+
+
+def scan_activity(video_path, scan_fps=2.0):
+    """Return (fps, total_frames, samples) with samples = [(t, present, motion)]."""
+    cap = cv2.VideoCapture(video_path)
+    fps = cap.get(cv2.CAP_PROP_FPS) or 30
+    total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    step = max(1, int(round(fps / scan_fps)))
+    pose = create_pose(min_detection_confidence=0.5, model_complexity=0)
+
+    samples = []
+    prev_gray = None
+    frame_idx = 0
+    try:
+        while not job_control.stop_requested():
+            # grab() skips the colour conversion of frames the scan does not look at
+            if frame_idx % step:
+                if not cap.grab():
+                    break
+                frame_idx += 1
+                continue
+            ret, frame = cap.read()
+            if not ret:
+                break
+            frame_idx += 1
+
+            small = cv2.resize(frame, SCAN_SIZE)
+            present = pose.process(cv2.cvtColor(small, cv2.COLOR_BGR2RGB)).pose_landmarks is not None
+            gray = cv2.cvtColor(cv2.resize(small, MOTION_SIZE), cv2.COLOR_BGR2GRAY)
+            motion = float(np.mean(cv2.absdiff(gray, prev_gray))) if prev_gray is not None else 0.0
+            prev_gray = gray
+            samples.append((frame_idx / fps, present, motion))
+    finally:
+        cap.release()
+        pose.close()
+    return fps, total_frames or frame_idx, samples
+
+
+def segment_attempts(samples, idle_motion=2.0, exit_gap_s=1.0, idle_gap_s=4.0, min_attempt_s=3.0, pad_s=0.5):
+    """Turn scan samples into [(start_t, end_t)] attempt windows."""
+    attempts = []
+    start = last_active = None
+    absent_since = idle_since = None
+
+    def close():
+        if start is not None and last_active - start >= min_attempt_s:
+            attempts.append((max(0.0, start - pad_s), last_active + pad_s))
+
+    for t, present, motion in samples:
+        active = present and motion >= idle_motion
+        if active:
+            if start is None:
+                start = t
+            last_active = t
+            absent_since = idle_since = None
+            continue
+        if start is None:
+            continue
+        if present:
+            absent_since = None
+            idle_since = idle_since if idle_since is not None else t
+        else:
+            absent_since = absent_since if absent_since is not None else t
+        if (absent_since is not None and t - absent_since >= exit_gap_s) or \
+           (idle_since is not None and t - idle_since >= idle_gap_s):
+            close()
+            start = last_active = None
+            absent_since = idle_since = None
+    close()
+
+    # Padding can make neighbours overlap; split the overlap down the middle
+    for i in range(1, len(attempts)):
+        (a0, a1), (b0, b1) = attempts[i - 1], attempts[i]
+        if b0 < a1:
+            mid = (a1 + b0) / 2
+            attempts[i - 1], attempts[i] = (a0, mid), (mid, b1)
+    return attempts
+
+
+def _analyze_attempt(args):
+    video_path, exercise, index, start_frame, end_frame = args
+    result = analyze_video(video_path, exercise, start_frame, end_frame)
+    result['attempt'] = index
+    return result
+
+
+def _init_pool(stop, deadline_at):
+    job_control.share(stop, deadline_at)
+    thread_budget.apply(1)   # the job's threads are the pool's processes
+
+
+def analyze_attempts(video_path, exercise, attempts, fps, max_workers=None):
+    """Analyze every attempt in its own worker process; results keep attempt order.
+
+    The pool stops with this job: once it is cancelled or out of time every
+    attempt ends at its current frame and returns the rows so far.
+    """
+    jobs = [
+        (video_path, exercise, i, int(start * fps), int(end * fps))
+        for i, (start, end) in enumerate(attempts, start=1)
+    ]
+    if not jobs:
+        return []
+    # Longest attempts first so the pool's tail is as short as possible
+    order = sorted(jobs, key=lambda j: j[4] - j[3], reverse=True)
+    workers = max_workers or min(len(jobs), thread_budget.job_threads())
+    stop = multiprocessing.Event()
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_pool,
+                             initargs=(stop, job_control.deadline())) as pool:
+        futures = [pool.submit(_analyze_attempt, job) for job in order]
+        while wait(futures, timeout=0.2).not_done:
+            if job_control.stop_requested():
+                stop.set()
+        results = [f.result() for f in futures]
+    return sorted(results, key=lambda r: r['attempt'])
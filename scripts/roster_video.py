@@ -0,0 +1,61 @@
+import os
+from roster_split import scan_activity, segment_attempts, analyze_attempts
+from counters import COUNTERS
+from job_metrics import report_job
+from tkinter import Tk, filedialog
+import pandas as pd
+
+# -------- Settings --------
+EXERCISE = os.environ.get("EXERCISE", "pushup")   # key in counters.COUNTERS
+SCAN_FPS = float(os.environ.get("ROSTER_SCAN_FPS", "2"))
+MAX_WORKERS = int(os.environ.get("ROSTER_WORKERS", "0")) or None
+IDLE_GAP_S = float(os.environ.get("ROSTER_IDLE_GAP_S", "4"))
+EXIT_GAP_S = float(os.environ.get("ROSTER_EXIT_GAP_S", "1"))
+
+# Worker processes re-import this file on spawn-based platforms (Windows),
+# so everything that does work stays under the main guard.
+if __name__ == "__main__":
+    # -------- File Selection --------
+    Tk().withdraw()
+    video_path = filedialog.askopenfilename(title="Select Video", filetypes=[("Video Files","*.mp4;*.avi;*.mov")])
+    if not video_path:
+        print("No file selected, exiting...")
+        exit()
+
+    filename = os.path.splitext(os.path.basename(video_path))[0]
+    output_folder = filename
+    os.makedirs(output_folder, exist_ok=True)
+    log_name = COUNTERS[EXERCISE].log_name
+
+    # -------- Segmentation --------
+    fps, total_frames, samples = scan_activity(video_path, scan_fps=SCAN_FPS)
+    attempts = segment_attempts(samples, exit_gap_s=EXIT_GAP_S, idle_gap_s=IDLE_GAP_S)
+    print(f"Found {len(attempts)} attempts in {total_frames / fps:.1f}s of video")
+
+    # -------- Parallel Analysis --------
+    results = analyze_attempts(video_path, EXERCISE, attempts, fps, max_workers=MAX_WORKERS)
+
+    # -------- Save CSV (one log per attempt) --------
+    summary = []
+    for (start, end), result in zip(attempts, results):
+        csv_path = os.path.join(output_folder, f"{filename}_attempt{result['attempt']}_{log_name}.csv")
+        if result['rows']:
+            pd.DataFrame(result['rows']).to_csv(csv_path, index=False)
+            print(f"Saved {csv_path} with {len(result['rows'])} rows")
+        summary.append({
+            'attempt': result['attempt'],
+            'exercise': EXERCISE,
+            'start_time': round(start, 3),
+            'end_time': round(end, 3),
+            'count': result['count'],
+            'log_file': os.path.basename(csv_path) if result['rows'] else ''
+        })
+
+    summary_path = os.path.join(output_folder, f"{filename}_attempts_summary.csv")
+    if summary:
+        pd.DataFrame(summary).to_csv(summary_path, index=False)
+        print(f"Saved {summary_path} with {len(summary)} attempts")
+    else:
+        print("No attempts detected.")
+
+    report_job(total_frames, EXERCISE)
@@ -1,20 +1,18 @@
 import cv2
 import os
 import mediapipe as mp
+from pose_backend import create_pose
+from counters import SitReachCounter
+from profiler import tracer_from_env
+from job_metrics import report_job
+from job_control import stop_requested
 from tkinter import Tk, filedialog
-from collections import deque
-import numpy as np
 import pandas as pd
 
-# -------- Utilities --------
-def lm_xy(lm, w, h):
-    return (lm.x*w, lm.y*h)
-
 # -------- Settings --------
 PROC_W, PROC_H = 960, 540
 PIXEL_TO_CM = 0.26
 PIXEL_TO_M = PIXEL_TO_CM / 100
-SMOOTH_N = 5
 
 # -------- File Selection --------
 Tk().withdraw()
@@ -37,70 +35,54 @@ out_vid = cv2.VideoWriter(output_video_path, fourcc, fps, (PROC_W, PROC_H))
 
 # -------- MediaPipe Setup --------
 mp_pose = mp.solutions.pose
-pose = mp_pose.Pose(min_detection_confidence=0.5, model_complexity=1)
+pose = create_pose(min_detection_confidence=0.5, model_complexity=1)
 mp_draw = mp.solutions.drawing_utils
 
 # -------- Variables --------
-reach_history = deque(maxlen=SMOOTH_N)
-max_reach_px = 0
-time_of_max_reach = 0
-reach_data = []
+counter = SitReachCounter(PROC_W, PROC_H, pixel_to_m=PIXEL_TO_M)
 
 frame_idx = 0
 
+tracer = tracer_from_env()
+
 # -------- Processing Loop --------
 while True:
+    if stop_requested():   # cancelled or out of time: keep what we have
+        break
+    tracer.frame()
     ret, frame = cap.read()
     if not ret: break
+    tracer.mark('decode')
     frame_idx += 1
     t = frame_idx / fps
 
     frame = cv2.resize(frame, (PROC_W, PROC_H))
+    tracer.mark('resize')
     img_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+    tracer.mark('cvtColor')
     results = pose.process(img_rgb)
+    tracer.mark('pose')
 
     if results.pose_landmarks:
         mp_draw.draw_landmarks(frame, results.pose_landmarks, mp_pose.POSE_CONNECTIONS)
         lm = results.pose_landmarks.landmark
+        tracer.mark('draw')
 
-        try:
-            # Feet (average)
-            left_foot = lm_xy(lm[mp_pose.PoseLandmark.LEFT_FOOT_INDEX], PROC_W, PROC_H)
-            right_foot = lm_xy(lm[mp_pose.PoseLandmark.RIGHT_FOOT_INDEX], PROC_W, PROC_H)
-            foot_x = (left_foot[0] + right_foot[0]) / 2
-
-            # Hands (average)
-            left_hand = lm_xy(lm[mp_pose.PoseLandmark.LEFT_WRIST], PROC_W, PROC_H)
-            right_hand = lm_xy(lm[mp_pose.PoseLandmark.RIGHT_WRIST], PROC_W, PROC_H)
-            hand_x = (left_hand[0] + right_hand[0]) / 2
-
-            # Forward reach distance (positive if hands ahead of feet)
-            reach_px = hand_x - foot_x
-            reach_history.append(reach_px)
-            reach_smoothed = np.mean(reach_history)
-
-            # Update max reach
-            if reach_smoothed > max_reach_px:
-                max_reach_px = reach_smoothed
-                time_of_max_reach = t
-
-            # Log reach data
-            reach_data.append({
-                'time_s': round(t,3),
-                'reach_px': round(reach_smoothed,2),
-                'reach_m': round(reach_smoothed*PIXEL_TO_M,3)
-            })
+        reach_row = counter.update(lm, t)
+        tracer.mark('counter')
+        if reach_row is not None:
+            reach_smoothed = counter.reach_smoothed
 
             # -------- Display --------
             cv2.putText(frame, f"Current Reach: {reach_smoothed*PIXEL_TO_M:.2f} m", (10,30), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0,255,0),2)
-            cv2.putText(frame, f"Max Reach: {max_reach_px*PIXEL_TO_M:.2f} m", (10,70), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0,255,255),2)
+            cv2.putText(frame, f"Max Reach: {counter.max_reach_px*PIXEL_TO_M:.2f} m", (10,70), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0,255,255),2)
             cv2.putText(frame, f"Time: {t:.2f}s", (10,110), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (255,255,0),2)
-
-        except:
-            pass
+        tracer.mark('overlay')
 
     out_vid.write(frame)
+    tracer.mark('write')
     cv2.imshow("Sit and Reach Tracker", frame)
+    tracer.mark('display')
     if cv2.waitKey(int(1000/fps)) & 0xFF == 27:  # ESC
         break
 
@@ -109,11 +91,16 @@ cap.release()
 out_vid.release()
 cv2.destroyAllWindows()
 pose.close()
+tracer.write(output_folder, filename)
 
 # -------- Save CSV --------
+reach_data = counter.rows()
 if reach_data:
     pd.DataFrame(reach_data).to_csv(csv_path, index=False)
     print(f"Saved {csv_path}")
-    print(f"Max Reach: {max_reach_px*PIXEL_TO_M:.2f} m at {time_of_max_reach:.2f} s")
+    best = counter.summary()
+    print(f"Max Reach: {best['max_reach_px']*PIXEL_TO_M:.2f} m at {best['time_of_max_reach']:.2f} s")
 else:
     print("No reach data detected.")
+
+report_job(frame_idx, 'sitreach')
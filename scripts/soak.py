@@ -0,0 +1,177 @@
+"""Soak test: thousands of analyses back to back through one long-lived worker.
+
+Every job goes through ``worker.WorkerProcess`` and the worker's resources
+after it are logged to ``soak.csv`` as they come in (a stopped soak keeps
+its data): resident memory, open file descriptors, native threads and pose
+handles still open. At the end each worker's lifetime, minus its first
+SOAK_WARMUP jobs, is fitted with a line:
+
+  rss       growth in MB per 1000 jobs, a leak above SOAK_LEAK_MB
+  fds       any growth is a leak (a capture or writer left open)
+  threads   any growth is a leak
+  handles   a pose handle open between jobs is a graph never closed
+
+Any leak makes the exit status 1. By default the worker is never recycled
+so growth shows up; SOAK_RECYCLE=1 applies the WORKER_MAX_RSS_MB and
+WORKER_MAX_JOBS limits and reports each restart, which is how persistent
+workers run for real.
+
+    SOAK_JOBS=2000 python scripts/soak.py
+    SOAK_RECYCLE=1 WORKER_MAX_JOBS=100 SOAK_ANALYZERS=pushup,situp python scripts/soak.py
+
+Environment:
+  SOAK_JOBS          analyses to run (default 1000)
+  SOAK_DURATION_S    stop early after this long (default: no limit)
+  SOAK_ANALYZERS     comma list of exercises, used in turn (default pushup)
+  SOAK_MODE          worker job mode: script | headless | multi | roster (default script)
+  SOAK_VIDEO         clip to analyze (default: the benchmark's short_540p_30 clip)
+  SOAK_RECYCLE       1 to recycle the worker at the WORKER_* limits (default 0)
+  SOAK_WARMUP        jobs per worker left out of the fit (default 20)
+  SOAK_LEAK_MB       allowed RSS growth per 1000 jobs (default 50)
+  SOAK_OUTPUT_DIR    where soak.csv, summary.json and the worker log go
+                     (default benchmarks/soak_<time> in the repo)
+"""
+import csv
+import json
+import os
+import shutil
+import sys
+import time
+
+import numpy as np
+
+from benchmark import REPO_DIR, corpus_clip, host_info
+from worker import WorkerProcess, worker_from_env
+
+FIELDS = ('job', 'worker', 'worker_job', 'pid', 'exercise', 'ok', 'wall_s', 'frames',
+          'rss_mb', 'open_fds', 'threads', 'pose_handles', 'recycled', 'error')
+
+
+def fit_growth(rows, key):
+    """Slope of ``key`` per job over ``rows``, or None with fewer than 3 points."""
+    points = [(r['job'], r[key]) for r in rows if r[key] not in (None, '')]
+    if len(points) < 3:
+        return None
+    x, y = np.array(points, dtype=float).T
+    return float(np.polyfit(x, y, 1)[0])
+
+
+def analyse(rows, warmup, leak_mb):
+    lifetimes = {}
+    for r in rows:
+        lifetimes.setdefault(r['worker'], []).append(r)
+    workers, leaks = [], []
+    for generation, life in lifetimes.items():
+        settled = [r for r in life if r['worker_job'] > warmup and r['ok']]
+        rss_slope = fit_growth(settled, 'rss_mb')
+        entry = {
+            'worker': generation,
+            'jobs': len(life),
+            'rss_mb_first': life[0]['rss_mb'],
+            'rss_mb_last': life[-1]['rss_mb'],
+            'rss_mb_per_1000_jobs': round(rss_slope * 1000, 1) if rss_slope is not None else None,
+            'recycled': life[-1]['recycled'] or None,
+        }
+        for key in ('open_fds', 'threads'):
+            values = [r[key] for r in settled if r[key] is not None]
+            entry[f"{key}_growth"] = values[-1] - values[0] if values else None
+        entry['pose_handles_max'] = max((r['pose_handles'] or 0 for r in life), default=0)
+        workers.append(entry)
+
+        if entry['rss_mb_per_1000_jobs'] is not None and entry['rss_mb_per_1000_jobs'] > leak_mb:
+            leaks.append(f"worker {generation}: RSS grows {entry['rss_mb_per_1000_jobs']} MB per 1000 jobs")
+        for key in ('open_fds', 'threads'):
+            if (entry[f"{key}_growth"] or 0) > 0:
+                leaks.append(f"worker {generation}: {key} grew by {entry[f'{key}_growth']}")
+        if entry['pose_handles_max']:
+            leaks.append(f"worker {generation}: {entry['pose_handles_max']} pose handle(s) left open after a job")
+    return workers, leaks
+
+
+def main():
+    jobs = int(os.environ.get("SOAK_JOBS", "1000"))
+    duration = float(os.environ.get("SOAK_DURATION_S", "0"))
+    analyzers = [a.strip() for a in os.environ.get("SOAK_ANALYZERS", "pushup").split(",") if a.strip()]
+    mode = os.environ.get("SOAK_MODE", "script")
+    warmup = int(os.environ.get("SOAK_WARMUP", "20"))
+    leak_mb = float(os.environ.get("SOAK_LEAK_MB", "50"))
+    video = os.environ.get("SOAK_VIDEO") or corpus_clip(
+        'short_540p_30', os.path.join(os.path.expanduser("~"), ".cache", "talenttrack", "bench_corpus"))
+    output_dir = os.environ.get("SOAK_OUTPUT_DIR") or os.path.join(
+        REPO_DIR, "benchmarks", f"soak_{time.strftime('%Y%m%d_%H%M%S')}")
+    os.makedirs(output_dir, exist_ok=True)
+    work_dir = os.path.join(output_dir, "work")
+
+    log = open(os.path.join(output_dir, "worker.log"), 'w')
+    if os.environ.get("SOAK_RECYCLE", "0") not in ("", "0"):
+        worker = worker_from_env(stderr=log)
+    else:
+        worker = WorkerProcess(max_rss_mb=0, max_jobs=0, stderr=log)
+    print(f"Soak: {jobs} {mode} jobs of {', '.join(analyzers)} on {os.path.basename(video)}, "
+          f"results in {output_dir}", flush=True)
+
+    rows = []
+    started = time.monotonic()
+    with open(os.path.join(output_dir, "soak.csv"), 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=FIELDS)
+        writer.writeheader()
+        try:
+            for n in range(1, jobs + 1):
+                if duration and time.monotonic() - started > duration:
+                    print(f"Stopping after {duration:g} s", flush=True)
+                    break
+                exercise = analyzers[(n - 1) % len(analyzers)]
+                shutil.rmtree(work_dir, ignore_errors=True)
+                reply = worker.run({'id': f"soak-{n}", 'exercise': exercise, 'video': video, 'mode': mode,
+                                    'output_dir': work_dir, 'env': {'JOB_ID': f"soak-{n}"}})
+                usage, report, info = reply.get('usage') or {}, reply.get('report') or {}, reply['worker']
+                row = {
+                    'job': n, 'worker': info['generation'], 'worker_job': info['jobs'], 'pid': info['pid'],
+                    'exercise': exercise, 'ok': reply['ok'], 'wall_s': report.get('wall_s'),
+                    'frames': report.get('frames'),
+                    'rss_mb': round(usage['rss_bytes'] / 2 ** 20, 1) if usage.get('rss_bytes') else None,
+                    'open_fds': usage.get('open_fds'), 'threads': usage.get('threads'),
+                    'pose_handles': usage.get('pose_handles'), 'recycled': info['recycled'] or '',
+                    'error': reply.get('error', ''),
+                }
+                rows.append(row)
+                writer.writerow(row)
+                f.flush()
+                if info['recycled']:
+                    print(f"job {n}: worker {info['generation']} recycled ({info['recycled']}) "
+                          f"after {info['jobs']} jobs at {row['rss_mb']} MB", flush=True)
+                if not reply['ok']:
+                    print(f"job {n}: failed: {reply.get('error')}", flush=True)
+                if n % 50 == 0:
+                    print(f"job {n}: {row['rss_mb']} MB, {row['open_fds']} fds, {row['threads']} threads, "
+                          f"{time.monotonic() - started:.0f} s", flush=True)
+        except KeyboardInterrupt:
+            print("Interrupted", flush=True)
+        finally:
+            worker.close()
+            log.close()
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    workers, leaks = analyse(rows, warmup, leak_mb)
+    failed = sum(1 for r in rows if not r['ok'])
+    summary = {'created': time.strftime("%Y-%m-%dT%H:%M:%S"), 'host': host_info(), 'mode': mode,
+               'analyzers': analyzers, 'jobs': len(rows), 'failed': failed,
+               'wall_s': round(time.monotonic() - started, 1), 'recycled': worker.recycled,
+               'workers': workers, 'leaks': leaks}
+    with open(os.path.join(output_dir, "summary.json"), 'w') as f:
+        json.dump(summary, f, indent=2)
+
+    for w in workers:
+        print(f"worker {w['worker']}: {w['jobs']} jobs, RSS {w['rss_mb_first']} -> {w['rss_mb_last']} MB "
+              f"({w['rss_mb_per_1000_jobs']} MB/1000 jobs), fd growth {w['open_fds_growth']}, "
+              f"thread growth {w['threads_growth']}")
+    print(f"{len(rows)} jobs, {failed} failed, {len(worker.recycled)} recycle(s)")
+    for line in leaks:
+        print(f"  LEAK {line}")
+    if not leaks:
+        print("No growth beyond the limits")
+    return 1 if leaks else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
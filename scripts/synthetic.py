@@ -0,0 +1,793 @@
+"""Synthetic pose sequences with exact ground truth.
+
+``generate()`` moves a side-view body model through an exercise and returns
+a ``Sequence``: 33 MediaPipe-style landmarks per frame (normalized x/y,
+``None`` frames for dropouts) plus the truth of every rep: when it started,
+peaked and ended, its form, and whether a correct counter should count it.
+Cadence, rep count, landmark noise (px), dropouts and the share of bad-form
+reps are parameters; a seed makes every sequence reproducible.
+
+  pushup        elbows 170 -> 60 deg; bad: shallow (100 deg), sag (hips drop)
+  pullup        elbows 175 -> 50 deg, chin to the bar; bad: half (125 deg)
+  situp         torso 5 -> 75 deg off the floor; bad: half (15% of the range)
+  squat         knees 175 -> 80 deg; bad: shallow (140 deg)
+  verticaljump  ballistic flight of ``jump_m``; bad: small (2 cm hop)
+  broadjump     flight of ``jump_m`` forward, walk back; bad: small hop
+  shuttlerun    laps between two lines; bad: short (turns 40% early)
+  sitreach      reach and hold; bad: bent_knees
+
+Heights and distances use the counters' default 0.0026 m/px at 540 px frame
+height. ``check()`` runs the counter on a sequence against its truth,
+``render()`` draws it as a stick-figure video, and ``save()``/``load()`` keep
+it as ``{name}_landmarks.npz`` and ``{name}_truth.json``. ``check_keyframes()``
+counts a shuttle run on every frame and with optical-flow keyframing on the
+drawn frames, which must agree, and ``check_stride()`` a vertical jump on
+every frame and on every Nth as JUMP_INFERENCE_STRIDE does. A miscount the counter cannot avoid (a bad
+form in the motion's ``unseen_forms``, e.g. a shuttle-run lap turned short of
+the line) is reported as ``known_failure``; any other failure makes the exit
+status 1.
+
+    SYNTH_EXERCISE=all SYNTH_NOISE_PX=2 SYNTH_DROPOUT=0.02 python scripts/synthetic.py
+
+Environment (command line):
+  SYNTH_EXERCISE    exercise or all (default pushup)
+  SYNTH_REPS        reps per sequence (default 10)
+  SYNTH_CADENCE     reps per minute (default: per exercise)
+  SYNTH_FPS         frame rate (default 30)
+  SYNTH_SIZE        WxH the counters see (default 960x540)
+  SYNTH_NOISE_PX    landmark noise, standard deviation in px (default 1)
+  SYNTH_DROPOUT     share of frames without a pose (default 0)
+  SYNTH_BAD_FORM    share of bad-form reps (default 0)
+  SYNTH_SEED        random seed (default 0)
+  SYNTH_RENDER      1 to also write {name}.mp4
+  SYNTH_KEYFRAMES   shuttle run: also count with optical flow between keyframes
+                    this far apart and compare with the dense count (default 0 = off)
+  SYNTH_STRIDE      vertical jump: also count with pose on every Nth frame only
+                    and compare with the dense count (default 0 = off)
+  SYNTH_OUTPUT_DIR  output folder (default synthetic)
+"""
+import json
+import math
+import os
+import sys
+
+import cv2
+import numpy as np
+
+from counters import COUNTERS, LIVE_COUNTERS, NUM_LANDMARKS, landmarks_from_rows
+from foot_tracker import FootTracker
+
+PIXEL_TO_M = 0.0026         # counters' default scale ...
+REFERENCE_HEIGHT = 540      # ... at this frame height
+GRAVITY = 9.81
+
+# Body model in units of standing height
+TORSO = 0.29        # hip to shoulder
+UPPER_ARM = 0.17
+FOREARM = 0.15
+THIGH = 0.245
+SHIN = 0.245
+ANKLE_H = 0.04      # ankle above the floor
+NECK = 0.12         # shoulder to nose along the torso
+
+JOINTS = ('shoulder', 'elbow', 'wrist', 'hip', 'knee', 'ankle', 'heel', 'toe')
+JOINT_INDEX = (11, 13, 15, 23, 25, 27, 29, 31)   # left side; right side is +1
+
+# Lines drawn by render(): MediaPipe pose connections without the face
+CONNECTIONS = [(11, 12), (11, 13), (13, 15), (12, 14), (14, 16), (11, 23), (12, 24), (23, 24),
+               (23, 25), (25, 27), (24, 26), (26, 28), (27, 29), (29, 31), (27, 31), (28, 30),
+               (30, 32), (28, 32), (15, 19), (16, 20)]
+
+
+# -------- Geometry (body units, y up) --------
+def _dir(deg, length=1.0):
+    r = math.radians(deg)
+    return (length * math.cos(r), length * math.sin(r))
+
+
+def _add(*points):
+    return (sum(p[0] for p in points), sum(p[1] for p in points))
+
+
+def _lerp(a, b, f):
+    return (a[0] + (b[0] - a[0]) * f, a[1] + (b[1] - a[1]) * f)
+
+
+def _span(l1, l2, interior):
+    """Distance between the ends of a two-segment chain bent to ``interior`` degrees."""
+    return math.sqrt(l1 * l1 + l2 * l2 - 2 * l1 * l2 * math.cos(math.radians(interior)))
+
+
+def _two_link(a, b, l1, l2, bend):
+    """Middle joint of a chain a -l1- m -l2- b; ``bend`` (+1/-1) picks the side."""
+    dx, dy = b[0] - a[0], b[1] - a[1]
+    d = min(max(math.hypot(dx, dy), abs(l1 - l2) + 1e-6), l1 + l2 - 1e-6)
+    offset = math.degrees(math.acos((l1 * l1 + d * d - l2 * l2) / (2 * l1 * d)))
+    return _add(a, _dir(math.degrees(math.atan2(dy, dx)) + bend * offset, l1))
+
+
+def _cycle(tau, duration):
+    """0 -> 1 -> 0 over ``duration`` seconds, 0 outside."""
+    if tau is None or tau < 0 or tau >= duration:
+        return 0.0
+    return (1 - math.cos(2 * math.pi * tau / duration)) / 2
+
+
+def _ramp_hold(tau, up, hold, down):
+    """0 -> 1 over ``up``, 1 for ``hold``, back to 0 over ``down``."""
+    if tau is None or tau < 0:
+        return 0.0
+    if tau < up:
+        return (1 - math.cos(math.pi * tau / up)) / 2
+    if tau < up + hold:
+        return 1.0
+    if tau < up + hold + down:
+        return (1 + math.cos(math.pi * (tau - up - hold) / down)) / 2
+    return 0.0
+
+
+def _standing(knee_angle, lean=0.45):
+    """Feet-on-the-floor chain facing -x: ankle, knee, hip, shoulder."""
+    f = 180 - knee_angle
+    ankle = (0.0, ANKLE_H)
+    knee = _add(ankle, _dir(90 + 0.4 * f, SHIN))
+    hip = _add(knee, _dir(90 - 0.6 * f, THIGH))
+    torso = 90 + lean * f
+    return {
+        'ankle': ankle, 'knee': knee, 'hip': hip, 'shoulder': _add(hip, _dir(torso, TORSO)),
+        'heel': (0.04, 0.0), 'toe': (-0.09, 0.0), 'torso': torso,
+    }
+
+
+def _straight_arm(j, direction, elbow_angle=180):
+    bend = (180 - elbow_angle) / 2
+    j['elbow'] = _add(j['shoulder'], _dir(direction + bend, UPPER_ARM))
+    j['wrist'] = _add(j['elbow'], _dir(direction - bend, FOREARM))
+
+
+def _nose(j, torso):
+    j['nose'] = _add(j['shoulder'], _dir(torso, NECK), (-0.03, 0.0))
+
+
+# -------- Exercises --------
+class Motion:
+    """One exercise: rest pose, pose at ``tau`` seconds into a rep, and its truth.
+
+    Poses are built facing -x with y up, in body units; ``facing`` mirrors
+    them, and ``scale``, ``anchor_x`` and ``origin_y`` (shares of the frame)
+    place them in the image.
+    """
+    exercise = None
+    cadence = 30.0          # reps per minute
+    bad_forms = ()
+    unseen_forms = ()       # bad forms the counter cannot tell from good ones (known miscounts)
+    scale = 0.55            # px per body unit, as a share of frame height
+    anchor_x = 0.5
+    origin_y = 0.92         # floor (body y = 0)
+    facing = -1             # -1 faces left, 1 right
+    jump_m = 0.0
+
+    def __init__(self, size, jump_m=None):
+        self.width, self.height = size
+        self.px = self.scale * self.height
+        self.pixel_to_m = PIXEL_TO_M * REFERENCE_HEIGHT / self.height
+        self.gravity = GRAVITY / self.pixel_to_m / self.px     # body units / s^2
+        if jump_m is not None:
+            self.jump_m = jump_m
+
+    def period(self, cadence):
+        return 60.0 / cadence
+
+    def pose(self, tau, rep, period):
+        raise NotImplementedError
+
+    def truth(self, rep, period):
+        return {'peak': 0.4 * period, 'end': 0.8 * period}
+
+    def counted(self, form):
+        return form == 'good'
+
+    def correct(self, form):
+        return form == 'good'
+
+    def to_image(self, p, facing, root_x=0.0):
+        x = p[0] * (-1 if facing == 1 else 1) + root_x
+        return ((self.anchor_x * self.width + x * self.px) / self.width,
+                (self.origin_y * self.height - p[1] * self.px) / self.height)
+
+
+class Pushup(Motion):
+    exercise = 'pushup'
+    bad_forms = ('shallow', 'sag')
+    scale = 0.9
+    anchor_x = 0.3
+    origin_y = 0.85
+    DEPTH = {'good': 60, 'sag': 60, 'shallow': 100}
+    SAG = 0.07
+
+    def pose(self, tau, rep, period):
+        form = rep['form'] if rep else 'good'
+        elbow = 170 - (170 - self.DEPTH[form]) * _cycle(tau, 0.8 * period)
+        wrist = (0.0, 0.0)
+        shoulder = (0.02, _span(UPPER_ARM, FOREARM, elbow))
+        body = TORSO + THIGH + SHIN
+        rise = shoulder[1] - ANKLE_H
+        ankle = (shoulder[0] + math.sqrt(body * body - rise * rise), ANKLE_H)
+        hip = _lerp(shoulder, ankle, TORSO / body)
+        if form == 'sag':
+            hip = (hip[0], hip[1] - self.SAG)
+        return {
+            'wrist': wrist, 'shoulder': shoulder, 'hip': hip, 'ankle': ankle,
+            'elbow': _two_link(wrist, shoulder, FOREARM, UPPER_ARM, -1),
+            'knee': _lerp(hip, ankle, THIGH / (THIGH + SHIN)),
+            'heel': _add(ankle, (0.04, 0.02)), 'toe': _add(ankle, (-0.01, -ANKLE_H)),
+            'nose': _add(shoulder, (-0.13, 0.03)),
+        }
+
+    def truth(self, rep, period):
+        return {'peak': 0.4 * period, 'end': 0.8 * period, 'min_elbow_angle': self.DEPTH[rep['form']]}
+
+    def counted(self, form):
+        return form != 'shallow'
+
+
+class Pullup(Motion):
+    exercise = 'pullup'
+    cadence = 20.0
+    bad_forms = ('half',)
+    scale = 0.72
+    origin_y = 0.1          # the bar
+    DEPTH = {'good': 50, 'half': 125}
+
+    def pose(self, tau, rep, period):
+        form = rep['form'] if rep else 'good'
+        elbow = 175 - (175 - self.DEPTH[form]) * _cycle(tau, 0.8 * period)
+        wrist = (0.0, 0.0)
+        shoulder = (0.0, -_span(UPPER_ARM, FOREARM, elbow))
+        hip = _add(shoulder, (0.03, -TORSO))
+        knee = _add(hip, (0.0, -THIGH))
+        ankle = _add(knee, (0.04, -SHIN))
+        return {
+            'wrist': wrist, 'shoulder': shoulder, 'hip': hip, 'knee': knee, 'ankle': ankle,
+            'elbow': _two_link(wrist, shoulder, FOREARM, UPPER_ARM, -1),
+            'heel': _add(ankle, (0.03, -0.01)), 'toe': _add(ankle, (-0.03, -0.06)),
+            'nose': _add(shoulder, (-0.04, 0.13)),
+        }
+
+    def truth(self, rep, period):
+        return {'peak': 0.4 * period, 'end': 0.8 * period, 'min_elbow_angle': self.DEPTH[rep['form']]}
+
+
+class Situp(Motion):
+    exercise = 'situp'
+    bad_forms = ('half',)
+    scale = 0.75
+    anchor_x = 0.45
+    origin_y = 0.85
+    RANGE = {'good': 1.0, 'half': 0.15}
+
+    def pose(self, tau, rep, period):
+        p = _cycle(tau, 0.75 * period) * self.RANGE[rep['form'] if rep else 'good']
+        lift = 5 + 70 * p
+        hip = (0.0, 0.08)
+        knee = _add(hip, _dir(45, THIGH))
+        ankle = (knee[0] + math.sqrt(SHIN * SHIN - (knee[1] - ANKLE_H) ** 2), ANKLE_H)
+        torso = 180 - lift
+        j = {'hip': hip, 'knee': knee, 'ankle': ankle, 'shoulder': _add(hip, _dir(torso, TORSO)),
+             'heel': _add(ankle, (-0.02, -0.03)), 'toe': _add(ankle, (0.08, -0.03))}
+        # Arms straight along the body at rest, folding as the torso comes up
+        to_knee = math.degrees(math.atan2(knee[1] - j['shoulder'][1], knee[0] - j['shoulder'][0]))
+        _straight_arm(j, to_knee, 165 - 70 * p)
+        j['nose'] = _add(j['shoulder'], _dir(torso, 0.11), _dir(torso - 90, 0.04))
+        return j
+
+    def truth(self, rep, period):
+        return {'peak': 0.375 * period, 'end': 0.75 * period,
+                'max_torso_lift': round(5 + 70 * self.RANGE[rep['form']], 1)}
+
+
+class Squat(Motion):
+    exercise = 'squat'
+    bad_forms = ('shallow',)
+    DEPTH = {'good': 80, 'shallow': 140}
+
+    def pose(self, tau, rep, period):
+        p = _cycle(tau, 0.8 * period)
+        j = _standing(175 - (175 - self.DEPTH[rep['form'] if rep else 'good']) * p)
+        _straight_arm(j, 265 - 80 * p)
+        _nose(j, j['torso'])
+        return j
+
+    def truth(self, rep, period):
+        return {'peak': 0.4 * period, 'end': 0.8 * period, 'min_knee_angle': self.DEPTH[rep['form']]}
+
+
+class VerticalJump(Motion):
+    exercise = 'verticaljump'
+    cadence = 12.0
+    bad_forms = ('small',)
+    scale = 0.5
+    jump_m = 0.35
+    CROUCH = 0.4     # s, knees bend and extend into the takeoff
+    LAND = 0.3       # s, knees absorb the landing
+    SMALL_M = 0.02
+
+    def jump_size_m(self, rep):
+        """This rep's jump in metres: height here, distance for the broad jump."""
+        return (self.SMALL_M if rep['form'] == 'small' else self.jump_m) * rep['amount']
+
+    def flight(self, rep):
+        """(flight time s, peak height in body units)."""
+        h = self.jump_size_m(rep) / self.pixel_to_m / self.px
+        return 2 * math.sqrt(2 * h / self.gravity), h
+
+    def period(self, cadence):
+        return max(60.0 / cadence, self.CROUCH + 2 * math.sqrt(2 * 0.8 / GRAVITY) + self.LAND + 0.5)
+
+    def airborne(self, tau, rep):
+        """Knee angle, height above the floor and share of the flight done at ``tau``."""
+        if rep is None or tau is None:
+            return 175, 0.0, None
+        flight, h = self.flight(rep)
+        if tau < self.CROUCH:
+            return 175 - 45 * math.sin(math.pi * tau / self.CROUCH), 0.0, None
+        tf = tau - self.CROUCH
+        if tf < flight:
+            v0 = math.sqrt(2 * self.gravity * h)
+            return 175, v0 * tf - self.gravity * tf * tf / 2, tf / flight
+        tl = tf - flight
+        if tl < self.LAND:
+            return 175 - 35 * math.sin(math.pi * tl / self.LAND), 0.0, None
+        return 175, 0.0, None
+
+    def pose(self, tau, rep, period):
+        knee, lift, _ = self.airborne(tau, rep)
+        j = _standing(knee)
+        _straight_arm(j, 265 if lift == 0 else 120)
+        _nose(j, j['torso'])
+        return {k: (v[0], v[1] + lift) if isinstance(v, tuple) else v for k, v in j.items()}
+
+    def truth(self, rep, period):
+        flight, h = self.flight(rep)
+        return {
+            'takeoff': self.CROUCH, 'peak': self.CROUCH + flight / 2, 'end': self.CROUCH + flight,
+            'flight_time_s': round(flight, 4),
+            'jump_height_px': round(h * self.px, 2), 'jump_height_m': round(self.jump_size_m(rep), 4),
+        }
+
+
+class BroadJump(VerticalJump):
+    exercise = 'broadjump'
+    cadence = 6.0
+    scale = 0.45
+    anchor_x = 0.12
+    facing = 1
+    jump_m = 1.6     # forward distance
+    APEX = 0.19      # apex height as a share of the distance
+    SMALL_M = 0.15
+
+    def flight(self, rep):
+        h = self.jump_size_m(rep) * self.APEX / self.pixel_to_m / self.px
+        return 2 * math.sqrt(2 * h / self.gravity), h
+
+    def distance(self, rep):
+        return self.jump_size_m(rep) / self.pixel_to_m / self.px
+
+    def period(self, cadence):
+        return max(60.0 / cadence, 6.0)
+
+    def root_x(self, tau, rep, period):
+        """Forward travel in body units: the flight, then walking back to the start."""
+        if rep is None or tau is None:
+            return 0.0
+        flight, _ = self.flight(rep)
+        d = self.distance(rep)
+        back = self.CROUCH + flight + self.LAND + 0.3
+        if tau < self.CROUCH:
+            return 0.0
+        if tau < self.CROUCH + flight:
+            return d * (tau - self.CROUCH) / flight
+        if tau < back:
+            return d
+        walk = period - back - 0.5
+        return d * max(0.0, 1 - (tau - back) / walk)
+
+    def truth(self, rep, period):
+        out = super().truth(rep, period)
+        out.pop('jump_height_px')
+        out.pop('jump_height_m')
+        d = self.distance(rep)
+        out.update(distance_px=round(d * self.px, 2), distance_m=round(self.jump_size_m(rep), 4))
+        return out
+
+
+class ShuttleRun(Motion):
+    exercise = 'shuttlerun'
+    cadence = 10.0     # laps per minute
+    bad_forms = ('short',)
+    unseen_forms = ('short',)   # the counter counts turns and does not know where the lines are
+    scale = 0.4
+    anchor_x = 0.0
+    LINES = (0.12, 0.88)   # start and far line, shares of the frame width
+    SHORT = 0.6
+    STRIDE_HZ = 3.0
+
+    def legs(self, period):
+        return 0.42 * period, 0.08 * period    # one leg, turn pause
+
+    def lap_x(self, tau, rep, period):
+        """Body x in px and running direction (-1, 0, 1) at ``tau``."""
+        start, far = self.LINES[0] * self.width, self.LINES[1] * self.width
+        if rep is None or tau is None:
+            return start, 0
+        if rep['form'] == 'short':
+            far = start + self.SHORT * (far - start)
+        leg, pause = self.legs(period)
+        if tau < leg:
+            return start + (far - start) * (1 - math.cos(math.pi * tau / leg)) / 2, 1
+        if tau < leg + pause:
+            return far, 0
+        tau -= leg + pause
+        if tau < leg:
+            return far - (far - start) * (1 - math.cos(math.pi * tau / leg)) / 2, -1
+        return start, 0
+
+    def pose(self, tau, rep, period):
+        x, direction = self.lap_x(tau, rep, period)
+        stride = 0.12 * math.sin(2 * math.pi * self.STRIDE_HZ * (tau or 0.0)) if direction else 0.0
+        j = _standing(170)
+        _straight_arm(j, 270 - 150 * stride)
+        _nose(j, j['torso'])
+        far = dict(j)
+        for joints, s in ((j, stride), (far, -stride)):
+            joints['ankle'] = (s, ANKLE_H + max(0.0, s) * 0.4)
+            joints['heel'] = _add(joints['ankle'], (0.04, -ANKLE_H))
+            joints['toe'] = _add(joints['ankle'], (-0.09, -ANKLE_H))
+            joints['knee'] = _two_link(joints['ankle'], j['hip'], SHIN, THIGH, 1)
+        return j, far, -1 if direction < 0 else 1, x / self.px
+
+    def truth(self, rep, period):
+        leg, pause = self.legs(period)
+        return {'peak': leg + pause / 2, 'end': 2 * leg + pause, 'turn_time': round(leg + pause / 2, 4)}
+
+
+class SitReach(Motion):
+    exercise = 'sitreach'
+    cadence = 6.0
+    bad_forms = ('bent_knees',)
+    scale = 0.8
+    anchor_x = 0.3
+    origin_y = 0.85
+    facing = 1
+
+    def timing(self, period):
+        return 0.35 * period, 0.2 * period, 0.25 * period   # reach, hold, return
+
+    def pose(self, tau, rep, period):
+        form = rep['form'] if rep else 'good'
+        p = _ramp_hold(tau, *self.timing(period)) * (rep['amount'] if rep else 1.0)
+        hip = (0.0, 0.1)
+        if form == 'bent_knees':
+            knee = _add(hip, _dir(150, THIGH))
+            ankle = _add(knee, _dir(210, SHIN))
+        else:
+            knee = _add(hip, _dir(184, THIGH))
+            ankle = _add(knee, _dir(184, SHIN))
+        torso = 90 + 10 + 65 * p
+        j = {'hip': hip, 'knee': knee, 'ankle': ankle, 'shoulder': _add(hip, _dir(torso, TORSO)),
+             'heel': _add(ankle, (0.01, -0.04)), 'toe': _add(ankle, (-0.02, 0.09))}
+        _straight_arm(j, 260 - 80 * p, 175)
+        _nose(j, torso)
+        return j
+
+    def reach_px(self, rep, period):
+        up, hold, _ = self.timing(period)
+        j = self.pose(up + hold / 2, rep, period)
+        return (j['toe'][0] - j['wrist'][0]) * self.px
+
+    def truth(self, rep, period):
+        up, hold, down = self.timing(period)
+        reach = self.reach_px(rep, period)
+        return {'peak': up + hold / 2, 'end': up + hold + down,
+                'reach_px': round(reach, 2), 'reach_m': round(reach * self.pixel_to_m, 4)}
+
+    def counted(self, form):
+        return True
+
+
+MOTIONS = {m.exercise: m for m in (Pushup, Pullup, Situp, Squat, VerticalJump, BroadJump, ShuttleRun, SitReach)}
+
+
+# -------- Landmarks --------
+def _landmark_rows(motion, near, far, facing, root_x):
+    rows = np.zeros((NUM_LANDMARKS, 4), dtype=np.float32)
+    for side, joints, visibility in ((0, near, 0.99), (1, far, 0.9)):
+        image = {name: motion.to_image(joints[name], facing, root_x) for name in JOINTS}
+        for name, idx in zip(JOINTS, JOINT_INDEX):
+            rows[idx + side] = (*image[name], 0.0, visibility)
+        ex, ey = image['elbow']
+        wx, wy = image['wrist']
+        n = math.hypot(wx - ex, wy - ey) or 1.0
+        ux, uy = (wx - ex) / n, (wy - ey) / n
+        hand = 0.06 * motion.px / motion.width
+        for idx, along, across in ((17, 0.8, 0.3), (19, 1.0, 0.0), (21, 0.6, -0.35)):
+            rows[idx + side] = (wx + hand * (along * ux - across * uy), wy + hand * (along * uy + across * ux), 0.0, visibility)
+    nx, ny = motion.to_image(near['nose'], facing, root_x)
+    fx, fy = facing * 0.02 * motion.px / motion.width, 0.02 * motion.px / motion.height
+    face = {0: (nx, ny), 1: (nx - fx * 0.3, ny - fy), 2: (nx - fx * 0.6, ny - fy), 3: (nx - fx, ny - fy),
+            4: (nx - fx * 0.2, ny - fy * 0.9), 5: (nx - fx * 0.5, ny - fy * 0.9), 6: (nx - fx * 0.8, ny - fy * 0.9),
+            7: (nx - fx * 3.0, ny - fy * 0.5), 8: (nx - fx * 2.8, ny - fy * 0.4),
+            9: (nx - fx * 0.3, ny + fy * 1.2), 10: (nx - fx * 0.1, ny + fy * 1.2)}
+    for idx, (x, y) in face.items():
+        rows[idx] = (x, y, 0.0, 0.99)
+    return rows
+
+
+class Sequence:
+    """Landmarks of every frame and the ground truth of one synthetic recording."""
+
+    def __init__(self, exercise, fps, size, times, landmarks, present, truth):
+        self.exercise = exercise
+        self.fps = fps
+        self.size = tuple(size)
+        self.times = times            # (N,) seconds, frame i at (i + 1) / fps like the analyzers
+        self.landmarks = landmarks    # (N, 33, 4) normalized x, y, z, visibility
+        self.present = present        # (N,) False where the pose dropped out
+        self.truth = truth
+
+    def __len__(self):
+        return len(self.times)
+
+    def frames(self):
+        """(t, landmark list or None) per frame, ready for ``Counter.update``."""
+        for t, rows, present in zip(self.times, self.landmarks, self.present):
+            yield float(t), landmarks_from_rows(rows.tolist()) if present else None
+
+
+def generate(exercise, reps=10, cadence=None, fps=30, size=(960, 540), noise_px=1.0,
+             dropout=0.0, dropout_burst=1, bad_form=0.0, jitter=0.0, jump_m=None,
+             lead_s=1.0, tail_s=1.0, seed=0):
+    """Synthetic ``exercise`` sequence of ``reps`` reps.
+
+    ``bad_form`` is the share of reps done with one of the exercise's bad
+    forms, ``jitter`` varies each rep's period by up to that share,
+    ``dropout`` is the share of frames without a pose, lost in bursts of
+    ``dropout_burst`` frames.
+    """
+    motion = MOTIONS[exercise](size, jump_m)
+    rng = np.random.default_rng(seed)
+    base_period = motion.period(cadence or motion.cadence)
+
+    plan, start = [], lead_s
+    for i in range(reps):
+        bad = motion.bad_forms and rng.random() < bad_form
+        rep = {
+            'index': i + 1,
+            'form': str(rng.choice(motion.bad_forms)) if bad else 'good',
+            'amount': float(rng.uniform(0.85, 1.0)),
+        }
+        period = base_period * (1 + rng.uniform(-jitter, jitter))
+        plan.append((start, period, rep))
+        start += period
+    duration = start + tail_s
+
+    n = int(round(duration * fps))
+    times = np.arange(1, n + 1, dtype=np.float64) / fps
+    landmarks = np.zeros((n, NUM_LANDMARKS, 4), dtype=np.float32)
+    k = 0
+    for i, t in enumerate(times):
+        while k + 1 < len(plan) and t >= plan[k + 1][0]:
+            k += 1
+        rep_start, period, rep = plan[k] if plan else (0.0, base_period, None)
+        if not plan or t < rep_start or t >= rep_start + period:
+            tau, rep = None, None
+        else:
+            tau = t - rep_start
+        pose = motion.pose(tau, rep, period)
+        if isinstance(pose, tuple):
+            near, far, facing, root_x = pose
+        else:
+            near, far, facing = pose, None, motion.facing
+            root_x = motion.root_x(tau, rep, period) if hasattr(motion, 'root_x') else 0.0
+        if far is None:
+            far = {name: _add(p, (0.012, 0.008)) for name, p in near.items() if isinstance(p, tuple)}
+        landmarks[i] = _landmark_rows(motion, near, far, facing, root_x)
+
+    if noise_px > 0:
+        landmarks[:, :, 0] += rng.normal(0, noise_px / size[0], landmarks.shape[:2])
+        landmarks[:, :, 1] += rng.normal(0, noise_px / size[1], landmarks.shape[:2])
+    present = np.ones(n, dtype=bool)
+    if dropout > 0:
+        starts = rng.random(n) < dropout / max(1, dropout_burst)
+        for i in np.flatnonzero(starts):
+            present[i:i + dropout_burst] = False
+
+    rep_truth = []
+    for rep_start, period, rep in plan:
+        info = motion.truth(rep, period)
+        row = {
+            'rep': rep['index'], 'form': rep['form'],
+            'counted': motion.counted(rep['form']), 'correct': motion.correct(rep['form']),
+            'start_time': round(rep_start, 4),
+            'peak_time': round(rep_start + info.pop('peak'), 4),
+            'end_time': round(rep_start + info.pop('end'), 4),
+        }
+        for key in ('takeoff', 'turn_time'):
+            if key in info:
+                info[key if key != 'takeoff' else 'takeoff_time'] = round(rep_start + info.pop(key), 4)
+        row.update(info)
+        rep_truth.append(row)
+    truth = {
+        'exercise': exercise, 'fps': fps, 'size': list(size), 'frames': n,
+        'duration_s': round(duration, 4),
+        'reps': rep_truth,
+        'expected_count': sum(r['counted'] for r in rep_truth),
+        'expected_correct': sum(r['correct'] for r in rep_truth),
+        'dropped_frames': int((~present).sum()),
+        'params': {'reps': reps, 'cadence': cadence or motion.cadence, 'noise_px': noise_px,
+                   'dropout': dropout, 'dropout_burst': dropout_burst, 'bad_form': bad_form,
+                   'jitter': jitter, 'jump_m': motion.jump_m, 'seed': seed},
+    }
+    if exercise == 'sitreach' and rep_truth:
+        best = max(rep_truth, key=lambda r: r['reach_px'])
+        truth.update(max_reach_px=best['reach_px'], time_of_max_reach=best['peak_time'])
+    return Sequence(exercise, fps, size, times, landmarks, present, truth)
+
+
+# -------- Counter check --------
+def check(seq, live=False):
+    """Run the exercise's counter over ``seq`` and compare with its truth."""
+    counters = LIVE_COUNTERS if live or seq.exercise not in COUNTERS else COUNTERS
+    counter = counters[seq.exercise](*seq.size)
+    for t, lm in seq.frames():
+        counter.update(lm, t)
+    if seq.exercise == 'sitreach':
+        reach = counter.summary()['max_reach_px']
+        return {
+            'exercise': seq.exercise, 'counter': type(counter).__name__,
+            'expected_reach_px': seq.truth['max_reach_px'], 'reach_px': round(float(reach), 2),
+            'ok': abs(reach - seq.truth['max_reach_px']) <= max(5.0, 0.05 * abs(seq.truth['max_reach_px'])),
+        }
+    expected = seq.truth['expected_count']
+    result = {'exercise': seq.exercise, 'counter': type(counter).__name__,
+              'expected': expected, 'counted': counter.count, 'ok': counter.count == expected}
+    unseen = MOTIONS[seq.exercise].unseen_forms
+    missed = [r['form'] for r in seq.truth['reps'] if r['form'] in unseen and not r['counted']]
+    if missed and counter.count == expected + len(missed):
+        result['known_failure'] = f"{len(missed)} {'/'.join(sorted(set(missed)))} reps counted"
+    return result
+
+
+# -------- Storage and rendering --------
+def save(seq, output_dir, name):
+    os.makedirs(output_dir, exist_ok=True)
+    np.savez_compressed(os.path.join(output_dir, f"{name}_landmarks.npz"),
+                        times=seq.times, landmarks=seq.landmarks, present=seq.present)
+    with open(os.path.join(output_dir, f"{name}_truth.json"), 'w') as f:
+        json.dump(seq.truth, f, indent=2)
+
+
+def load(output_dir, name):
+    data = np.load(os.path.join(output_dir, f"{name}_landmarks.npz"))
+    with open(os.path.join(output_dir, f"{name}_truth.json")) as f:
+        truth = json.load(f)
+    return Sequence(truth['exercise'], truth['fps'], truth['size'],
+                    data['times'], data['landmarks'], data['present'], truth)
+
+
+def draw(seq, size=None):
+    """Stick-figure BGR frames of ``seq``, one per landmark frame. Dropped frames still show the figure."""
+    w, h = size or seq.size
+    rng = np.random.default_rng(0)
+    background = cv2.resize(rng.integers(60, 110, (max(1, h // 8), max(1, w // 8), 3), dtype=np.uint8), (w, h))
+    motion = MOTIONS[seq.exercise](seq.size)
+    cv2.line(background, (0, int(motion.origin_y * h)), (w, int(motion.origin_y * h)), (40, 40, 40), max(2, h // 200))
+    unit = motion.px * h / seq.size[1]
+    limb = max(2, int(0.035 * unit))
+    for rows in seq.landmarks:
+        frame = background.copy()
+        pts = [(int(x * w), int(y * h)) for x, y in rows[:, :2]]
+        for a, b in CONNECTIONS:
+            far = a % 2 == 0 and b % 2 == 0
+            cv2.line(frame, pts[a], pts[b], (150, 110, 70) if far else (230, 180, 120), limb, cv2.LINE_AA)
+        cv2.line(frame, pts[11], pts[23], (60, 60, 200), 2 * limb, cv2.LINE_AA)     # torso
+        cv2.circle(frame, pts[0], max(3, int(0.06 * unit)), (170, 200, 230), -1, cv2.LINE_AA)
+        yield frame
+
+
+def render(seq, path, size=None, fps=None):
+    """Stick-figure video of ``seq`` (mp4v)."""
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'mp4v'), fps or seq.fps, tuple(size or seq.size))
+    if not writer.isOpened():
+        raise RuntimeError(f"Cannot write {path}")
+    for frame in draw(seq, size):
+        writer.write(frame)
+    writer.release()
+    return path
+
+
+# -------- Keyframe check --------
+def check_keyframes(seq, interval=5):
+    """Shuttle run counted with Pose on every frame vs on keyframes with optical flow between.
+
+    The sequence's landmarks stand in for Pose; the tracker follows the feet
+    on the drawn frames as shuttlerun_video.py does with
+    SHUTTLE_KEYFRAME_INTERVAL, re-anchoring whenever it asks to.
+    """
+    if seq.exercise != 'shuttlerun':
+        raise ValueError(f"Keyframe tracking is for shuttlerun, not {seq.exercise}")
+    dense = COUNTERS['shuttlerun'](*seq.size)
+    keyed = COUNTERS['shuttlerun'](*seq.size)
+    tracker = FootTracker(interval=interval)
+    poses = 0
+    for (t, lm), frame in zip(seq.frames(), draw(seq)):
+        if lm is not None:
+            dense.update(lm, t)
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        current_x = tracker.track(gray) if not tracker.due() else None
+        if current_x is None and lm is not None:
+            poses += 1
+            keypoints = keyed.foot_keypoints(lm)
+            current_x = np.mean([p[0] for p in keypoints])
+            tracker.anchor(gray, keypoints)
+        if current_x is not None:
+            keyed.update_x(current_x, t)
+    return {'exercise': seq.exercise, 'interval': interval, 'expected': seq.truth['expected_count'],
+            'dense': dense.run_count, 'keyframed': keyed.run_count, 'pose_share': round(poses / max(len(seq), 1), 3),
+            'ok': keyed.run_count == dense.run_count}
+
+
+def check_stride(seq, stride=2):
+    """Vertical jump counted with Pose on every frame vs on every ``stride``-th frame only."""
+    if seq.exercise != 'verticaljump':
+        raise ValueError(f"Inference stride is for verticaljump, not {seq.exercise}")
+    dense = COUNTERS['verticaljump'](*seq.size)
+    strided = COUNTERS['verticaljump'](*seq.size, stride=stride)
+    for i, (t, lm) in enumerate(seq.frames()):
+        if lm is None:
+            continue
+        dense.update(lm, t)
+        if i % stride == 0:
+            strided.update(lm, t)
+    return {'exercise': seq.exercise, 'stride': stride, 'expected': seq.truth['expected_count'],
+            'dense': dense.count, 'strided': strided.count, 'ok': strided.count == dense.count}
+
+
+if __name__ == "__main__":
+    exercise = os.environ.get("SYNTH_EXERCISE", "pushup")
+    size = tuple(int(v) for v in os.environ.get("SYNTH_SIZE", "960x540").lower().split("x"))
+    output_folder = os.environ.get("SYNTH_OUTPUT_DIR", "synthetic")
+    failed = []
+    for name in (MOTIONS if exercise == "all" else [exercise]):
+        seq = generate(
+            name,
+            reps=int(os.environ.get("SYNTH_REPS", "10")),
+            cadence=float(os.environ.get("SYNTH_CADENCE", "0")) or None,
+            fps=float(os.environ.get("SYNTH_FPS", "30")),
+            size=size,
+            noise_px=float(os.environ.get("SYNTH_NOISE_PX", "1")),
+            dropout=float(os.environ.get("SYNTH_DROPOUT", "0")),
+            bad_form=float(os.environ.get("SYNTH_BAD_FORM", "0")),
+            seed=int(os.environ.get("SYNTH_SEED", "0")),
+        )
+        save(seq, output_folder, name)
+        if os.environ.get("SYNTH_RENDER", "0") not in ("", "0"):
+            render(seq, os.path.join(output_folder, f"{name}.mp4"))
+        result = check(seq)
+        print(f"{name}: {len(seq)} frames, truth {seq.truth.get('expected_count')} reps; {result}")
+        if not result['ok'] and 'known_failure' not in result:
+            failed.append(name)
+        interval = int(os.environ.get("SYNTH_KEYFRAMES", "0"))
+        if name == 'shuttlerun' and interval > 1:
+            keyed = check_keyframes(seq, interval)
+            print(f"{name} keyframes: {keyed}")
+            if not keyed['ok']:
+                failed.append(f"{name} keyframes")
+        stride = int(os.environ.get("SYNTH_STRIDE", "0"))
+        if name == 'verticaljump' and stride > 1:
+            strided = check_stride(seq, stride)
+            print(f"{name} stride: {strided}")
+            if not strided['ok']:
+                failed.append(f"{name} stride")
+    if failed:
+        sys.exit(f"Failed: {', '.join(failed)}")
@@ -0,0 +1,87 @@
+"""CPU thread budget of the analysis workers.
+
+OpenCV, the BLAS behind NumPy, the pose runtime and the H.264 encoder each
+size their thread pools by the machine's core count, so N jobs side by side
+run N times as many busy threads as there are cores and spend the
+difference switching between them. The job runner gives each of its slots
+an allotment instead: ``allot()`` splits the cores, ``budget_env()`` turns
+an allotment into the environment of that slot's worker, and the worker
+calls ``apply()`` first thing, before any library starts a pool:
+
+  OpenCV          cv2.setNumThreads, decode threads (OPENCV_FFMPEG_THREADS)
+  encoder         ``threads`` option of the FFmpeg writer (OPENCV_FFMPEG_WRITER_OPTIONS)
+  BLAS / OpenMP   OMP_NUM_THREADS, OPENBLAS_NUM_THREADS, MKL_NUM_THREADS, ...
+  inference       POSE_NUM_THREADS (tflite/onnx without the runner's pose service)
+
+MediaPipe's own graph executor has no thread setting; with JOB_PIN_CPUS its
+threads are confined to the slot's cores like everything else in the worker,
+and roster_split sizes its pool by ``job_threads()``.
+
+loadtest.py's saturation curve, run once with JOB_THREADS=0 and once
+without, shows what the budget buys at each concurrency level.
+
+Environment (read by the job runner):
+  JOB_THREADS   threads per job (default: the cores divided among the slots,
+                at least 1; 0 = no budget, every library sizes its own pool)
+  JOB_PIN_CPUS  1 = pin each slot's worker to its own cores (Linux, default 0)
+"""
+import os
+
+BLAS_VARS = ('OMP_NUM_THREADS', 'OPENBLAS_NUM_THREADS', 'MKL_NUM_THREADS', 'VECLIB_MAXIMUM_THREADS',
+             'NUMEXPR_NUM_THREADS')
+
+
+def machine_cpus():
+    """CPU ids this process may run on."""
+    if hasattr(os, 'sched_getaffinity'):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+def allot(slots, threads=None, cpus=None):
+    """One list of CPU ids per slot, ``threads`` long (default: an even share, at least 1).
+
+    Slots get disjoint cores while there are enough; past that they wrap
+    around and share.
+    """
+    cpus = cpus or machine_cpus()
+    threads = threads or max(1, len(cpus) // max(slots, 1))
+    threads = min(threads, len(cpus))
+    return [[cpus[(slot * threads + i) % len(cpus)] for i in range(threads)] for slot in range(slots)]
+
+
+def budget_env(cpus, pin=False):
+    """Environment of a worker that owns ``cpus`` (one thread each)."""
+    n = str(len(cpus))
+    env = {var: n for var in BLAS_VARS}
+    writer_options = os.environ.get("OPENCV_FFMPEG_WRITER_OPTIONS")
+    env.update(
+        JOB_THREADS=n,
+        POSE_NUM_THREADS=n,
+        OPENCV_FFMPEG_THREADS=n,
+        OPENCV_FFMPEG_WRITER_OPTIONS=f"{writer_options}|threads;{n}" if writer_options else f"threads;{n}",
+    )
+    if pin:
+        env['JOB_CPUS'] = ','.join(map(str, cpus))
+    return env
+
+
+def job_threads():
+    """Threads the current job may use: its budget, else every core."""
+    return int(os.environ.get("JOB_THREADS") or 0) or len(machine_cpus())
+
+
+def apply(threads=None):
+    """Hold this process to its budget (JOB_CPUS, JOB_THREADS, or ``threads``).
+
+    Pinning only covers threads started afterwards, so call it before
+    anything else starts any.
+    """
+    cpus = os.environ.get("JOB_CPUS")
+    if cpus and hasattr(os, 'sched_setaffinity'):
+        os.sched_setaffinity(0, {int(c) for c in cpus.split(',')})
+    threads = threads or int(os.environ.get("JOB_THREADS") or 0)
+    if threads:
+        import cv2
+        cv2.setNumThreads(threads)
+    return threads
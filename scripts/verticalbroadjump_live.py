@@ -1,19 +1,13 @@
 import cv2
 import mediapipe as mp
-import numpy as np
 import pandas as pd
 import os
-from collections import deque
-
-def lm_xy(lm, w, h):
-    return (lm.x * w, lm.y * h)
-
-# -------- Settings --------
-Y_THRESHOLD = 15
-SMOOTH_WINDOW = 5
+from counters import LIVE_COUNTERS
+from live_io import CameraSource, FrameReader, VideoWriterThread, Display
 
 # -------- Camera Setup --------
-cap = cv2.VideoCapture(0)
+reader = FrameReader(CameraSource(0))
+cap = reader.source.cap
 filename = "camera_vertical_broad_jump"
 output_folder = filename
 os.makedirs(output_folder, exist_ok=True)
@@ -22,7 +16,7 @@ height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
 fps = cap.get(cv2.CAP_PROP_FPS) or 30
 fourcc = cv2.VideoWriter_fourcc(*'mp4v')
 output_video_path = os.path.join(output_folder, f"{filename}_annotated.mp4")
-out_vid = cv2.VideoWriter(output_video_path, fourcc, fps, (width, height))
+out_vid = VideoWriterThread(output_video_path, fourcc, fps, (width, height))
 csv_path = os.path.join(output_folder, f"{filename}_jump_log.csv")
 
 # -------- MediaPipe --------
@@ -31,87 +25,52 @@ pose = mp_pose.Pose(min_detection_confidence=0.5, model_complexity=1)
 mp_draw = mp.solutions.drawing_utils
 
 # -------- Jump Variables --------
-state = 'grounded'
-jumps = []
+counter = LIVE_COUNTERS['broadjump'](width, height)
 frame_idx = 0
-air_start_time = None
-takeoff_x = None
-takeoff_y = None
-ankle_y_history = deque(maxlen=SMOOTH_WINDOW)
 
 # -------- Processing Loop --------
-while True:
-    ret, frame = cap.read()
-    if not ret:
+reader.start()
+display = Display('Vertical Broad Jump Counter')
+start_time = None
+while not display.quit.is_set():
+    frame, stamp = reader.read(timeout=1.0)
+    if frame is None:
+        if reader.ended:
+            break
         continue
-    
+    start_time = stamp if start_time is None else start_time
     frame_idx += 1
-    t = frame_idx / fps
+    t = stamp - start_time  # capture time, so skipped frames don't slow the clock
 
     img_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
     results = pose.process(img_rgb)
 
-    ankle_y = None
-    ankle_x = None
+    lm = None
     if results.pose_landmarks:
         mp_draw.draw_landmarks(frame, results.pose_landmarks, mp_pose.POSE_CONNECTIONS)
         lm = results.pose_landmarks.landmark
-        try:
-            left_ankle = lm_xy(lm[mp_pose.PoseLandmark.LEFT_ANKLE], width, height)
-            right_ankle = lm_xy(lm[mp_pose.PoseLandmark.RIGHT_ANKLE], width, height)
-            ankle_y = (left_ankle[1] + right_ankle[1]) / 2
-            ankle_x = (left_ankle[0] + right_ankle[0]) / 2
-            ankle_y_history.append(ankle_y)
-        except:
-            pass
-
-    if ankle_y is not None and len(ankle_y_history) == SMOOTH_WINDOW:
-        ankle_y_smooth = sum(ankle_y_history) / len(ankle_y_history)
-
-        if state == 'grounded':
-            if ankle_y_history[0] - ankle_y_smooth > Y_THRESHOLD:
-                state = 'airborne'
-                air_start_time = t
-                takeoff_x = ankle_x
-                takeoff_y = ankle_y_smooth
-        elif state == 'airborne':
-            if ankle_y_smooth - min(ankle_y_history) > Y_THRESHOLD:
-                state = 'grounded'
-                air_time = t - air_start_time
-                jump_distance = ankle_x - takeoff_x
-                jumps.append({
-                    'count': len(jumps)+1,
-                    'takeoff_time': round(air_start_time,3),
-                    'landing_time': round(t,3),
-                    'air_time_s': round(air_time,3),
-                    'jump_distance_px': round(jump_distance,2)
-                })
-                air_start_time = None
-                takeoff_x = None
-                takeoff_y = None
+    counter.update(lm, t)
 
     # -------- Display --------
-    if ankle_y is not None:
-        cv2.putText(frame, f'Ankle Y: {int(ankle_y)}', (10,30), cv2.FONT_HERSHEY_SIMPLEX,0.8,(0,255,0),2)
-    cv2.putText(frame, f'Jumps: {len(jumps)}', (10,60), cv2.FONT_HERSHEY_SIMPLEX,0.9,(0,255,255),2)
-    cv2.putText(frame, f'State: {state}', (10,95), cv2.FONT_HERSHEY_SIMPLEX,0.8,(200,200,0),2)
+    if counter.ankle_y is not None:
+        cv2.putText(frame, f'Ankle Y: {int(counter.ankle_y)}', (10,30), cv2.FONT_HERSHEY_SIMPLEX,0.8,(0,255,0),2)
+    cv2.putText(frame, f'Jumps: {counter.count}', (10,60), cv2.FONT_HERSHEY_SIMPLEX,0.9,(0,255,255),2)
+    cv2.putText(frame, f'State: {counter.state}', (10,95), cv2.FONT_HERSHEY_SIMPLEX,0.8,(200,200,0),2)
     cv2.putText(frame, f'Time: {t:.1f}s', (10,130), cv2.FONT_HERSHEY_SIMPLEX,0.8,(255,255,0),2)
 
-    cv2.imshow('Vertical Broad Jump Counter', frame)
-    out_vid.write(frame)
-    if cv2.waitKey(1) & 0xFF in [27, ord('q')]:
-        break
+    display.show(frame)
+    out_vid.write(frame, stamp)
 
 # -------- Cleanup --------
-cap.release()
+reader.close()
 out_vid.release()
-cv2.destroyAllWindows()
+display.close()
 pose.close()
 
 # -------- Save CSV --------
-if jumps:
-    pd.DataFrame(jumps).to_csv(csv_path, index=False)
-    print(f"Saved {csv_path} with {len(jumps)} jumps.")
+if counter.rows():
+    pd.DataFrame(counter.rows()).to_csv(csv_path, index=False)
+    print(f"Saved {csv_path} with {counter.count} jumps.")
 else:
     print("No jumps detected.")
 print(f"Annotated video saved at: {output_video_path}")
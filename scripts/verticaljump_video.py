@@ -1,20 +1,20 @@
 import cv2
 import os
 import mediapipe as mp
+from pose_backend import create_pose
+from counters import VerticalJumpCounter
+from profiler import tracer_from_env
+from job_metrics import report_job
+from job_control import stop_requested
 from tkinter import Tk, filedialog
-from collections import deque
-import numpy as np
 import pandas as pd
 
-# -------- Utilities --------
-def lm_xy(lm, w, h):
-    return (lm.x*w, lm.y*h)
-
 # -------- Settings --------
 PROC_W, PROC_H = 960, 540  # fixed resolution for display
 PIXEL_TO_CM = 0.26
 PIXEL_TO_M = PIXEL_TO_CM / 100
-SMOOTH_N = 5  # frames to smooth hip y
+# Run Pose on every Nth frame only; the flight parabola fills in the gaps
+INFERENCE_STRIDE = int(os.environ.get("JUMP_INFERENCE_STRIDE", "1"))
 
 # -------- File Selection --------
 Tk().withdraw()
@@ -39,114 +39,58 @@ out_vid = cv2.VideoWriter(output_video_path, fourcc, fps, (PROC_W, PROC_H))
 
 # -------- MediaPipe Setup --------
 mp_pose = mp.solutions.pose
-pose = mp_pose.Pose(min_detection_confidence=0.5, model_complexity=1)
+pose = create_pose(min_detection_confidence=0.5, model_complexity=1)
 mp_draw = mp.solutions.drawing_utils
 
 # -------- Jump Variables --------
-baseline_y = None
-in_air = False
-peak_y = None
-jump_count = 0
-jump_data = []
-hip_history = deque(maxlen=SMOOTH_N)
-max_jump_height_px = 0
-time_of_max_height = 0
-air_start_time = 0
-air_time = 0  # initialize air_time
+counter = VerticalJumpCounter(PROC_W, PROC_H, pixel_to_m=PIXEL_TO_M, verbose=True, stride=INFERENCE_STRIDE)
 
 frame_idx = 0
+pose_frames = 0
+
+tracer = tracer_from_env()
 
 # -------- Processing Loop --------
 while True:
+    if stop_requested():   # cancelled or out of time: keep what we have
+        break
+    tracer.frame()
     ret, frame = cap.read()
     if not ret: break
+    tracer.mark('decode')
     frame_idx += 1
     t = frame_idx / fps
 
     # Resize for consistent display
     frame = cv2.resize(frame, (PROC_W, PROC_H))
+    tracer.mark('resize')
 
-    img_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-    results = pose.process(img_rgb)
+    results = None
+    if (frame_idx - 1) % INFERENCE_STRIDE == 0:
+        img_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        tracer.mark('cvtColor')
+        results = pose.process(img_rgb)
+        pose_frames += 1
+        tracer.mark('pose')
 
-    if results.pose_landmarks:
+    if results is not None and results.pose_landmarks:
         mp_draw.draw_landmarks(frame, results.pose_landmarks, mp_pose.POSE_CONNECTIONS)
-        lm = results.pose_landmarks.landmark
-
-        # Mid-hip
-        left_hip = lm_xy(lm[mp_pose.PoseLandmark.LEFT_HIP], PROC_W, PROC_H)
-        right_hip = lm_xy(lm[mp_pose.PoseLandmark.RIGHT_HIP], PROC_W, PROC_H)
-        mid_hip_y = (left_hip[1] + right_hip[1]) / 2
-
-        hip_history.append(mid_hip_y)
-        hip_smoothed = np.mean(hip_history)
-
-        if baseline_y is None:
-            baseline_y = hip_smoothed
-
-        # Jump detection
-        if not in_air and hip_smoothed < baseline_y - 20:
-            in_air = True
-            peak_y = hip_smoothed
-            air_start_time = t
-            air_time = 0  # reset air_time at takeoff
-            print(f"[Jump] Takeoff at {t:.2f}s, baseline={baseline_y:.1f}, current={hip_smoothed:.1f}")
-        elif in_air:
-            peak_y = min(peak_y, hip_smoothed)
-            air_time = t - air_start_time  # update air_time continuously
-            
-            # Landing detected
-            if hip_smoothed >= baseline_y - 5:
-                in_air = False
-                jump_height_px = baseline_y - peak_y
-                jump_height_m = jump_height_px * PIXEL_TO_M
-                jump_count += 1
-                print(f"[Jump] Landing at {t:.2f}s, height={jump_height_px:.1f}px ({jump_height_m:.2f}m), air_time={air_time:.2f}s")
-                jump_data.append({
-                    'count': jump_count,
-                    'takeoff_time': round(air_start_time,3),
-                    'landing_time': round(t,3),
-                    'air_time_s': round(air_time,3),
-                    'jump_height_px': round(jump_height_px,2),
-                    'jump_height_m': round(jump_height_m,3)
-                })
-                if jump_height_px > max_jump_height_px:
-                    max_jump_height_px = jump_height_px
-                    time_of_max_height = air_start_time
-                peak_y = None
-                air_time = 0  # reset after landing
-                baseline_y = hip_smoothed  # update baseline after landing
-            # Safety: force landing if stuck in air > 2 seconds
-            elif air_time > 2.0:
-                print(f"[Jump] Force landing after {air_time:.2f}s in air")
-                in_air = False
-                jump_height_px = baseline_y - peak_y
-                jump_height_m = jump_height_px * PIXEL_TO_M
-                if jump_height_px > 10:  # Only count if reasonable height
-                    jump_count += 1
-                    jump_data.append({
-                        'count': jump_count,
-                        'takeoff_time': round(air_start_time,3),
-                        'landing_time': round(t,3),
-                        'air_time_s': round(air_time,3),
-                        'jump_height_px': round(jump_height_px,2),
-                        'jump_height_m': round(jump_height_m,3)
-                    })
-                    if jump_height_px > max_jump_height_px:
-                        max_jump_height_px = jump_height_px
-                        time_of_max_height = air_start_time
-                peak_y = None
-                air_time = 0
-                baseline_y = hip_smoothed
-
-        # -------- Display --------
-        cv2.putText(frame, f"Jump Count: {jump_count}", (10,30), cv2.FONT_HERSHEY_SIMPLEX, 1, (0,255,255),2)
-        cv2.putText(frame, f"Peak Height: {max_jump_height_px*PIXEL_TO_M:.2f} m", (10,70), cv2.FONT_HERSHEY_SIMPLEX,0.8,(0,255,0),2)
-        cv2.putText(frame, f"Air Time: {air_time:.2f}s" if in_air else "", (10,110), cv2.FONT_HERSHEY_SIMPLEX,0.8,(255,0,0),2)
+        tracer.mark('draw')
+        counter.update(results.pose_landmarks.landmark, t)
+        tracer.mark('counter')
+
+    # -------- Display --------
+    if counter.baseline_y is not None:
+        cv2.putText(frame, f"Jump Count: {counter.count}", (10,30), cv2.FONT_HERSHEY_SIMPLEX, 1, (0,255,255),2)
+        cv2.putText(frame, f"Peak Height: {counter.max_jump_height_px*PIXEL_TO_M:.2f} m", (10,70), cv2.FONT_HERSHEY_SIMPLEX,0.8,(0,255,0),2)
+        cv2.putText(frame, f"Air Time: {counter.air_time:.2f}s" if counter.in_air else "", (10,110), cv2.FONT_HERSHEY_SIMPLEX,0.8,(255,0,0),2)
         cv2.putText(frame, f"Video Time: {t:.2f}s", (10,150), cv2.FONT_HERSHEY_SIMPLEX,0.8,(255,255,0),2)
 
+    tracer.mark('overlay')
     cv2.imshow("Vertical Jump Tracker", frame)
+    tracer.mark('display')
     out_vid.write(frame)
+    tracer.mark('write')
     
     # Progress indicator
     if frame_idx % 30 == 0:
@@ -161,8 +105,10 @@ cap.release()
 out_vid.release()
 cv2.destroyAllWindows()
 pose.close()
+tracer.write(output_folder, filename)
 
 # -------- Save CSV --------
+jump_data = counter.rows()
 if jump_data:
     pd.DataFrame(jump_data).to_csv(csv_path, index=False)
     print(f"Saved {csv_path} with {len(jump_data)} jumps")
@@ -170,4 +116,7 @@ else:
     print("No jumps detected.")
 
 print(f"Total video duration: {video_duration_sec:.2f}s")
-print(f"Maximum jump height: {max_jump_height_px*PIXEL_TO_M:.2f}m at {time_of_max_height:.2f}s")
+print(f"Maximum jump height: {counter.max_jump_height_px*PIXEL_TO_M:.2f}m at {counter.time_of_max_height:.2f}s")
+print(f"Pose inferences: {pose_frames}/{frame_idx} frames")
+
+report_job(frame_idx, 'verticaljump')
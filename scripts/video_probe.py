@@ -0,0 +1,55 @@
+"""Fast look at a video container: frame count, fps, resolution, duration.
+
+Only the container header is read (no frame is decoded), so probing an
+upload takes milliseconds whatever its length. Some containers, WebM from
+MediaRecorder in particular, carry no frame count; for those the duration
+is read by seeking to the end, and the count derived from it.
+
+    python scripts/video_probe.py clip.mp4 [more.webm ...]
+"""
+import json
+import sys
+
+import cv2
+
+# Frame counts above this are a broken header, not a real clip (about 9 h at 60 fps)
+MAX_FRAMES = 2_000_000
+
+
+def probe_video(path):
+    """{'frames', 'fps', 'width', 'height', 'duration_s'} of ``path``, None when it does not open.
+
+    Any field the container does not tell is None.
+    """
+    cap = cv2.VideoCapture(path)
+    try:
+        if not cap.isOpened():
+            return None
+        fps = cap.get(cv2.CAP_PROP_FPS)
+        fps = fps if 0 < fps < 1000 else None
+        frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        frames = frames if 0 < frames < MAX_FRAMES else None
+        width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)) or None
+        height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)) or None
+
+        duration = frames / fps if frames and fps else None
+        if duration is None and cap.set(cv2.CAP_PROP_POS_AVI_RATIO, 1):
+            end_ms = cap.get(cv2.CAP_PROP_POS_MSEC)
+            if end_ms > 0:
+                duration = end_ms / 1000
+                if frames is None and fps:
+                    frames = int(round(duration * fps))
+        return {
+            'frames': frames,
+            'fps': round(fps, 3) if fps else None,
+            'width': width,
+            'height': height,
+            'duration_s': round(duration, 3) if duration else None,
+        }
+    finally:
+        cap.release()
+
+
+if __name__ == "__main__":
+    for path in sys.argv[1:]:
+        print(json.dumps({'video': path, **(probe_video(path) or {'error': 'cannot open'})}))
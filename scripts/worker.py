@@ -0,0 +1,254 @@
+"""Long-lived analysis worker and the supervisor that recycles it.
+
+Instead of a fresh process per upload, one worker process runs analyses back
+to back, so imports and model loading are paid once. Jobs are JSON lines on
+the worker's stdin:
+
+  {"id": "job-1", "exercise": "pushup", "video": "/path/clip.mp4",
+   "mode": "script" | "headless" | "multi" | "roster",
+   "output_dir": "/path/out", "env": {"JOB_ID": "..."}, "budget_s": 600}
+
+and every job gets one JSON line back on stdout:
+
+  {"id": "job-1", "ok": true, "report": {...JOB_METRICS...}, "result": {...},
+   "usage": {"rss_bytes": ..., "open_fds": ..., "threads": ..., "pose_handles": ...}}
+
+``script`` runs the annotated *_video.py in-process (writer, CSV, everything
+the server's throwaway process does) with ``output_dir`` as the working
+directory, or the file given as ``"script"`` (the server's rewritten copy);
+``headless`` runs analyze.analyze_video. Anything the analyzers
+print goes to stderr, so stdout only ever carries replies.
+
+SIGUSR1 cancels the running job and ``budget_s`` (or JOB_BUDGET_S) bounds
+its wall-clock time: the analyzer stops at its next frame, saves what it has
+and the reply's report says ``stopped`` (job_control.py).
+
+Single-athlete jobs checkpoint their pose results under
+``output_dir/.checkpoint`` (checkpoint.py) until they return; a job that is
+run again after its worker died resumes from there with identical results.
+
+Memory a process gives back to the allocator is rarely returned to the OS,
+and native graphs or writers that are not closed never are, so
+``WorkerProcess`` (the parent side) replaces its worker once the reported
+resident memory or the number of jobs crosses a limit, and whenever the
+worker dies. soak.py runs thousands of jobs through it to measure growth.
+
+A worker started with a thread budget in its environment (thread_budget.py)
+holds every library to it before loading any.
+
+Environment:
+  WORKER_MAX_RSS_MB  recycle the worker above this resident memory (default 1536, 0 = no limit)
+  WORKER_MAX_JOBS    recycle the worker after this many jobs (default 200, 0 = no limit)
+"""
+import contextlib
+import json
+import os
+import runpy
+import signal
+import subprocess
+import sys
+import threading
+import time
+import traceback
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+# -------- Worker side --------
+def _script_path(mode, exercise):
+    from benchmark import SCRIPTS
+    name = {'multi': 'multi_person_video.py', 'roster': 'roster_video.py'}.get(mode) or SCRIPTS[exercise]
+    return os.path.join(SCRIPTS_DIR, name)
+
+
+@contextlib.contextmanager
+def _job_env(env):
+    saved = {k: os.environ.get(k) for k in env}
+    os.environ.update({k: str(v) for k, v in env.items()})
+    try:
+        yield
+    finally:
+        for k, v in saved.items():
+            if v is None:
+                os.environ.pop(k, None)
+            else:
+                os.environ[k] = v
+
+
+def run_job(job):
+    import checkpoint
+    import job_control
+    import job_metrics
+    from benchmark import headless_gui
+
+    mode = job.get('mode', 'script')
+    exercise = job['exercise']
+    output_dir = job.get('output_dir') or os.getcwd()
+    os.makedirs(output_dir, exist_ok=True)
+    env = {'EXERCISE': exercise, **job.get('env', {})}
+    # Single-athlete analyses checkpoint their pose results; a rerun of the job resumes
+    ckpt_dir = None
+    if mode not in ('multi', 'roster'):
+        ckpt_dir = os.path.join(output_dir, checkpoint.DIRNAME)
+        checkpoint.prepare(ckpt_dir, checkpoint.input_key(job['video'], exercise, mode, job.get('script')))
+        env['JOB_CHECKPOINT_DIR'] = ckpt_dir
+    checkpoint.start_job()
+    job_metrics.start_job()
+    result = None
+    cwd = os.getcwd()
+    with _job_env(env):
+        job_control.start(job.get('budget_s'))
+        os.chdir(output_dir)
+        try:
+            if mode == 'headless':
+                from analyze import analyze_video
+                result = analyze_video(job['video'], exercise)
+                job_metrics.report_job(result['end_frame'], exercise)
+                result = {'count': result['count'], 'frames': result['end_frame'], 'stopped': result['stopped']}
+            else:
+                headless_gui(job['video'])
+                runpy.run_path(job.get('script') or _script_path(mode, exercise), run_name='__main__')
+        finally:
+            os.chdir(cwd)
+    if ckpt_dir:
+        checkpoint.discard(ckpt_dir)
+    return {'report': job_metrics.last_report, 'result': result}
+
+
+def _exit_with_parent(parent):
+    # A worker whose supervisor is gone would finish a job nobody collects
+    # while a new supervisor runs it again
+    while True:
+        time.sleep(1.0)
+        if os.getppid() != parent:
+            os._exit(1)
+
+
+def serve():
+    """Worker loop: one job per stdin line, one reply per job on the real stdout."""
+    sys.path.insert(0, SCRIPTS_DIR)
+    import thread_budget
+    thread_budget.apply()   # before any library starts a thread pool
+
+    import job_control
+    from job_metrics import process_usage
+
+    job_control.install_signal_handler()
+
+    threading.Thread(target=_exit_with_parent, args=(os.getppid(),), daemon=True).start()
+
+    # Replies get a private copy of stdout; fd 1 itself (analyzer prints,
+    # child processes) goes to stderr from here on
+    replies = os.fdopen(os.dup(1), 'w', buffering=1)
+    os.dup2(2, 1)
+    sys.stdout = sys.stderr
+
+    for line in sys.stdin:
+        if not line.strip():
+            continue
+        try:
+            job = json.loads(line)
+        except ValueError as e:
+            replies.write(json.dumps({'id': None, 'ok': False, 'error': f"Bad job line: {e}"}) + "\n")
+            continue
+        reply = {'id': job.get('id')}
+        try:
+            reply.update(ok=True, **run_job(job))
+        except BaseException as e:  # a script calling sys.exit() must not end the worker
+            if isinstance(e, KeyboardInterrupt):
+                raise
+            traceback.print_exc()
+            reply.update(ok=False, error=f"{type(e).__name__}: {e}")
+        reply['usage'] = process_usage()
+        replies.write(json.dumps(reply, default=str) + "\n")
+
+
+# -------- Parent side --------
+class WorkerProcess:
+    """Runs jobs through a worker.py child, replacing it at the limits or when it dies."""
+
+    def __init__(self, max_rss_mb=1536, max_jobs=200, env=None, stderr=None):
+        self.max_rss_bytes = max_rss_mb * 2 ** 20 if max_rss_mb else None
+        self.max_jobs = max_jobs or None
+        self.env = env
+        self.stderr = stderr
+        self.proc = None
+        self.jobs = 0          # jobs done by the current worker
+        self.generation = 0    # workers started so far
+        self.recycled = []     # (generation, reason, jobs) per replaced worker
+
+    def _spawn(self):
+        self.proc = subprocess.Popen(
+            [sys.executable, os.path.abspath(__file__)],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=self.stderr,
+            env={**os.environ, 'PYTHONUNBUFFERED': '1', **(self.env or {})}, text=True, bufsize=1,
+        )
+        self.jobs = 0
+        self.generation += 1
+
+    def recycle(self, reason):
+        self.recycled.append((self.generation, reason, self.jobs))
+        self.close()
+
+    def run(self, job):
+        if self.proc is None or self.proc.poll() is not None:
+            self._spawn()
+        pid = self.proc.pid
+        try:
+            self.proc.stdin.write(json.dumps(job) + "\n")
+            self.proc.stdin.flush()
+            line = self.proc.stdout.readline()
+        except (BrokenPipeError, OSError):
+            line = ''
+        if not line:
+            code = self.proc.wait()
+            self.recycle('died')
+            return {'id': job.get('id'), 'ok': False, 'error': f"Worker exited with code {code}",
+                    'worker': {'pid': pid, 'generation': self.generation, 'jobs': self.jobs, 'recycled': 'died'}}
+
+        reply = json.loads(line)
+        self.jobs += 1
+        usage = reply.get('usage') or {}
+        reason = None
+        if self.max_rss_bytes and (usage.get('rss_bytes') or 0) > self.max_rss_bytes:
+            reason = 'rss'
+        elif self.max_jobs and self.jobs >= self.max_jobs:
+            reason = 'jobs'
+        reply['worker'] = {'pid': pid, 'generation': self.generation, 'jobs': self.jobs, 'recycled': reason}
+        if reason:
+            self.recycle(reason)
+        return reply
+
+    def interrupt(self):
+        """Ask the running job to stop at its next frame (it still replies)."""
+        if self.proc is not None and self.proc.poll() is None and hasattr(signal, 'SIGUSR1'):
+            self.proc.send_signal(signal.SIGUSR1)
+
+    def kill(self):
+        """Stop the worker now, mid-job if need be; the next run() starts a fresh one."""
+        if self.proc is not None:
+            self.proc.kill()
+
+    def close(self):
+        if self.proc is None:
+            return
+        try:
+            self.proc.stdin.close()
+            self.proc.wait(timeout=30)
+        except (OSError, subprocess.TimeoutExpired):
+            self.proc.kill()
+            self.proc.wait()
+        self.proc.stdout.close()
+        self.proc = None
+
+
+def worker_from_env(**kwargs):
+    return WorkerProcess(
+        max_rss_mb=float(os.environ.get("WORKER_MAX_RSS_MB", "1536")),
+        max_jobs=int(os.environ.get("WORKER_MAX_JOBS", "200")),
+        **kwargs,
+    )
+
+
+if __name__ == "__main__":
+    serve()
@@ -4,10 +4,14 @@ const cors = require('cors');
 const fs = require('fs-extra');
 const path = require('path');
 const { spawn } = require('child_process');
+const crypto = require('crypto');
+const readline = require('readline');
 const csv = require('csv-parser');
 const ffmpeg = require('fluent-ffmpeg');
 const sharp = require('sharp');
 const { connectDB, getDB } = require('./db');
+const metrics = require('./utils/metrics');
+const { JobQueue } = require('./utils/jobQueue');
 
 // Try to set ffmpeg path
 try {
@@ -82,14 +86,79 @@ const activityScripts = {
   'Standing Broad Jump': 'verticalbroadjump_video.py'
 };
 
-// Live recording scripts
-const liveScripts = {
-  'Push-ups': 'pushup_live.py',
-  'Pull-ups': 'pullup_live.py',
-  'Sit-ups': 'situp_live.py',
-  'Vertical Jump': 'verticaljump_live.py',
-  'Shuttle Run': 'shuttlerun_live.py'
+// Counter key (scripts/counters.py) per activity, used by the multi-athlete analyzer
+const activityExercises = {
+  'Push-ups': 'pushup',
+  'Pull-ups': 'pullup',
+  'Sit-ups': 'situp',
+  'Vertical Jump': 'verticaljump',
+  'Shuttle Run': 'shuttlerun',
+  'Sit Reach': 'sitreach',
+  'Vertical Broad Jump': 'broadjump',
+  'Standing Broad Jump': 'broadjump'
 };
+// Upload modes that run every athlete of a class recording through one analyzer
+const classModeScripts = {
+  multi: 'multi_person_video.py',   // everyone in frame at once, one counter per track
+  roster: 'roster_video.py'         // one student after another, split into attempts
+};
+
+// Counter key (scripts/counters.py LIVE_COUNTERS) per activity with live recording
+const liveExercises = {
+  'Push-ups': 'pushup',
+  'Pull-ups': 'pullup',
+  'Sit-ups': 'situp',
+  'Squats': 'squat',
+  'Vertical Jump': 'verticaljump',
+  'Shuttle Run': 'shuttlerun',
+  'Sit Reach': 'sitreach'
+};
+
+// Running live sessions by outputId; an entry goes when its engine exits
+const liveSessions = new Map();
+const LIVE_STOP_TIMEOUT_MS = 5000;
+// Frame source of the live engine (scripts/live_engine.py), e.g. camera:0 for
+// a camera on the server machine. Live recording is off until it is set.
+const LIVE_SOURCE = process.env.LIVE_SOURCE || '';
+
+// Durable job queue (server/utils/jobQueue.js); uploads wait here for a free worker
+const jobQueue = new JobQueue(path.join(__dirname, '..', 'scripts'), {
+  JOB_DB: process.env.JOB_DB || path.join(__dirname, 'jobs.db')
+});
+const QUEUE_RETRY_AFTER_S = 30;
+// Jobs stopped before the end (client gone, DELETE, time budget); they keep partial results
+const STOPPED_STATES = ['cancelled', 'expired'];
+jobQueue.on('running', job => metrics.jobStarted(metricsJob(job)));
+jobQueue.on('done', (job, event) => metrics.recordJob(metricsJob(job), 'ok', event.duration_s, job.report));
+jobQueue.on('retrying', (job, event) => {
+  console.warn(`[job ${job.id}] attempt ${job.attempts} failed, queued again: ${job.error}`);
+  // Lost leases are requeued by the sweep and never reported as running here
+  if (event.duration_s !== undefined) metrics.recordJob(metricsJob(job), 'retried', event.duration_s, null);
+});
+jobQueue.on('lost', job => metrics.recordJob(metricsJob(job), 'lost', NaN, null));
+jobQueue.on('failed', (job, event) => {
+  console.error(`[job ${job.id}] failed for good: ${job.error}`);
+  if (event.duration_s !== undefined) metrics.recordJob(metricsJob(job), 'failed', event.duration_s, null);
+});
+
+jobQueue.on('cancelled', (job, event) => {
+  console.log(`[job ${job.id}] cancelled`);
+  // Jobs cancelled while queued never counted as in flight
+  if (event.duration_s !== undefined) metrics.recordJob(metricsJob(job), 'cancelled', event.duration_s, job.report);
+});
+jobQueue.on('expired', (job, event) => {
+  console.warn(`[job ${job.id}] stopped: ${job.error}`);
+  metrics.recordJob(metricsJob(job), 'timeout', event.duration_s, job.report);
+});
+
+function metricsJob(job) {
+  return { id: job.id, exercise: job.exercise, mode: job.mode };
+}
+
+// Expected finish time from the queue's seconds-from-now estimate
+function etaTime(etaS) {
+  return etaS === null || etaS === undefined ? null : new Date(Date.now() + etaS * 1000).toISOString();
+}
 
 // Health check endpoint
 app.get('/api/health', (req, res) => {
@@ -101,6 +170,12 @@ app.get('/api/health', (req, res) => {
   });
 });
 
+// Prometheus metrics of analysis jobs (server/utils/metrics.js)
+app.get('/metrics', (req, res) => {
+  res.set('Content-Type', 'text/plain; version=0.0.4');
+  res.send(metrics.render());
+});
+
 // Test endpoint
 app.get('/api/test', (req, res) => {
   res.json({
@@ -111,12 +186,18 @@ app.get('/api/test', (req, res) => {
 
 // Process video endpoint
 app.post('/api/process-video', upload.single('video'), async (req, res) => {
+  const enqueuedAt = Date.now();
+  // One id for the request, the Python job and their log lines; callers may bring their own
+  const jobId = (req.get('X-Job-Id') || '').replace(/[^a-zA-Z0-9_.-]/g, '').slice(0, 64) || crypto.randomUUID();
   console.log('\n=== New video processing request ===');
-  console.log('Time:', new Date().toISOString());
+  console.log('Time:', new Date(enqueuedAt).toISOString());
+  console.log('Job:', jobId);
 
   try {
     const { activityName, mode } = req.body;
     const videoFile = req.file;
+    // Per-job stage profiling (scripts/profiler.py): form field or query string profile=1
+    const profile = ['1', 'true'].includes(String(req.body.profile || req.query.profile || '').toLowerCase());
 
     console.log('Activity:', activityName);
     console.log('Mode:', mode);
@@ -132,7 +213,8 @@ app.post('/api/process-video', upload.single('video'), async (req, res) => {
       return res.status(400).json({ error: 'Invalid or unsupported activity' });
     }
 
-    const scriptName = activityScripts[activityName];
+    const classMode = classModeScripts[mode] ? mode : null;
+    const scriptName = classMode ? classModeScripts[classMode] : activityScripts[activityName];
     // Try Talent Track py scripts folder first, then fall back to scripts folder
     let scriptPath = path.join(__dirname, '..', 'Talent Track py scripts', scriptName);
 
@@ -145,6 +227,15 @@ app.post('/api/process-video', upload.single('video'), async (req, res) => {
       return res.status(404).json({ error: `Script not found: ${scriptName}` });
     }
 
+    const scriptEnv = {
+      JOB_ID: jobId,
+      JOB_ENQUEUED_AT: String(enqueuedAt),
+      ...(classMode ? { EXERCISE: activityExercises[activityName] } : {})
+    };
+    if (profile) {
+      scriptEnv.ANALYZER_PROFILE = '1';
+    }
+
     const videoPath = videoFile.path;
     const outputId = `${Date.now()}_${activityName.replace(/[^a-zA-Z0-9]/g, '_')}`;
     const outputDir = path.join(outputsDir, outputId);
@@ -152,42 +243,147 @@ app.post('/api/process-video', upload.single('video'), async (req, res) => {
     // Create output directory
     fs.ensureDirSync(outputDir);
 
-    // Execute Python script
-    console.log('Executing Python script...');
-    const result = await executeScript(scriptPath, videoPath, outputDir, activityName);
-
-    console.log('Processing complete!');
-    console.log('Result:', JSON.stringify(result, null, 2));
+    // Queue the job; the runner removes the upload and the rewritten script once it is finished
+    const tempScriptPath = path.join(outputDir, 'temp_script.py');
+    fs.writeFileSync(tempScriptPath, createModifiedScript(scriptPath, videoPath, outputDir));
+    let queued;
+    try {
+      queued = await jobQueue.submit({
+        id: jobId,
+        exercise: activityExercises[activityName],
+        mode: classMode || 'single',
+        activity: activityName,
+        video: videoPath,
+        script: tempScriptPath,
+        output_dir: outputDir,
+        output_id: outputId,
+        env: scriptEnv,
+        cleanup: [videoPath, tempScriptPath],
+        enqueued_at: enqueuedAt / 1000
+      });
+    } catch (error) {
+      fs.removeSync(videoPath);
+      fs.removeSync(outputDir);
+      if (error.code === 'QUEUE_FULL') {
+        res.set('Retry-After', String(QUEUE_RETRY_AFTER_S));
+        return res.status(503).json({ error: 'Too many videos waiting, try again shortly', jobId: jobId });
+      }
+      if (error.code === 'DUPLICATE_JOB') {
+        return res.status(409).json({ error: error.message, jobId: jobId });
+      }
+      throw error;
+    }
+    console.log(`Queued job ${jobId} at position ${queued.position}, ` +
+      `about ${queued.estimateS}s of work, done in about ${queued.etaS}s`);
+
+    // wait=0: answer now and let the client poll GET /api/jobs/:jobId
+    if (['0', 'false'].includes(String(req.body.wait || req.query.wait || '').toLowerCase())) {
+      return res.status(202).json({
+        success: true,
+        jobId: jobId,
+        outputId: outputId,
+        state: 'queued',
+        position: queued.position,
+        estimatedSeconds: queued.estimateS,
+        estimatedCompletion: etaTime(queued.etaS)
+      });
+    }
 
-    // Extract frames from video for browser playback
-    if (result.videoFile) {
-      try {
-        console.log('Extracting frames from video...');
-        await extractFramesFromVideo(outputDir, result.videoFile);
-        result.hasFrames = true;
-      } catch (error) {
-        console.warn('Frame extraction failed:', error.message);
-        // Try video conversion as fallback
-        try {
-          await convertVideoToBrowserFormat(outputDir, result.videoFile);
-        } catch (convError) {
-          console.warn('Video conversion also failed:', convError.message);
-        }
+    // A client that goes away before the answer no longer needs the analysis
+    res.on('close', () => {
+      if (!res.writableFinished) {
+        console.log(`Client of job ${jobId} disconnected, cancelling it`);
+        jobQueue.cancel(jobId).catch(error => console.warn(`Could not cancel job ${jobId}:`, error.message));
       }
+    });
+
+    const job = await jobQueue.waitFor(jobId);
+    if (res.destroyed) {
+      return;
     }
+    if (STOPPED_STATES.includes(job.state)) {
+      // Stopped early: send what it got through, marked partial
+      const partial = fs.existsSync(job.output_dir) ? await prepareResults(job) : {};
+      return res.status(job.state === 'expired' ? 504 : 409).json({
+        error: job.error,
+        state: job.state,
+        partial: true,
+        outputId: outputId,
+        jobId: jobId,
+        ...partial
+      });
+    }
+    if (job.state !== 'done') {
+      throw new Error(`Analysis failed after ${job.attempts} attempt(s): ${job.error}`);
+    }
+    const result = await prepareResults(job);
 
-    // Clean up uploaded file
-    fs.removeSync(videoPath);
+    console.log('Processing complete!');
+    console.log('Result:', JSON.stringify(result, null, 2));
 
     res.json({
       success: true,
       outputId: outputId,
+      jobId: jobId,
       ...result
     });
 
   } catch (error) {
     console.error('Error processing video:', error);
-    res.status(500).json({ error: 'Failed to process video', details: error.message });
+    res.status(500).json({ error: 'Failed to process video', details: error.message, jobId: jobId });
+  }
+});
+
+// State of a queued job, and its results once it is done (survives server restarts)
+app.get('/api/jobs/:jobId', async (req, res) => {
+  try {
+    const job = await jobQueue.get(req.params.jobId);
+    if (!job) {
+      return res.status(404).json({ error: 'Job not found' });
+    }
+
+    const response = {
+      jobId: job.id,
+      state: job.state,
+      activityName: job.activity,
+      outputId: job.output_id,
+      attempts: job.attempts,
+      position: job.position,
+      estimatedSeconds: job.estimate_s,
+      estimatedCompletion: etaTime(job.eta_s),
+      video: { frames: job.frames, fps: job.fps, width: job.width, height: job.height, durationS: job.duration_s },
+      enqueuedAt: new Date(job.enqueued_at * 1000).toISOString(),
+      startedAt: job.started_at ? new Date(job.started_at * 1000).toISOString() : null,
+      finishedAt: job.finished_at ? new Date(job.finished_at * 1000).toISOString() : null,
+      error: job.error
+    };
+    if (job.state === 'done' && fs.existsSync(job.output_dir)) {
+      Object.assign(response, { success: true }, await prepareResults(job));
+    } else if (STOPPED_STATES.includes(job.state) && fs.existsSync(job.output_dir)) {
+      Object.assign(response, { partial: true }, await prepareResults(job));
+    }
+    res.json(response);
+
+  } catch (error) {
+    console.error('Error getting job:', error);
+    res.status(500).json({ error: 'Failed to get job', details: error.message });
+  }
+});
+
+// Cancel a job: a queued one never runs, a running one stops at its next frame
+// and keeps the results of the frames it processed
+app.delete('/api/jobs/:jobId', async (req, res) => {
+  try {
+    const state = await jobQueue.cancel(req.params.jobId);
+    if (!state) {
+      return res.status(404).json({ error: 'Job not found' });
+    }
+    // 'running' means the stop is on its way; poll GET /api/jobs/:jobId for the outcome
+    res.status(state === 'running' ? 202 : 200).json({ jobId: req.params.jobId, state: state });
+
+  } catch (error) {
+    console.error('Error cancelling job:', error);
+    res.status(500).json({ error: 'Failed to cancel job', details: error.message });
   }
 });
 
@@ -196,20 +392,16 @@ app.post('/api/start-live-recording', async (req, res) => {
   try {
     const { activityName } = req.body;
 
-    if (!activityName || !liveScripts[activityName]) {
+    if (!activityName || !liveExercises[activityName]) {
       return res.status(400).json({ error: 'Invalid or unsupported activity for live recording' });
     }
-
-    const scriptName = liveScripts[activityName];
-    // Try Talent Track py scripts folder first, then fall back to scripts folder
-    let scriptPath = path.join(__dirname, '..', 'Talent Track py scripts', scriptName);
-
-    if (!fs.existsSync(scriptPath)) {
-      scriptPath = path.join(__dirname, '..', 'scripts', scriptName);
+    if (!LIVE_SOURCE) {
+      return res.status(503).json({ error: 'Live recording is not configured on this server (LIVE_SOURCE)' });
     }
 
+    const scriptPath = path.join(__dirname, '..', 'scripts', 'live_engine.py');
     if (!fs.existsSync(scriptPath)) {
-      return res.status(404).json({ error: `Live script not found: ${scriptName}` });
+      return res.status(404).json({ error: 'Live engine not found: live_engine.py' });
     }
 
     const outputId = `live_${Date.now()}_${activityName.replace(/[^a-zA-Z0-9]/g, '_')}`;
@@ -217,13 +409,13 @@ app.post('/api/start-live-recording', async (req, res) => {
 
     fs.ensureDirSync(outputDir);
 
-    // Execute live script
-    const result = await executeLiveScript(scriptPath, outputDir, activityName);
+    const session = await startLiveSession(scriptPath, outputId, outputDir, liveExercises[activityName]);
 
     res.json({
       success: true,
       outputId: outputId,
-      ...result
+      exercise: session.exercise,
+      live: true
     });
 
   } catch (error) {
@@ -232,6 +424,50 @@ app.post('/api/start-live-recording', async (req, res) => {
   }
 });
 
+// Live session events (Server-Sent Events): started, rep, status, finalized
+app.get('/api/live/:outputId/events', (req, res) => {
+  const session = liveSessions.get(req.params.outputId);
+  if (!session) {
+    return res.status(404).json({ error: 'Live session not found' });
+  }
+
+  res.setHeader('Content-Type', 'text/event-stream');
+  res.setHeader('Cache-Control', 'no-cache');
+  res.setHeader('Connection', 'keep-alive');
+  res.flushHeaders();
+
+  session.events.forEach(event => res.write(`data: ${JSON.stringify(event)}\n\n`));
+  if (session.finished) {
+    return res.end();
+  }
+  session.clients.add(res);
+  req.on('close', () => session.clients.delete(res));
+});
+
+// Stop a live session and return its results once the engine has finalized
+app.post('/api/live/:outputId/stop', async (req, res) => {
+  const { outputId } = req.params;
+  const session = liveSessions.get(outputId);
+  if (!session) {
+    // Also an engine that already ended on its own; its results are at /api/results/:outputId
+    return res.status(404).json({ error: 'Live session not found or already finished' });
+  }
+
+  try {
+    const summary = await stopLiveSession(session);
+    const results = await getProcessingResults(session.outputDir);
+    res.json({
+      success: true,
+      outputId: outputId,
+      summary: summary,
+      ...results
+    });
+  } catch (error) {
+    console.error('Error stopping live recording:', error);
+    res.status(500).json({ error: 'Failed to stop live recording', details: error.message });
+  }
+});
+
 // Get processed results
 app.get('/api/results/:outputId', async (req, res) => {
   try {
@@ -251,6 +487,18 @@ app.get('/api/results/:outputId', async (req, res) => {
   }
 });
 
+// Chrome trace of a profiled job (open in chrome://tracing or ui.perfetto.dev)
+app.get('/api/profile/:outputId/trace', (req, res) => {
+  const outputDir = path.join(outputsDir, req.params.outputId);
+  const traceFile = fs.existsSync(outputDir) && fs.readdirSync(outputDir).find(file => file.endsWith('_trace.json'));
+
+  if (traceFile) {
+    res.download(path.join(outputDir, traceFile));
+  } else {
+    res.status(404).json({ error: 'No profile for this job; process it with profile=1' });
+  }
+});
+
 // Serve video frames
 app.get('/api/frames/:outputId', (req, res) => {
   const { outputId } = req.params;
@@ -305,45 +553,105 @@ app.get('/api/video/:outputId/:filename', (req, res) => {
   }
 });
 
-// Execute Python script for video processing
-function executeScript(scriptPath, videoPath, outputDir, activityName) {
-  return new Promise((resolve, reject) => {
-    // Modify the script to accept command line arguments
-    const modifiedScript = createModifiedScript(scriptPath, videoPath, outputDir);
-    const tempScriptPath = path.join(outputDir, 'temp_script.py');
-
-    fs.writeFileSync(tempScriptPath, modifiedScript);
+// Results of a finished job; frames for browser playback are extracted the first time
+const preparing = new Map();
+function prepareResults(job) {
+  if (!preparing.has(job.id)) {
+    const done = (async () => {
+      const outputDir = job.output_dir;
+      const result = await getProcessingResults(outputDir);
+      if (result.videoFile && !fs.existsSync(path.join(outputDir, 'frames'))) {
+        try {
+          console.log('Extracting frames from video...');
+          await extractFramesFromVideo(outputDir, result.videoFile);
+        } catch (error) {
+          console.warn('Frame extraction failed:', error.message);
+          fs.removeSync(path.join(outputDir, 'frames'));
+          // Try video conversion as fallback
+          try {
+            await convertVideoToBrowserFormat(outputDir, result.videoFile);
+          } catch (convError) {
+            console.warn('Video conversion also failed:', convError.message);
+          }
+        }
+      }
+      if (fs.existsSync(path.join(outputDir, 'frames'))) {
+        result.hasFrames = true;
+      }
+      return job.report ? { ...result, jobMetrics: job.report } : result;
+    })();
+    preparing.set(job.id, done);
+    done.finally(() => preparing.delete(job.id)).catch(() => {});
+  }
+  return preparing.get(job.id);
+}
 
-    const pythonProcess = spawn('python', [tempScriptPath], {
+// Spawn the live engine; resolves once it reports 'started'
+function startLiveSession(scriptPath, outputId, outputDir, exercise) {
+  return new Promise((resolve, reject) => {
+    const pythonProcess = spawn('python', [scriptPath], {
       cwd: outputDir,
+      env: {
+        ...process.env,
+        PYTHONUNBUFFERED: '1',
+        EXERCISE: exercise,
+        LIVE_SOURCE: LIVE_SOURCE,
+        LIVE_OUTPUT_DIR: outputDir,
+        LIVE_SESSION: outputId,
+        LIVE_MAX_SECONDS: process.env.LIVE_MAX_SECONDS || '600'
+      },
       stdio: ['pipe', 'pipe', 'pipe']
     });
 
-    let stdout = '';
+    const session = {
+      process: pythonProcess,
+      exercise: exercise,
+      outputDir: outputDir,
+      events: [],
+      clients: new Set(),
+      summary: null,
+      finished: false
+    };
+    session.done = new Promise(resolveDone => { session.resolveDone = resolveDone; });
+
+    let started = false;
     let stderr = '';
 
-    pythonProcess.stdout.on('data', (data) => {
-      stdout += data.toString();
+    const lines = readline.createInterface({ input: pythonProcess.stdout });
+    lines.on('line', (line) => {
+      let event;
+      try {
+        event = JSON.parse(line);
+      } catch (error) {
+        console.log('[live]', line);
+        return;
+      }
+      session.events.push(event);
+      session.clients.forEach(client => client.write(`data: ${JSON.stringify(event)}\n\n`));
+
+      if (event.event === 'started' && !started) {
+        started = true;
+        liveSessions.set(outputId, session);
+        resolve(session);
+      } else if (event.event === 'finalized') {
+        session.summary = event;
+      }
     });
 
     pythonProcess.stderr.on('data', (data) => {
       stderr += data.toString();
     });
 
-    pythonProcess.on('close', async (code) => {
-      // Clean up temp script
-      fs.removeSync(tempScriptPath);
-
-      if (code !== 0) {
-        reject(new Error(`Python script failed with code ${code}: ${stderr}`));
-        return;
-      }
-
-      try {
-        const results = await getProcessingResults(outputDir);
-        resolve(results);
-      } catch (error) {
-        reject(error);
+    pythonProcess.on('close', (code) => {
+      session.finished = true;
+      liveSessions.delete(outputId);
+      session.clients.forEach(client => client.end());
+      session.clients.clear();
+      session.resolveDone(session.summary);
+      if (!started) {
+        reject(new Error(`Live engine exited with code ${code}: ${stderr}`));
+      } else if (code !== 0) {
+        console.error(`Live engine for ${outputId} exited with code ${code}: ${stderr}`);
       }
     });
 
@@ -353,26 +661,15 @@ function executeScript(scriptPath, videoPath, outputDir, activityName) {
   });
 }
 
-// Execute live recording script
-function executeLiveScript(scriptPath, outputDir, activityName) {
-  return new Promise((resolve, reject) => {
-    const modifiedScript = createModifiedLiveScript(scriptPath, outputDir);
-    const tempScriptPath = path.join(outputDir, 'temp_live_script.py');
-
-    fs.writeFileSync(tempScriptPath, modifiedScript);
-
-    // For live scripts, we'll simulate the execution since they require camera access
-    // In a real implementation, you'd handle this differently
-    setTimeout(async () => {
-      try {
-        // Create mock results for live recording
-        const mockResults = createMockLiveResults(activityName, outputDir);
-        resolve(mockResults);
-      } catch (error) {
-        reject(error);
-      }
-    }, 3000); // Simulate 3 second processing time
-  });
+// Ask the engine to stop and wait for it to finalize; kill it if it hangs
+async function stopLiveSession(session) {
+  if (!session.finished) {
+    session.process.stdin.write('stop\n');
+    const timer = setTimeout(() => session.process.kill(), LIVE_STOP_TIMEOUT_MS);
+    await session.done;
+    clearTimeout(timer);
+  }
+  return session.summary;
 }
 
 // Create modified script that doesn't require GUI file selection
@@ -409,8 +706,10 @@ function createModifiedScript(originalScriptPath, videoPath, outputDir) {
   );
   script = script.replace(/output_folder = filename/g, `output_folder = r"${outputDirForPython}"`);
 
-  // Ensure output directory exists
-  script = `import os\nimport sys\n${script}`;
+  // Ensure output directory exists and the shared helper modules next to
+  // the original script (pose_backend etc.) stay importable from outputDir
+  const scriptsDirForPython = path.dirname(originalScriptPath).replace(/\\/g, '/');
+  script = `import os\nimport sys\nsys.path.insert(0, r"${scriptsDirForPython}")\n${script}`;
   script = script.replace(
     /os\.makedirs\(output_folder, exist_ok=True\)/g,
     `os.makedirs(r"${outputDirForPython}", exist_ok=True)`
@@ -430,58 +729,26 @@ function createModifiedScript(originalScriptPath, videoPath, outputDir) {
   return script;
 }
 
-// Create modified live script
-function createModifiedLiveScript(originalScriptPath, outputDir) {
-  let script = fs.readFileSync(originalScriptPath, 'utf8');
-
-  // Modify for headless execution and output to our directory
-  const outputDirForPython = outputDir.replace(/\\/g, '/');
-  script = script.replace(/output_folder = filename/g, `output_folder = r"${outputDirForPython}"`);
-  script = script.replace(/filename = "camera_feed"/g, `filename = "${path.basename(outputDir)}"`);
-
-  // Ensure output directory exists
-  script = `import os\nimport sys\n${script}`;
-  script = script.replace(
-    /os\.makedirs\(output_folder, exist_ok=True\)/g,
-    `os.makedirs(r"${outputDirForPython}", exist_ok=True)`
-  );
-
-  // Remove cv2.imshow and waitKey calls to run headless
-  // Comment out entire lines with cv2.imshow
-  script = script.replace(/^(\s*)cv2\.imshow\([^)]*\)/gm, '$1pass  # cv2.imshow removed');
-
-  // Replace cv2.waitKey expressions properly
-  script = script.replace(/cv2\.waitKey\(1\)/g, '1');
-
-  // Comment out cv2.destroyAllWindows
-  script = script.replace(/^(\s*)cv2\.destroyAllWindows\(\)/gm, '$1pass  # cv2.destroyAllWindows removed');
-
-  // Add automatic termination after some time (30 seconds)
-  script = script.replace(/while True:/g, `
-frame_count = 0
-max_frames = int(fps * 30)  # 30 seconds max
-while frame_count < max_frames:`);
-
-  script = script.replace(/frame_idx \+= 1/g, `
-frame_idx += 1
-frame_count += 1`);
-
-  return script;
-}
-
 // Get processing results from output directory
 async function getProcessingResults(outputDir) {
   const files = fs.readdirSync(outputDir);
   console.log('Files in output directory:', files);
 
+  // Class modes write one log per athlete/attempt plus a summary; the summary
+  // is the main table and each entry's log is returned alongside it
+  const summaryFile = files.find(file =>
+    file.endsWith('_athletes_summary.csv') || file.endsWith('_attempts_summary.csv')
+  );
+
   // Find CSV file (look for various naming patterns)
-  const csvFile = files.find(file =>
+  const csvFile = summaryFile || files.find(file =>
     file.endsWith('.csv') &&
     !file.includes('temp') &&
     !file.includes('vertical_jump_log.csv') // Exclude the old log file
   ) || files.find(file => file.endsWith('.csv'));
 
   const videoFile = files.find(file => file.endsWith('_annotated.mp4'));
+  const profileFile = files.find(file => file.endsWith('_profile.json'));
 
   console.log('Found CSV file:', csvFile);
   console.log('Found video file:', videoFile);
@@ -497,11 +764,36 @@ async function getProcessingResults(outputDir) {
     }
   }
 
+  let entries;
+  if (summaryFile) {
+    entries = [];
+    for (const row of csvData || []) {
+      const logFile = row.log_file && files.includes(row.log_file) ? row.log_file : null;
+      entries.push({
+        ...row,
+        csvFile: logFile,
+        csvData: logFile ? await readCSVFile(path.join(outputDir, logFile)) : []
+      });
+    }
+  }
+  const entriesKey = summaryFile && summaryFile.endsWith('_attempts_summary.csv') ? 'attempts' : 'athletes';
+
+  let profile = null;
+  if (profileFile) {
+    try {
+      profile = JSON.parse(fs.readFileSync(path.join(outputDir, profileFile), 'utf8'));
+    } catch (error) {
+      console.error('Error reading profile:', error);
+    }
+  }
+
   return {
     csvData: csvData,
     videoFile: videoFile,
     outputPath: outputDir,
-    files: files
+    files: files,
+    ...(entries ? { [entriesKey]: entries } : {}),
+    ...(profile ? { profile: profile } : {})
   };
 }
 
@@ -603,38 +895,6 @@ async function convertVideoToBrowserFormat(outputDir, videoFile) {
   });
 }
 
-// Create mock results for live recording demo
-function createMockLiveResults(activityName, outputDir) {
-  const mockData = {
-    'Push-ups': [
-      { count: 1, down_time: 2.1, up_time: 3.2, dip_duration_sec: 1.1, min_elbow_angle: 68, correct: true },
-      { count: 2, down_time: 4.5, up_time: 5.8, dip_duration_sec: 1.3, min_elbow_angle: 72, correct: true },
-      { count: 3, down_time: 7.2, up_time: 8.1, dip_duration_sec: 0.9, min_elbow_angle: 85, correct: false }
-    ],
-    'Pull-ups': [
-      { count: 1, up_time: 2.0, down_time: 4.5, dip_duration_sec: 2.5, min_elbow_angle: 165 },
-      { count: 2, up_time: 6.0, down_time: 9.2, dip_duration_sec: 3.2, min_elbow_angle: 170 }
-    ]
-  };
-
-  const csvData = mockData[activityName] || [];
-
-  // Create mock CSV file
-  if (csvData.length > 0) {
-    const csvPath = path.join(outputDir, 'live_results.csv');
-    const csvContent = Object.keys(csvData[0]).join(',') + '\n' +
-      csvData.map(row => Object.values(row).join(',')).join('\n');
-    fs.writeFileSync(csvPath, csvContent);
-  }
-
-  return {
-    csvData: csvData,
-    videoFile: null, // Live recording doesn't produce video file immediately
-    outputPath: outputDir,
-    files: ['live_results.csv']
-  };
-}
-
 // ============================================
 // MONGODB WORKOUT STORAGE ROUTES
 // ============================================
@@ -681,6 +941,13 @@ app.post('/api/save-workout', async (req, res) => {
 
 // Connect to MongoDB and start server
 async function startServer() {
+  jobQueue.start();
+  ['SIGINT', 'SIGTERM'].forEach(sig => process.on(sig, () => {
+    // The runner gives its running jobs back to the queue before exiting
+    jobQueue.stop();
+    setTimeout(() => process.exit(0), 2000);
+  }));
+
   try {
     // Connect to MongoDB first
     console.log('🔄 Connecting to MongoDB...');
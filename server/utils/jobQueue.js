@@ -0,0 +1,181 @@
+// Durable analysis job queue
+//
+// Jobs live in SQLite and run in scripts/job_runner.py, which this module
+// starts and talks to in JSON lines (see the runner's docstring). The
+// runner keeps a fixed number of long-lived Python workers, so a burst of
+// uploads queues up instead of forking a process per request, and jobs
+// survive a server restart: the next runner requeues whatever the last one
+// was running, and results stay fetchable by job id. With JOB_NODE_PORT
+// set, analysis nodes on other machines (scripts/node_worker.py) take jobs
+// from the same queue and upload their results into the job's output folder.
+//
+// Events: 'running', 'retrying', 'done', 'failed', 'cancelled' and 'expired'
+// (out of its time budget), each with the job row, and 'lost' for a job that was running when the runner died (it is requeued
+// by the next runner).
+const { spawn } = require('child_process');
+const { EventEmitter } = require('events');
+const path = require('path');
+const readline = require('readline');
+
+const RESTART_DELAY_MS = 1000;
+const FINAL_STATES = ['done', 'failed', 'cancelled', 'expired'];
+
+class QueueFullError extends Error {
+    constructor(message) {
+        super(message);
+        this.code = 'QUEUE_FULL';
+    }
+}
+
+class DuplicateJobError extends Error {
+    constructor(message) {
+        super(message);
+        this.code = 'DUPLICATE_JOB';
+    }
+}
+
+class JobQueue extends EventEmitter {
+    /**
+     * @param {string} scriptsDir - folder with job_runner.py
+     * @param {Object} env - JOB_* / WORKER_* settings for the runner
+     */
+    constructor(scriptsDir, env = {}) {
+        super();
+        this.scriptsDir = scriptsDir;
+        this.env = env;
+        this.process = null;
+        this.pending = new Map();   // req -> { resolve, reject }
+        this.waiters = new Map();   // job id -> [resolve]
+        this.running = new Map();   // job id -> row, as last reported
+        this.nextReq = 1;
+        this.stopping = false;
+    }
+
+    start() {
+        this.stopping = false;
+        const runner = spawn('python', [path.join(this.scriptsDir, 'job_runner.py')], {
+            cwd: this.scriptsDir,
+            env: { ...process.env, PYTHONUNBUFFERED: '1', ...this.env },
+            stdio: ['pipe', 'pipe', 'pipe']
+        });
+        this.process = runner;
+
+        readline.createInterface({ input: runner.stdout }).on('line', (line) => {
+            let msg;
+            try {
+                msg = JSON.parse(line);
+            } catch (error) {
+                console.log('[jobs]', line);
+                return;
+            }
+            if (msg.event) {
+                if (msg.event === 'running') this.running.set(msg.id, msg.job); else this.running.delete(msg.id);
+                this.emit(msg.event, msg.job || { id: msg.id }, msg);
+                if (FINAL_STATES.includes(msg.event)) {
+                    (this.waiters.get(msg.id) || []).forEach(resolve => resolve(msg.job));
+                    this.waiters.delete(msg.id);
+                }
+                return;
+            }
+            const waiting = this.pending.get(msg.req);
+            if (waiting) {
+                this.pending.delete(msg.req);
+                waiting.resolve(msg);
+            }
+        });
+        readline.createInterface({ input: runner.stderr }).on('line', line => console.error(`[jobs] ${line}`));
+
+        runner.on('exit', (code, signal) => {
+            if (this.process === runner) this.process = null;
+            const error = new Error(`Job runner exited (${signal || code})`);
+            this.pending.forEach(waiting => waiting.reject(error));
+            this.pending.clear();
+            this.running.forEach(job => this.emit('lost', job));
+            this.running.clear();
+            if (!this.stopping) {
+                console.error(`${error.message}, restarting`);
+                setTimeout(() => { if (!this.stopping && !this.process) this.start(); }, RESTART_DELAY_MS);
+            }
+        });
+        runner.on('error', error => console.error('Could not start the job runner:', error.message));
+    }
+
+    request(op, fields) {
+        return new Promise((resolve, reject) => {
+            if (!this.process) {
+                return reject(new Error('Job runner is not running'));
+            }
+            const req = this.nextReq++;
+            this.pending.set(req, { resolve, reject });
+            this.process.stdin.write(JSON.stringify({ op, req, ...fields }) + '\n');
+        });
+    }
+
+    /**
+     * Queue a job
+     * @param {Object} job - { id, exercise, mode, activity, video, script, output_dir, output_id, env, cleanup }
+     * @returns {Promise<{id: string, position: number, estimateS: number, etaS: number}>} - estimated
+     *     run time and seconds until done; rejects with code QUEUE_FULL or DUPLICATE_JOB
+     */
+    async submit(job) {
+        const reply = await this.request('submit', { job });
+        if (reply.op === 'rejected') {
+            throw reply.reason === 'full' ? new QueueFullError(reply.error) : new DuplicateJobError(reply.error);
+        }
+        return { id: reply.id, position: reply.position, estimateS: reply.estimate_s, etaS: reply.eta_s };
+    }
+
+    /**
+     * Current row of a job, null when unknown
+     * @param {string} id
+     * @returns {Promise<Object|null>} - the row plus its queue position and eta_s while not finished
+     */
+    async get(id) {
+        const reply = await this.request('get', { id });
+        return reply.job ? { ...reply.job, position: reply.position, eta_s: reply.eta_s } : null;
+    }
+
+    /**
+     * Cancel a job: a queued one never starts, a running one stops at its next
+     * frame and ends 'cancelled' with what it processed so far
+     * @param {string} id
+     * @returns {Promise<string|null>} - the job's state right after, null when unknown
+     */
+    async cancel(id) {
+        const reply = await this.request('cancel', { id });
+        return reply.state;
+    }
+
+    /**
+     * Resolves with the job row once it has ended for good (done, failed, cancelled or expired)
+     * @param {string} id
+     * @returns {Promise<Object>}
+     */
+    async waitFor(id) {
+        let wake;
+        const finished = new Promise(resolve => { wake = resolve; });
+        if (!this.waiters.has(id)) this.waiters.set(id, []);
+        this.waiters.get(id).push(wake);
+        // It may have finished (or never existed) before anyone waited
+        const job = await this.get(id);
+        if (!job || FINAL_STATES.includes(job.state)) {
+            const rest = this.waiters.get(id).filter(w => w !== wake);
+            if (rest.length) this.waiters.set(id, rest); else this.waiters.delete(id);
+            return job;
+        }
+        return finished;
+    }
+
+    stop() {
+        this.stopping = true;
+        if (this.process) {
+            this.process.stdin.end();
+        }
+    }
+}
+
+module.exports = {
+    JobQueue,
+    QueueFullError,
+    DuplicateJobError
+};
@@ -0,0 +1,149 @@
+// Prometheus-style metrics for analysis jobs
+//
+// Every job of the job queue (utils/jobQueue.js) ends in recordJob() with
+// the report its worker made (scripts/job_metrics.py) and what the queue saw
+// itself (outcome, total duration). render() returns the text exposition
+// format served at GET /metrics; with METRICS_TEXTFILE set, the same text is
+// also written to that file after every job, for a node_exporter textfile
+// collector.
+const fs = require('fs');
+
+const PREFIX = 'talenttrack_analysis';
+
+const BUCKETS = {
+    duration_seconds: [1, 5, 10, 30, 60, 120, 300, 600, 1800],
+    queue_wait_seconds: [0.1, 0.5, 1, 5, 15, 60, 300, 900],
+    fps: [1, 2, 5, 10, 15, 20, 30, 45, 60, 120],
+    peak_rss_bytes: [128, 256, 512, 768, 1024, 1536, 2048, 4096].map(mb => mb * 1024 * 1024)
+};
+
+const counters = new Map();    // name -> Map(labelKey -> value)
+const histograms = new Map();  // name -> Map(labelKey -> { buckets, sum, count })
+const gauges = new Map();
+const HELP = {
+    jobs_total: ['counter', 'Analysis jobs by exercise, mode and outcome'],
+    frames_total: ['counter', 'Frames processed by analysis jobs'],
+    cpu_seconds_total: ['counter', 'CPU seconds used by analysis jobs, children included'],
+    duration_seconds: ['histogram', 'Wall time of a job from spawn to exit'],
+    queue_wait_seconds: ['histogram', 'Time from request accepted to the analyzer starting'],
+    fps: ['histogram', 'Effective frames per second of a job'],
+    peak_rss_bytes: ['histogram', 'Peak resident memory of a job'],
+    jobs_in_flight: ['gauge', 'Analysis jobs currently running']
+};
+
+function labelKey(labels) {
+    return Object.keys(labels).sort()
+        .map(k => `${k}="${String(labels[k]).replace(/\\/g, '\\\\').replace(/"/g, '\\"').replace(/\n/g, '\\n')}"`)
+        .join(',');
+}
+
+function inc(name, labels, value = 1) {
+    if (!counters.has(name)) counters.set(name, new Map());
+    const series = counters.get(name);
+    const key = labelKey(labels);
+    series.set(key, (series.get(key) || 0) + value);
+}
+
+function observe(name, labels, value) {
+    if (value === null || value === undefined || Number.isNaN(value)) return;
+    if (!histograms.has(name)) histograms.set(name, new Map());
+    const series = histograms.get(name);
+    const key = labelKey(labels);
+    if (!series.has(key)) {
+        series.set(key, { buckets: BUCKETS[name].map(() => 0), sum: 0, count: 0 });
+    }
+    const h = series.get(key);
+    BUCKETS[name].forEach((le, i) => { if (value <= le) h.buckets[i] += 1; });
+    h.sum += value;
+    h.count += 1;
+}
+
+function setGauge(name, labels, value) {
+    if (!gauges.has(name)) gauges.set(name, new Map());
+    gauges.get(name).set(labelKey(labels), value);
+}
+
+function addGauge(name, labels, delta) {
+    const series = gauges.get(name);
+    const current = (series && series.get(labelKey(labels))) || 0;
+    setGauge(name, labels, current + delta);
+}
+
+/**
+ * A job was spawned
+ * @param {Object} job - { id, exercise, mode }
+ */
+function jobStarted(job) {
+    addGauge('jobs_in_flight', { mode: job.mode }, 1);
+}
+
+/**
+ * A job exited; logs it as one JSON line and updates the series
+ * @param {Object} job - { id, exercise, mode }
+ * @param {string} outcome - 'ok', 'failed', 'retried', 'lost', 'cancelled' or 'timeout'
+ * @param {number} durationSeconds - spawn to exit, as seen by the server
+ * @param {Object|null} report - parsed JOB_METRICS line, null when the script died first
+ */
+function recordJob(job, outcome, durationSeconds, report) {
+    const labels = { exercise: job.exercise, mode: job.mode };
+    addGauge('jobs_in_flight', { mode: job.mode }, -1);
+    inc('jobs_total', { ...labels, outcome });
+    observe('duration_seconds', labels, durationSeconds);
+    if (report) {
+        inc('frames_total', labels, report.frames || 0);
+        inc('cpu_seconds_total', labels, report.cpu_s || 0);
+        observe('queue_wait_seconds', labels, report.queue_wait_s);
+        observe('fps', labels, report.fps);
+        observe('peak_rss_bytes', labels, report.peak_rss_bytes);
+    }
+
+    console.log(JSON.stringify({
+        event: 'analysis_job',
+        jobId: job.id,
+        exercise: job.exercise,
+        mode: job.mode,
+        outcome,
+        durationSeconds: Math.round(durationSeconds * 1000) / 1000,
+        ...(report || {})
+    }));
+
+    if (process.env.METRICS_TEXTFILE) {
+        // Write then rename so a scraper never reads half a file
+        const tmp = `${process.env.METRICS_TEXTFILE}.tmp`;
+        fs.writeFile(tmp, render(), err => {
+            if (err) return console.error('Could not write metrics textfile:', err.message);
+            fs.rename(tmp, process.env.METRICS_TEXTFILE, () => {});
+        });
+    }
+}
+
+/**
+ * Text exposition format of every series
+ * @returns {string}
+ */
+function render() {
+    const lines = [];
+    for (const [name, [type, help]] of Object.entries(HELP)) {
+        const full = `${PREFIX}_${name}`;
+        lines.push(`# HELP ${full} ${help}`, `# TYPE ${full} ${type}`);
+        if (type === 'histogram') {
+            for (const [key, h] of histograms.get(name) || []) {
+                const sep = key ? ',' : '';
+                BUCKETS[name].forEach((le, i) => lines.push(`${full}_bucket{${key}${sep}le="${le}"} ${h.buckets[i]}`));
+                lines.push(`${full}_bucket{${key}${sep}le="+Inf"} ${h.count}`);
+                lines.push(`${full}_sum{${key}} ${h.sum}`, `${full}_count{${key}} ${h.count}`);
+            }
+        } else {
+            for (const [key, value] of (type === 'counter' ? counters : gauges).get(name) || []) {
+                lines.push(`${full}{${key}} ${value}`);
+            }
+        }
+    }
+    return lines.join('\n') + '\n';
+}
+
+module.exports = {
+    jobStarted,
+    recordJob,
+    render
+};
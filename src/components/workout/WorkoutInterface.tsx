@@ -1,5 +1,6 @@
-import { useState } from 'react';
+import { useState, useRef, useEffect } from 'react';
 import { toast } from '@/components/ui/sonner';
+import { workoutService } from '@/services/workoutService';
 import WorkoutUploadScreen from './WorkoutUploadScreen';
 import VideoProcessor from './VideoProcessor';
 import LiveCameraProcessor from './LiveCameraProcessor';
@@ -27,6 +28,20 @@ const WorkoutInterface = ({ activity, mode, onBack }: WorkoutInterfaceProps) =>
   const [selectedVideo, setSelectedVideo] = useState<File | null>(null);
   const [liveResults, setLiveResults] = useState<any>(null);
   const [cameraFacingMode, setCameraFacingMode] = useState<'user' | 'environment'>('user');
+  const liveOutputIdRef = useRef<string | null>(null);  // server live session started from the upload screen
+
+  // The server session runs until stopped; end it with the live stage or when leaving
+  const endLiveSession = () => {
+    const outputId = liveOutputIdRef.current;
+    liveOutputIdRef.current = null;
+    if (outputId) {
+      workoutService.stopLiveRecording(outputId).catch(() => {});
+    }
+  };
+
+  useEffect(() => {
+    return () => endLiveSession();
+  }, []);
 
   // Activities with available Python scripts
   const supportedActivities = [
@@ -58,11 +73,13 @@ const WorkoutInterface = ({ activity, mode, onBack }: WorkoutInterfaceProps) =>
     setStage('processing');
   };
 
-  const handleLiveRecordingStart = () => {
+  const handleLiveRecordingStart = (outputId: string) => {
+    liveOutputIdRef.current = outputId;
     setStage('live');
   };
 
   const handleLiveRecordingComplete = (file: File) => {
+    endLiveSession();
     setSelectedVideo(file);
     setStage('processing');
   };
@@ -223,7 +240,10 @@ const WorkoutInterface = ({ activity, mode, onBack }: WorkoutInterfaceProps) =>
     return (
       <LiveCameraProcessor
         activityName={activity.name}
-        onBack={() => setStage('upload')}
+        onBack={() => {
+          endLiveSession();
+          setStage('upload');
+        }}
         onComplete={handleLiveRecordingComplete}
       />
     );
@@ -16,7 +16,7 @@ interface WorkoutUploadScreenProps {
   activityName: string;
   onBack: () => void;
   onVideoSelected: (file: File) => void;
-  onLiveRecordingStart?: () => void;
+  onLiveRecordingStart?: (outputId: string) => void;  // takes over the server session and must stop it
   hasLiveRecording?: boolean;
 }
 
@@ -31,6 +31,7 @@ const WorkoutUploadScreen = ({ activityName, onBack, onVideoSelected, onLiveReco
   const mediaRecorderRef = useRef<MediaRecorder | null>(null);
   const streamRef = useRef<MediaStream | null>(null);
   const recordingTimerRef = useRef<NodeJS.Timeout | null>(null);
+  const liveOutputIdRef = useRef<string | null>(null);  // server live session this screen still owns
 
   // Auto-trigger file selection on mount (skip the selection screen)
   useEffect(() => {
@@ -41,6 +42,19 @@ const WorkoutUploadScreen = ({ activityName, onBack, onVideoSelected, onLiveReco
     return () => clearTimeout(timer);
   }, []);
 
+  // Leaving the screen ends a server live session nobody took over
+  useEffect(() => {
+    return () => stopLiveSession();
+  }, []);
+
+  const stopLiveSession = () => {
+    const outputId = liveOutputIdRef.current;
+    liveOutputIdRef.current = null;
+    if (outputId) {
+      workoutService.stopLiveRecording(outputId).catch(() => {});
+    }
+  };
+
   const handleFileUpload = (event: React.ChangeEvent<HTMLInputElement>) => {
     const file = event.target.files?.[0];
     if (file && file.type.startsWith('video/')) {
@@ -62,7 +76,9 @@ const WorkoutUploadScreen = ({ activityName, onBack, onVideoSelected, onLiveReco
       try {
         const result = await workoutService.startLiveRecording(activityName);
         if (result.success && onLiveRecordingStart) {
-          onLiveRecordingStart();
+          onLiveRecordingStart(result.outputId);
+        } else if (result.success) {
+          liveOutputIdRef.current = result.outputId;
         }
       } catch (error) {
         console.warn('Backend live recording not available, using camera mode');
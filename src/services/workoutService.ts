@@ -75,6 +75,24 @@ class WorkoutService {
     }
   }
 
+  async stopLiveRecording(outputId: string): Promise<ProcessingResult> {
+    try {
+      const response = await fetch(`${API_BASE_URL}/live/${outputId}/stop`, {
+        method: 'POST',
+      });
+
+      if (!response.ok) {
+        const errorData = await response.json();
+        throw new Error(errorData.error || 'Failed to stop live recording');
+      }
+
+      return await response.json();
+    } catch (error) {
+      console.error('Error stopping live recording:', error);
+      throw error;
+    }
+  }
+
   async getResults(outputId: string): Promise<ProcessingResult> {
     try {
       const response = await fetch(`${API_BASE_URL}/results/${outputId}`);